@@ -17,6 +17,7 @@ from routes.wpc import wpc
 from routes.wpc_import import wpc_import
 from routes.wpc_matches import wpc_matches
 from checkin import checkin
+from passkit import passkit
 from sponsors import sponsors
 from routes.scoring import scoring
 from routes.pool import pool_bp
@@ -74,6 +75,7 @@ app.register_blueprint(webhook, url_prefix='/webhook')
 app.register_blueprint(pcl, url_prefix='/pcl')
 app.register_blueprint(auth, url_prefix='/auth')
 app.register_blueprint(checkin)
+app.register_blueprint(passkit)
 app.register_blueprint(wpc)
 app.register_blueprint(wpc_import)
 app.register_blueprint(wpc_matches)
@@ -7,11 +7,18 @@ Registriere in deiner App:
     app.register_blueprint(checkin)
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response, current_app
 from models import db, Event, SHIRT_SIZES
-from models import TournamentCheckinSettings, TournamentParticipant, TournamentCheckin, CheckinSyncQueue
-from datetime import datetime
+from models import TournamentCheckinSettings, TournamentParticipant, TournamentCheckin, CheckinSyncQueue, CheckinTombstone
+from utils import checkin_counters, live_events
+from utils.bulk_import import BulkUpsert
+import passkit
+from datetime import datetime, timedelta
+import click
+import hashlib
+import io
 import secrets
+import threading
 
 try:
     import qrcode
@@ -24,7 +31,7 @@ except ImportError:
 
 WALLET_PASS_ERROR = None
 try:
-    from wallet_pass import generate_pkpass, is_apple_wallet_available
+    from wallet_pass import generate_pkpass, get_pkpass, pass_identity, is_apple_wallet_available
     # Don't cache at import time - check dynamically
     WALLET_PASS_MODULE_AVAILABLE = True
 except ImportError as e:
@@ -212,12 +219,11 @@ DEFAULT_LIABILITY_WAIVERS = {
 # CSV PARSER FOR PICKLEBALL GLOBAL
 # ============================================================================
 
-def parse_pickleball_global_csv(csv_content, tournament_id):
-    """Parse Pickleball Global CSV/TSV format"""
-    participants = []
+def iter_pickleball_global_csv(lines, tournament_id):
+    """Participant dicts from Pickleball Global CSV/TSV lines, streamed"""
     current_country = None
     
-    for line in csv_content.strip().split('\n'):
+    for line in lines:
         if not line.strip():
             continue
         
@@ -236,50 +242,56 @@ def parse_pickleball_global_csv(csv_content, tournament_id):
             last_name = name_parts[1].title() if len(name_parts) > 1 else ''
             
             if first_name:
-                participants.append({
+                yield {
                     'tournament_id': tournament_id,
                     'external_id': parts[0],
                     'first_name': first_name,
                     'last_name': last_name,
                     'email': parts[2].strip() if len(parts) > 2 and parts[2] else None,
                     'country': current_country,
-                })
+                }
+
+
+def parse_pickleball_global_csv(csv_content, tournament_id):
+    """Parse Pickleball Global CSV/TSV format"""
+    return list(iter_pickleball_global_csv(csv_content.strip().split('\n'), tournament_id))
+
+
+def _new_participant(values):
+    values['checkin_token'] = secrets.token_urlsafe(32)
+
+
+def upsert_participants(rows, tournament_id, dry_run=False):
+    """Set-based import of participant dicts; existing external_ids are skipped.
+    Returns the BulkUpsert (stats / diff). Does not commit."""
+    importer = BulkUpsert(TournamentParticipant, key=('external_id',), scope={'tournament_id': tournament_id},
+                          prepare=_new_participant, dry_run=dry_run).run(rows)
     
-    return participants
+    if not dry_run and importer.stats['created']:
+        # Core inserts bypass the flush hooks
+        conn = db.session.connection()
+        checkin_counters.reconcile(conn, 'checkin', tournament_id)
+        live_events.publish(conn, f'checkin:{tournament_id}', 'stats', _checkin_counts(conn, tournament_id))
+    return importer
 
 
-def import_participants_from_csv(csv_content, tournament_id):
-    """Import participants, returns (imported, skipped, errors)"""
-    participants = parse_pickleball_global_csv(csv_content, tournament_id)
-    imported, skipped, errors = 0, 0, []
+def import_participants_from_csv(csv_content, tournament_id, dry_run=False):
+    """Import participants, returns (imported, skipped, errors)
     
-    for p_data in participants:
-        try:
-            existing = TournamentParticipant.query.filter_by(
-                tournament_id=tournament_id,
-                external_id=p_data['external_id']
-            ).first()
-            
-            if existing:
-                skipped += 1
-                continue
-            
-            participant = TournamentParticipant(**p_data)
-            participant.generate_checkin_token()
-            db.session.add(participant)
-            imported += 1
-            
-        except Exception as e:
-            errors.append(f"Error: {p_data.get('first_name', '?')}: {str(e)}")
+    `csv_content` is the file text or any iterable of lines (streamed). With
+    dry_run, `imported` is the number that would be created.
+    """
+    lines = csv_content.splitlines() if isinstance(csv_content, str) else csv_content
     
     try:
-        db.session.commit()
+        importer = upsert_participants(iter_pickleball_global_csv(lines, tournament_id), tournament_id, dry_run)
+        if not dry_run:
+            db.session.commit()
     except Exception as e:
         db.session.rollback()
-        errors.append(f"Database error: {str(e)}")
-        return 0, 0, errors
+        return 0, 0, [f"Database error: {str(e)}"]
     
-    return imported, skipped, errors
+    return importer.stats['created'], importer.stats['skipped'], []
 
 
 # ============================================================================
@@ -348,12 +360,17 @@ def admin_import_participants(tournament_id):
             return redirect(request.url)
         
         try:
-            csv_content = file.read().decode('utf-8')
-            imported, skipped, errors = import_participants_from_csv(csv_content, tournament_id)
+            dry_run = bool(request.form.get('dry_run'))
+            lines = io.TextIOWrapper(file.stream, encoding='utf-8-sig')
+            imported, skipped, errors = import_participants_from_csv(lines, tournament_id, dry_run=dry_run)
             
             for error in errors[:5]:
                 flash(error, 'warning')
             
+            if dry_run:
+                flash(f'Preview: {imported} participants would be imported, {skipped} duplicates skipped.', 'info')
+                return redirect(request.url)
+            
             flash(f'Imported {imported} participants. Skipped {skipped} duplicates.', 'success')
             return redirect(url_for('checkin.admin_checkin_dashboard', tournament_id=tournament_id))
             
@@ -542,18 +559,25 @@ def apple_wallet_pass(token):
         return redirect(url_for('checkin.self_checkin', token=token))
 
     try:
-        # Generate the .pkpass file
-        print("DEBUG: Calling generate_pkpass...")
-        pkpass_buffer = generate_pkpass(participant, tournament, checkin_record)
-        print(f"DEBUG: Pass generated successfully, size: {pkpass_buffer.getbuffer().nbytes} bytes")
+        # Registered with the PassKit web service so later changes update it in place
+        wallet_pass = passkit.ensure_pass('checkin', checkin_record.id,
+                                          *pass_identity(participant, tournament, checkin_record))
 
-        # Send the file
+        # Cached .pkpass - only rebuilt when the pass content changes
+        pkpass = get_pkpass(participant, tournament, checkin_record,
+                            wallet_pass.web_service_fields(passkit.web_service_url()))
+        print(f"DEBUG: Pass ready, size: {len(pkpass.data)} bytes")
+
+        # Send the file (304 when the client already has this version)
         filename = f"WPC_{participant.first_name}_{participant.last_name}.pkpass"
         return send_file(
-            pkpass_buffer,
+            io.BytesIO(pkpass.data),
             mimetype='application/vnd.apple.pkpass',
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            etag=pkpass.etag,
+            last_modified=pkpass.generated_at,
+            conditional=True
         )
     except Exception as e:
         error_traceback = traceback.format_exc()
@@ -592,29 +616,108 @@ def api_debug_apple_wallet():
     })
 
 
+# Delta requests re-send rows changed this long before the client's cursor, so a
+# transaction that stamped updated_at before `generated_at` but committed after it
+# is not missed. Re-sent rows are idempotent for the client.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def _parse_since(value):
+    """Parse a `since` cursor (a previous `generated_at`), or None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', ''))
+    except ValueError:
+        return None
+
+
+def get_checkin_version(tournament_id, settings=None):
+    """Cheap version token for a tournament's offline data (one aggregate query).
+
+    Changes whenever a participant or check-in row is inserted, updated or
+    deleted, or the check-in settings change.
+    """
+    P, C, T = TournamentParticipant, TournamentCheckin, CheckinTombstone
+    row = db.session.execute(db.select(
+        db.select(db.func.count(P.id)).where(P.tournament_id == tournament_id).scalar_subquery(),
+        db.select(db.func.max(P.updated_at)).where(P.tournament_id == tournament_id).scalar_subquery(),
+        db.select(db.func.count(C.id)).where(C.tournament_id == tournament_id).scalar_subquery(),
+        db.select(db.func.max(C.updated_at)).where(C.tournament_id == tournament_id).scalar_subquery(),
+        db.select(db.func.max(T.id)).where(T.tournament_id == tournament_id).scalar_subquery(),
+    )).one()
+    parts = [str(v) for v in row]
+    if settings:
+        parts += [str(settings.checkin_open), settings.liability_waiver_version or '',
+                  hashlib.sha1((settings.liability_waiver_text or '').encode('utf-8')).hexdigest()]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+
+
+def _participant_payload(p, c):
+    """Offline roster entry for one participant and its check-in (or None)."""
+    return {
+        'id': p.id, 'external_id': p.external_id, 'first_name': p.first_name, 'last_name': p.last_name,
+        'email': p.email, 'country': p.country, 'checkin_token': p.checkin_token,
+        'is_checked_in': c is not None,
+        'checkin_data': {'tshirt_size': c.tshirt_size,
+                         'welcome_pack_received': c.welcome_pack_received} if c is not None else None
+    }
+
+
 @checkin.route('/api/tournament/<int:tournament_id>/checkin/init')
 def api_checkin_init(tournament_id):
-    """Initialize offline data"""
+    """Initialize offline data.
+
+    Full mode (no cursor) returns the whole roster. Delta mode (`?since=<generated_at>`)
+    returns only participants whose row or check-in changed since then, plus
+    `deleted` tombstones. The response carries an ETag / `version`; a client that
+    sends it back (If-None-Match or `?version=`) gets 304 when nothing changed.
+    """
     tournament = Event.query.get_or_404(tournament_id)
     settings = TournamentCheckinSettings.query.filter_by(tournament_id=tournament_id).first()
-    participants = TournamentParticipant.query.filter_by(tournament_id=tournament_id).all()
-    checkins = {c.participant_id: c for c in TournamentCheckin.query.filter_by(tournament_id=tournament_id).all()}
-    
-    return jsonify({
+
+    generated_at = datetime.utcnow()
+    version = get_checkin_version(tournament_id, settings)
+    if request.if_none_match.contains(version) or request.args.get('version') == version:
+        response = make_response('', 304)
+        response.set_etag(version)
+        return response
+
+    since = _parse_since(request.args.get('since'))
+
+    query = db.session.query(TournamentParticipant, TournamentCheckin).outerjoin(
+        TournamentCheckin, TournamentCheckin.participant_id == TournamentParticipant.id
+    ).filter(TournamentParticipant.tournament_id == tournament_id)
+
+    deleted = []
+    if since is not None:
+        cursor = since - SYNC_OVERLAP
+        query = query.filter(db.or_(TournamentParticipant.updated_at > cursor,
+                                    TournamentCheckin.updated_at > cursor))
+        tombstones = CheckinTombstone.query.filter(
+            CheckinTombstone.tournament_id == tournament_id,
+            CheckinTombstone.deleted_at > cursor
+        ).order_by(CheckinTombstone.id).all()
+        deleted = [{'type': t.entity_type, 'id': t.entity_id, 'participant_id': t.participant_id}
+                   for t in tombstones]
+
+    payload = {
+        'mode': 'delta' if since is not None else 'full',
         'tournament': {'id': tournament.id, 'name': tournament.name, 'location': tournament.location},
         'settings': {'checkin_open': settings.checkin_open if settings else False,
                     'liability_waiver_text': settings.liability_waiver_text if settings else None} if settings else None,
-        'participants': [{
-            'id': p.id, 'external_id': p.external_id, 'first_name': p.first_name, 'last_name': p.last_name,
-            'email': p.email, 'country': p.country, 'checkin_token': p.checkin_token,
-            'is_checked_in': p.id in checkins,
-            'checkin_data': {'tshirt_size': checkins[p.id].tshirt_size,
-                            'welcome_pack_received': checkins[p.id].welcome_pack_received} if p.id in checkins else None
-        } for p in participants],
-        'default_waivers': DEFAULT_LIABILITY_WAIVERS,
-        'tshirt_sizes': TSHIRT_SIZES,
-        'generated_at': datetime.utcnow().isoformat()
-    })
+        'participants': [_participant_payload(p, c) for p, c in query.all()],
+        'deleted': deleted,
+        'version': version,
+        'generated_at': generated_at.isoformat()
+    }
+    if since is None:
+        payload['default_waivers'] = DEFAULT_LIABILITY_WAIVERS
+        payload['tshirt_sizes'] = TSHIRT_SIZES
+
+    response = jsonify(payload)
+    response.set_etag(version)
+    return response
 
 
 @checkin.route('/api/tournament/<int:tournament_id>/checkin', methods=['POST'])
@@ -657,46 +760,363 @@ def api_create_checkin(tournament_id):
         return jsonify({'error': str(e)}), 400
 
 
+def _insert_ignore(table):
+    """INSERT that silently skips rows violating a unique constraint.
+
+    ON CONFLICT DO NOTHING on Postgres, INSERT OR IGNORE on SQLite; None for other
+    databases (callers fall back to one savepoint per row).
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).prefix_with('OR IGNORE')
+    return None
+
+
+def _offline_checkin_row(tournament_id, item, device_id, now):
+    """Validate one offline check-in item into an insert row (raises ValueError)."""
+    if not item.get('date_of_birth'):
+        raise ValueError('date_of_birth is required')
+    dob = datetime.strptime(item['date_of_birth'], '%Y-%m-%d').date()
+    offline_created_at = _parse_since(item.get('offline_created_at'))
+    key = item.get('idempotency_key') or item.get('client_id')
+    return {
+        'tournament_id': tournament_id,
+        'participant_id': item['participant_id'],
+        'emergency_contact_name': item.get('emergency_contact_name'),
+        'emergency_contact_phone': item.get('emergency_contact_phone'),
+        'date_of_birth': dob,
+        'liability_accepted': bool(item.get('liability_accepted', False)),
+        'phone_number': item.get('phone_number'),
+        'whatsapp_optin': bool(item.get('whatsapp_optin', False)),
+        'tshirt_size': item.get('tshirt_size'),
+        'checked_in_by': 'staff_offline',
+        'checkin_method': 'staff_station_offline',
+        'device_id': item.get('device_id') or device_id,
+        'synced_to_server': True,
+        'synced_at': now,
+        'offline_created_at': offline_created_at,
+        'idempotency_key': str(key)[:64] if key else None,
+    }
+
+
+def ingest_offline_checkins(tournament_id, items, device_id=None):
+    """Set-based ingestion of an offline check-in batch. Returns per-item results.
+
+    Participants and already-stored check-ins / idempotency keys are resolved with
+    one query each, and new rows go in with a single conflict-ignoring INSERT, so a
+    bad or duplicate row only affects itself. Items carrying an already stored
+    `idempotency_key` report 'duplicate' - retrying an upload is a no-op.
+    Does not commit.
+    """
+    C, P = TournamentCheckin, TournamentParticipant
+    now = datetime.utcnow()
+    results = []
+    candidates = []  # (result, row)
+
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({'participant_id': None, 'status': 'error', 'error': 'invalid item'})
+            continue
+        try:
+            item = dict(item)
+            item['participant_id'] = int(item.get('participant_id'))
+        except (TypeError, ValueError):
+            results.append({'participant_id': item.get('participant_id'), 'status': 'error',
+                            'error': 'invalid participant_id'})
+            continue
+        result = {'participant_id': item['participant_id']}
+        if item.get('idempotency_key') or item.get('client_id'):
+            result['idempotency_key'] = item.get('idempotency_key') or item.get('client_id')
+        results.append(result)
+        try:
+            candidates.append((result, _offline_checkin_row(tournament_id, item, device_id, now)))
+        except (TypeError, ValueError) as e:
+            result.update(status='error', error=str(e))
+
+    if not candidates:
+        return results
+
+    ids = {row['participant_id'] for _, row in candidates}
+    keys = {row['idempotency_key'] for _, row in candidates if row['idempotency_key']}
+
+    countries = dict(db.session.execute(
+        db.select(P.id, P.country).where(P.tournament_id == tournament_id, P.id.in_(ids))).all())
+    known_ids = set(countries)
+    stored = db.session.execute(db.select(C.participant_id, C.idempotency_key).where(
+        db.or_(db.and_(C.tournament_id == tournament_id, C.participant_id.in_(ids)),
+               C.idempotency_key.in_(keys) if keys else db.false()))).all()
+    checked_in_ids = {pid for pid, _ in stored}
+    stored_keys = {key for _, key in stored if key}
+
+    rows = []
+    seen = set()
+    for result, row in candidates:
+        if row['idempotency_key'] and row['idempotency_key'] in stored_keys:
+            result['status'] = 'duplicate'
+        elif row['participant_id'] not in known_ids:
+            result.update(status='error', error='unknown participant')
+        elif row['participant_id'] in checked_in_ids or row['participant_id'] in seen:
+            result['status'] = 'skipped'
+        else:
+            seen.add(row['participant_id'])
+            rows.append((result, row))
+
+    if not rows:
+        return results
+
+    stmt = _insert_ignore(C.__table__)
+    if stmt is not None:
+        inserted = set(db.session.scalars(
+            stmt.returning(C.participant_id), [row for _, row in rows]))
+    else:
+        inserted = set()
+        for _, row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(C.__table__.insert(), row)
+                inserted.add(row['participant_id'])
+            except Exception:
+                pass
+
+    for result, row in rows:
+        # Not inserted = lost a race against a concurrent sync of the same participant.
+        result['status'] = 'synced' if row['participant_id'] in inserted else 'skipped'
+
+    if inserted:
+        # Core insert bypasses the ORM flush hooks - update and publish the counters here
+        conn = db.session.connection()
+        deltas = {('checkin', tournament_id, '', ''): {'checked_in': len(inserted)}}
+        for participant_id in inserted:
+            key = ('checkin', tournament_id, 'country', countries[participant_id] or '')
+            deltas.setdefault(key, {'checked_in': 0})['checked_in'] += 1
+        checkin_counters.apply(conn, deltas)
+        live_events.publish(conn, f'checkin:{tournament_id}', 'stats', _checkin_counts(conn, tournament_id))
+    return results
+
+
+def _count_statuses(results):
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    return counts
+
+
 @checkin.route('/api/tournament/<int:tournament_id>/checkin/sync', methods=['POST'])
 def api_sync_checkins(tournament_id):
-    """Sync offline check-ins"""
-    data = request.get_json()
-    results = []
-    
-    for checkin_data in data.get('checkins', []):
+    """Sync offline check-ins (set-based, per-row conflict handling, idempotent)
+
+    With `?async=1` (or `"mode": "async"` in the body) the raw batch is stored in
+    CheckinSyncQueue and acknowledged with 202 + batch id straight away; poll
+    `/checkin/sync/<batch_id>` for the outcome.
+    """
+    data = request.get_json(silent=True) or {}
+
+    if request.args.get('async') in ('1', 'true') or data.get('mode') == 'async':
+        return _enqueue_sync_batch(tournament_id, data)
+
+    try:
+        results = ingest_offline_checkins(tournament_id, data.get('checkins', []), data.get('device_id'))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({'success': True, 'results': results, 'counts': _count_statuses(results)})
+
+
+# ============================================================================
+# ASYNC SYNC QUEUE
+# ============================================================================
+# Batches are drained oldest-first by a background thread started on demand in
+# the receiving process. On hosts that freeze idle processes the status endpoint
+# restarts it, and `flask checkin process-sync-queue` drains from cron.
+
+_sync_worker_lock = threading.Lock()
+_sync_worker = None
+
+
+def _enqueue_sync_batch(tournament_id, data):
+    checkins = data.get('checkins')
+    if not isinstance(checkins, list):
+        return jsonify({'success': False, 'error': 'checkins must be a list'}), 400
+
+    batch = CheckinSyncQueue(
+        device_id=(data.get('device_id') or 'unknown')[:100],
+        tournament_id=tournament_id,
+        payload=data,
+        created_offline_at=_parse_since(data.get('created_offline_at')) or datetime.utcnow(),
+    )
+    try:
+        db.session.add(batch)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    start_sync_worker()
+    return jsonify({
+        'success': True, 'batch_id': batch.id, 'queued': len(checkins),
+        'status_url': url_for('checkin.api_sync_batch_status', tournament_id=tournament_id, batch_id=batch.id),
+    }), 202
+
+
+def process_sync_queue(limit=None):
+    """Process queued sync batches in arrival order. Returns number of batches handled.
+
+    Each batch is claimed with FOR UPDATE SKIP LOCKED (Postgres; a no-op on SQLite)
+    and ingested + marked in one transaction. Ingestion is idempotent, so a batch
+    re-run after a crash cannot double check-in anyone.
+    """
+    handled = 0
+    while limit is None or handled < limit:
+        batch = db.session.scalars(
+            db.select(CheckinSyncQueue)
+            .where(CheckinSyncQueue.processed.is_(False))
+            .order_by(CheckinSyncQueue.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if batch is None:
+            break
+
+        payload = batch.payload or {}
         try:
-            existing = TournamentCheckin.query.filter_by(participant_id=checkin_data.get('participant_id')).first()
-            if existing:
-                results.append({'participant_id': checkin_data.get('participant_id'), 'status': 'skipped'})
-                continue
-            
-            dob = datetime.strptime(checkin_data.get('date_of_birth'), '%Y-%m-%d').date() if checkin_data.get('date_of_birth') else None
-            
-            checkin_record = TournamentCheckin(
-                tournament_id=tournament_id,
-                participant_id=checkin_data.get('participant_id'),
-                emergency_contact_name=checkin_data.get('emergency_contact_name'),
-                emergency_contact_phone=checkin_data.get('emergency_contact_phone'),
-                date_of_birth=dob,
-                liability_accepted=checkin_data.get('liability_accepted', False),
-                phone_number=checkin_data.get('phone_number'),
-                whatsapp_optin=checkin_data.get('whatsapp_optin', False),
-                tshirt_size=checkin_data.get('tshirt_size'),
-                checked_in_by='staff_offline',
-                checkin_method='staff_station_offline',
-                device_id=data.get('device_id'),
-                synced_to_server=True,
-                synced_at=datetime.utcnow()
-            )
-            
-            db.session.add(checkin_record)
-            results.append({'participant_id': checkin_data.get('participant_id'), 'status': 'synced'})
-            
+            results = ingest_offline_checkins(batch.tournament_id, payload.get('checkins', []), batch.device_id)
+            batch.result = {'results': results, 'counts': _count_statuses(results)}
+            batch.sync_error = None
         except Exception as e:
-            results.append({'participant_id': checkin_data.get('participant_id'), 'status': 'error', 'error': str(e)})
-    
+            db.session.rollback()
+            batch = db.session.get(CheckinSyncQueue, batch.id)
+            batch.sync_error = str(e)[:2000]
+        batch.processed = True
+        batch.processed_at = datetime.utcnow()
+        db.session.commit()
+        handled += 1
+    return handled
+
+
+def _run_sync_worker(app):
+    with app.app_context():
+        try:
+            process_sync_queue()
+        finally:
+            db.session.remove()
+
+
+def start_sync_worker():
+    """Start the background queue drainer unless one is already running in this process."""
+    global _sync_worker
+    with _sync_worker_lock:
+        if _sync_worker is not None and _sync_worker.is_alive():
+            return False
+        _sync_worker = threading.Thread(
+            target=_run_sync_worker, args=(current_app._get_current_object(),),
+            name='checkin-sync-worker', daemon=True)
+        _sync_worker.start()
+        return True
+
+
+@checkin.route('/api/tournament/<int:tournament_id>/checkin/sync/<int:batch_id>')
+def api_sync_batch_status(tournament_id, batch_id):
+    """Status (and per-item results once processed) of a queued sync batch"""
+    batch = CheckinSyncQueue.query.filter_by(id=batch_id, tournament_id=tournament_id).first_or_404()
+
+    if not batch.processed:
+        start_sync_worker()
+        ahead = CheckinSyncQueue.query.filter(
+            CheckinSyncQueue.processed.is_(False), CheckinSyncQueue.id < batch.id).count()
+        return jsonify({'batch_id': batch.id, 'status': 'queued', 'ahead': ahead,
+                        'received_at': batch.received_at.isoformat() if batch.received_at else None})
+
+    response = {
+        'batch_id': batch.id,
+        'status': 'failed' if batch.sync_error else 'processed',
+        'processed_at': batch.processed_at.isoformat() if batch.processed_at else None,
+        'error': batch.sync_error,
+    }
+    response.update(batch.result or {})
+    return jsonify(response)
+
+
+@checkin.cli.command('process-sync-queue')
+def process_sync_queue_command():
+    """Drain queued offline check-in batches."""
+    print(f"Processed {process_sync_queue()} batch(es)")
+
+
+@checkin.cli.command('rebuild-counters')
+def rebuild_counters_command():
+    """Rebuild all check-in counters from the roster tables."""
+    rosters = checkin_counters.reconcile_all(db.session)
     db.session.commit()
-    return jsonify({'success': True, 'results': results})
+    print(f"Rebuilt counters for {rosters} roster(s)")
+
+
+@checkin.cli.command('generate-passes')
+@click.argument('tournament_id', type=int)
+@click.option('--out', 'out_path', default=None, help='Output .zip file or folder (default: passes_<id>.zip)')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+def generate_passes_command(tournament_id, out_path, workers):
+    """Pre-generate Apple Wallet passes for every checked-in participant."""
+    import os
+    import time
+    import zipfile
+
+    if not WALLET_PASS_MODULE_AVAILABLE or not is_apple_wallet_available():
+        raise click.ClickException('Apple Wallet is not configured')
+    from wallet_pass import pass_job, pass_identity, generate_passes_bulk
+
+    tournament = Event.query.get(tournament_id)
+    if not tournament:
+        raise click.ClickException(f'Tournament {tournament_id} not found')
+
+    rows = db.session.query(TournamentParticipant, TournamentCheckin).join(
+        TournamentCheckin, TournamentCheckin.participant_id == TournamentParticipant.id
+    ).filter(TournamentParticipant.tournament_id == tournament_id).all()
+    wallet_passes = passkit.ensure_passes('checkin', [
+        (checkin_record.id, *pass_identity(participant, tournament, checkin_record))
+        for participant, checkin_record in rows
+    ])
+    db.session.commit()
+    web_service_url = passkit.web_service_url()
+    jobs = [pass_job(participant, tournament, checkin_record,
+                     wallet_passes[checkin_record.id].web_service_fields(web_service_url))
+            for participant, checkin_record in rows]
+    out_path = out_path or f'passes_{tournament_id}.zip'
+    print(f"Generating {len(jobs)} pass(es) for {tournament.name} -> {out_path}")
+
+    to_zip = out_path.endswith('.zip')
+    if to_zip:
+        archive = zipfile.ZipFile(out_path, 'w', zipfile.ZIP_STORED)  # .pkpass files are already compressed
+    else:
+        os.makedirs(out_path, exist_ok=True)
+
+    started = time.perf_counter()
+    done, failures = 0, []
+    try:
+        for filename, data, error in generate_passes_bulk(jobs, workers=workers):
+            if error:
+                failures.append((filename, error))
+                continue
+            if to_zip:
+                archive.writestr(filename, data)
+            else:
+                with open(os.path.join(out_path, filename), 'wb') as f:
+                    f.write(data)
+            done += 1
+    finally:
+        if to_zip:
+            archive.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Generated {done} pass(es) in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f}/s), "
+          f"{len(failures)} failed")
+    for filename, error in failures[:20]:
+        print(f"  FAILED {filename}: {error}")
 
 
 @checkin.route('/api/tournament/<int:tournament_id>/checkin/<int:checkin_id>/pack', methods=['POST'])
@@ -711,14 +1131,34 @@ def api_mark_pack_received(tournament_id, checkin_id):
     return jsonify({'success': True})
 
 
+def _checkin_counts(conn, tournament_id):
+    """Check-in counters for a tournament (maintained counter row)"""
+    counts = checkin_counters.totals(conn, 'checkin', tournament_id)
+    return {
+        'total': counts['total'], 'checked_in': counts['checked_in'], 'pending': counts['pending'],
+        'packs_given': counts['welcome_packs'], 'updated_at': datetime.utcnow().isoformat()
+    }
+
+
+def _tournament_counts(conn, channel):
+    return _checkin_counts(conn, int(channel.split(':')[1]))
+
+
+live_events.watch(TournamentParticipant, [], lambda conn, p: f'checkin:{p.tournament_id}', _tournament_counts)
+live_events.watch(
+    TournamentCheckin, ['welcome_pack_received'], lambda conn, c: f'checkin:{c.tournament_id}', _tournament_counts,
+    lambda c, kind: {'kind': kind, 'participant_id': c.participant_id,
+                     'welcome_pack': bool(c.welcome_pack_received)})
+
+
 @checkin.route('/api/tournament/<int:tournament_id>/checkin/status')
 def api_checkin_status(tournament_id):
     """Get check-in statistics"""
-    total = TournamentParticipant.query.filter_by(tournament_id=tournament_id).count()
-    checked_in = TournamentCheckin.query.filter_by(tournament_id=tournament_id).count()
-    packs_given = TournamentCheckin.query.filter_by(tournament_id=tournament_id, welcome_pack_received=True).count()
-    
-    return jsonify({
-        'total': total, 'checked_in': checked_in, 'pending': total - checked_in,
-        'packs_given': packs_given, 'updated_at': datetime.utcnow().isoformat()
-    })
+    return jsonify(_checkin_counts(db.session, tournament_id))
+
+
+@checkin.route('/api/tournament/<int:tournament_id>/checkin/stream')
+def api_checkin_stream(tournament_id):
+    """Check-in statistics pushed via SSE (one event per committed change)"""
+    return live_events.stream(f'checkin:{tournament_id}',
+                              snapshot=lambda: _checkin_counts(db.session, tournament_id))
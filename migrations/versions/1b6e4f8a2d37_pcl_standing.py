@@ -0,0 +1,74 @@
+"""maintained pcl standings
+
+Revision ID: 1b6e4f8a2d37
+Revises: f3b7d1a9c624
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b6e4f8a2d37'
+down_revision = 'f3b7d1a9c624'
+branch_labels = None
+depends_on = None
+
+
+# One row per team; mirrors utils/pcl_standings._contribution (completed
+# matches only, 1 point per win, discipline differential from the team's side)
+STANDINGS = """
+    SELECT t.tournament_id, t.id,
+           COUNT(m.id),
+           SUM(CASE WHEN m.winner_id = t.id THEN 1 ELSE 0 END),
+           SUM(CASE WHEN m.id IS NOT NULL AND (m.winner_id IS NULL OR m.winner_id <> t.id) THEN 1 ELSE 0 END),
+           SUM(CASE WHEN m.winner_id = t.id THEN 1 ELSE 0 END),
+           SUM(CASE WHEN m.team_home_id = t.id THEN COALESCE(m.home_score, 0) - COALESCE(m.away_score, 0)
+                    WHEN m.team_away_id = t.id THEN COALESCE(m.away_score, 0) - COALESCE(m.home_score, 0)
+                    ELSE 0 END)
+    FROM pcl_team t
+    LEFT JOIN pcl_match m ON m.tournament_id = t.tournament_id AND m.status = 'completed'
+                         AND (m.team_home_id = t.id OR m.team_away_id = t.id)
+    GROUP BY t.tournament_id, t.id
+"""
+FIELDS = ('played', 'wins', 'losses', 'points', 'diff')
+
+
+def _backfill(bind):
+    """Rebuild every team's standing row; writers only add deltas to them."""
+    standing = sa.table('pcl_standing', *[sa.column(c) for c in ('tournament_id', 'team_id') + FIELDS])
+    rows = [{'tournament_id': tournament_id, 'team_id': team_id,
+             **{f: value or 0 for f, value in zip(FIELDS, values)}}
+            for tournament_id, team_id, *values in bind.execute(sa.text(STANDINGS))]
+    bind.execute(standing.delete())
+    if rows:
+        bind.execute(standing.insert(), rows)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('pcl_standing'):
+        op.create_table(
+            'pcl_standing',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tournament_id', sa.Integer(), nullable=False),
+            sa.Column('team_id', sa.Integer(), nullable=False),
+            sa.Column('played', sa.Integer(), nullable=False),
+            sa.Column('wins', sa.Integer(), nullable=False),
+            sa.Column('losses', sa.Integer(), nullable=False),
+            sa.Column('points', sa.Integer(), nullable=False),
+            sa.Column('diff', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['tournament_id'], ['pcl_tournament.id']),
+            sa.ForeignKeyConstraint(['team_id'], ['pcl_team.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('team_id'),
+        )
+        op.create_index('ix_pcl_standing_tournament_id', 'pcl_standing', ['tournament_id'])
+    _backfill(bind)
+
+
+def downgrade():
+    op.drop_index('ix_pcl_standing_tournament_id', table_name='pcl_standing')
+    op.drop_table('pcl_standing')
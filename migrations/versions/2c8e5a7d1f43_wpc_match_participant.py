@@ -0,0 +1,66 @@
+"""wpc match participant index
+
+Revision ID: 2c8e5a7d1f43
+Revises: 9d3f6b2e4c18
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8e5a7d1f43'
+down_revision = '9d3f6b2e4c18'
+branch_labels = None
+depends_on = None
+
+
+SLOTS = ('player1_name', 'player2_name', 'opponent1_name', 'opponent2_name')
+
+
+def _fold(text):
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in text).split())
+
+
+def upgrade():
+    bind = op.get_bind()
+    if 'wpc_match_participant' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'wpc_match_participant',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('match_id', sa.Integer(), sa.ForeignKey('wpc_match.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('player_id', sa.Integer(), sa.ForeignKey('wpc_player.id', ondelete='SET NULL'), nullable=True),
+            sa.Column('slot', sa.Integer(), nullable=False),
+            sa.Column('side', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.UniqueConstraint('match_id', 'slot', name='unique_wpc_match_slot'),
+        )
+        op.create_index('ix_wpc_match_participant_player', 'wpc_match_participant', ['player_id', 'match_id'])
+
+    # Backfill with exact name matches; `flask wpc_matches index-participants`
+    # re-runs the full resolver
+    if bind.execute(sa.text('SELECT COUNT(*) FROM wpc_match_participant')).scalar():
+        return
+    players = {}
+    for player_id, first_name, last_name in bind.execute(sa.text('SELECT id, first_name, last_name FROM wpc_player')):
+        key = _fold(f'{first_name} {last_name}')
+        players[key] = None if key in players else player_id
+
+    rows = []
+    for match in bind.execute(sa.text(f"SELECT id, {', '.join(SLOTS)} FROM wpc_match")).mappings():
+        for slot, column in enumerate(SLOTS):
+            if match[column]:
+                rows.append({'match_id': match['id'], 'slot': slot, 'side': 1 if slot < 2 else 2,
+                             'name': match[column], 'player_id': players.get(_fold(match[column]))})
+    if rows:
+        table = sa.table('wpc_match_participant', *(sa.column(c) for c in ('match_id', 'slot', 'side', 'name', 'player_id')))
+        op.bulk_insert(table, rows)
+
+
+def downgrade():
+    op.drop_table('wpc_match_participant')
@@ -0,0 +1,56 @@
+"""check-in delta sync: updated_at cursors and tombstones
+
+Revision ID: 3f1a9c0d2b71
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c0d2b71'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # db.create_all() may already have created these on a fresh database.
+    inspector = sa.inspect(op.get_bind())
+
+    if 'updated_at' not in _columns('tournament_participant'):
+        op.add_column('tournament_participant', sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute('UPDATE tournament_participant SET updated_at = imported_at')
+        op.create_index('ix_tournament_participant_updated_at', 'tournament_participant', ['updated_at'])
+
+    if 'updated_at' not in _columns('tournament_checkin'):
+        op.add_column('tournament_checkin', sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute('UPDATE tournament_checkin SET updated_at = COALESCE(welcome_pack_received_at, synced_at, checked_in_at)')
+        op.create_index('ix_tournament_checkin_updated_at', 'tournament_checkin', ['updated_at'])
+
+    if 'checkin_tombstone' not in inspector.get_table_names():
+        op.create_table(
+            'checkin_tombstone',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('tournament_id', sa.Integer(), nullable=False),
+            sa.Column('entity_type', sa.String(length=20), nullable=False),
+            sa.Column('entity_id', sa.Integer(), nullable=False),
+            sa.Column('participant_id', sa.Integer(), nullable=True),
+            sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_checkin_tombstone_tournament_id', 'checkin_tombstone', ['tournament_id'])
+        op.create_index('ix_checkin_tombstone_deleted_at', 'checkin_tombstone', ['deleted_at'])
+
+
+def downgrade():
+    op.drop_table('checkin_tombstone')
+    op.drop_index('ix_tournament_checkin_updated_at', table_name='tournament_checkin')
+    op.drop_column('tournament_checkin', 'updated_at')
+    op.drop_index('ix_tournament_participant_updated_at', table_name='tournament_participant')
+    op.drop_column('tournament_participant', 'updated_at')
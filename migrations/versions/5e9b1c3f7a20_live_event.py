@@ -0,0 +1,37 @@
+"""live_event table for SSE fan-out
+
+Revision ID: 5e9b1c3f7a20
+Revises: c4d7e2a9b815
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9b1c3f7a20'
+down_revision = 'c4d7e2a9b815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'live_event' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'live_event',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('channel', sa.String(length=64), nullable=False),
+        sa.Column('event', sa.String(length=50), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_live_event_channel', 'live_event', ['channel'])
+    op.create_index('ix_live_event_created_at', 'live_event', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_live_event_created_at', table_name='live_event')
+    op.drop_index('ix_live_event_channel', table_name='live_event')
+    op.drop_table('live_event')
@@ -0,0 +1,32 @@
+"""cache version counters
+
+Revision ID: 6f1b3d9a2e57
+Revises: 2c8e5a7d1f43
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1b3d9a2e57'
+down_revision = '2c8e5a7d1f43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'cache_version' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'cache_version',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(length=100), nullable=False, unique=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('cache_version')
@@ -0,0 +1,95 @@
+"""maintained check-in counters
+
+Revision ID: 7a4c2e8d9f16
+Revises: 5e9b1c3f7a20
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4c2e8d9f16'
+down_revision = '5e9b1c3f7a20'
+branch_labels = None
+depends_on = None
+
+
+# (scope, source tables, SQL) -> rows of tournament_id, team_id, country, total, checked_in,
+# welcome_packs, with_phone; mirrors utils/checkin_counters._source_counts
+ROSTERS = [
+    ('pcl', {'pcl_registration', 'pcl_team'}, """
+        SELECT t.tournament_id, r.team_id, t.country_code, COUNT(r.id),
+               SUM(CASE WHEN r.checked_in THEN 1 ELSE 0 END), 0, 0
+        FROM pcl_registration r JOIN pcl_team t ON t.id = r.team_id
+        GROUP BY t.tournament_id, r.team_id, t.country_code
+    """),
+    ('wpc', {'wpc_player'}, """
+        SELECT 0, NULL, country, COUNT(id),
+               SUM(CASE WHEN checked_in THEN 1 ELSE 0 END),
+               SUM(CASE WHEN welcome_pack_received THEN 1 ELSE 0 END),
+               SUM(CASE WHEN phone IS NOT NULL AND phone NOT IN ('', '-') THEN 1 ELSE 0 END)
+        FROM wpc_player
+        GROUP BY country
+    """),
+    ('checkin', {'tournament_participant', 'tournament_checkin'}, """
+        SELECT p.tournament_id, NULL, p.country, COUNT(p.id), COUNT(c.id),
+               SUM(CASE WHEN c.welcome_pack_received THEN 1 ELSE 0 END), 0
+        FROM tournament_participant p LEFT JOIN tournament_checkin c ON c.participant_id = p.id
+        GROUP BY p.tournament_id, p.country
+    """),
+]
+FIELDS = ('total', 'checked_in', 'welcome_packs', 'with_phone')
+
+
+def _backfill(bind, tables):
+    """Rebuild every roster's counter rows; writers only add deltas to them."""
+    counts = {}
+    for scope, sources, sql in ROSTERS:
+        if not sources <= tables:
+            continue
+        for tournament_id, team_id, country, *values in bind.execute(sa.text(sql)):
+            groups = [('', '')]
+            if team_id is not None:
+                groups.append(('team', str(team_id)))
+            groups.append(('country', country or ''))
+            for group_type, group_key in groups:
+                row = counts.setdefault((scope, tournament_id, group_type, group_key), dict.fromkeys(FIELDS, 0))
+                for field, value in zip(FIELDS, values):
+                    row[field] += value or 0
+
+    counter = sa.table('checkin_counter', *[sa.column(c) for c in
+                       ('scope', 'tournament_id', 'group_type', 'group_key') + FIELDS])
+    bind.execute(counter.delete())
+    if counts:
+        bind.execute(counter.insert(), [
+            {'scope': scope, 'tournament_id': tournament_id, 'group_type': group_type,
+             'group_key': group_key, **values}
+            for (scope, tournament_id, group_type, group_key), values in counts.items()
+        ])
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+    if 'checkin_counter' not in tables:
+        op.create_table(
+            'checkin_counter',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('scope', sa.String(length=20), nullable=False),
+            sa.Column('tournament_id', sa.Integer(), nullable=False),
+            sa.Column('group_type', sa.String(length=20), nullable=False),
+            sa.Column('group_key', sa.String(length=100), nullable=False),
+            sa.Column('total', sa.Integer(), nullable=False),
+            sa.Column('checked_in', sa.Integer(), nullable=False),
+            sa.Column('welcome_packs', sa.Integer(), nullable=False),
+            sa.Column('with_phone', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('scope', 'tournament_id', 'group_type', 'group_key', name='unique_checkin_counter'),
+        )
+    _backfill(bind, tables)
+
+
+def downgrade():
+    op.drop_table('checkin_counter')
@@ -0,0 +1,32 @@
+"""check-in sync: client idempotency keys
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f1a9c0d2b71
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f1a93'
+down_revision = '3f1a9c0d2b71'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if 'idempotency_key' not in _columns('tournament_checkin'):
+        op.add_column('tournament_checkin', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+        op.create_index('ix_tournament_checkin_idempotency_key', 'tournament_checkin',
+                        ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_tournament_checkin_idempotency_key', table_name='tournament_checkin')
+    op.drop_column('tournament_checkin', 'idempotency_key')
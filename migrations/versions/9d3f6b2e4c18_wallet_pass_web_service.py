@@ -0,0 +1,54 @@
+"""passkit web service: issued passes and device registrations
+
+Revision ID: 9d3f6b2e4c18
+Revises: 7a4c2e8d9f16
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f6b2e4c18'
+down_revision = '7a4c2e8d9f16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'wallet_pass' not in tables:
+        op.create_table(
+            'wallet_pass',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('pass_type_id', sa.String(length=255), nullable=False),
+            sa.Column('serial_number', sa.String(length=100), nullable=False),
+            sa.Column('auth_token', sa.String(length=64), nullable=False),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('source_id', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('pass_type_id', 'serial_number', name='unique_wallet_pass_serial'),
+        )
+        op.create_index('ix_wallet_pass_updated_at', 'wallet_pass', ['updated_at'])
+        op.create_index('ix_wallet_pass_source', 'wallet_pass', ['kind', 'source_id'])
+
+    if 'wallet_pass_registration' not in tables:
+        op.create_table(
+            'wallet_pass_registration',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('device_library_id', sa.String(length=255), nullable=False),
+            sa.Column('push_token', sa.String(length=255), nullable=True),
+            sa.Column('pass_id', sa.Integer(), sa.ForeignKey('wallet_pass.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('device_library_id', 'pass_id', name='unique_wallet_pass_device'),
+        )
+        op.create_index('ix_wallet_pass_registration_device_library_id', 'wallet_pass_registration',
+                        ['device_library_id'])
+
+
+def downgrade():
+    op.drop_table('wallet_pass_registration')
+    op.drop_table('wallet_pass')
@@ -0,0 +1,54 @@
+"""wpc player normalized phone and pool-invite queue index
+
+Revision ID: a3e7c1f5b920
+Revises: 6f1b3d9a2e57
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e7c1f5b920'
+down_revision = '6f1b3d9a2e57'
+branch_labels = None
+depends_on = None
+
+
+def _to_e164(phone):
+    # Same rules as utils.phone.to_e164 at the time of this migration
+    if not phone:
+        return None
+    digits = re.sub(r'\D', '', phone)
+    digits = digits[2:] if digits.startswith('00') else digits
+    return '+' + digits if len(digits) >= 8 else None  # WPC_MIN_DIGITS
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {c['name'] for c in inspector.get_columns('wpc_player')}
+    indexes = {i['name'] for i in inspector.get_indexes('wpc_player')}
+
+    if 'phone_e164' not in columns:
+        op.add_column('wpc_player', sa.Column('phone_e164', sa.String(length=20), nullable=True))
+    if 'ix_wpc_player_phone_e164' not in indexes:
+        op.create_index('ix_wpc_player_phone_e164', 'wpc_player', ['phone_e164'])
+    if 'ix_wpc_player_invite_queue' not in indexes:
+        op.create_index('ix_wpc_player_invite_queue', 'wpc_player', ['country', 'last_name', 'id'])
+
+    rows = [{'row_id': player_id, 'phone_e164': _to_e164(phone)}
+            for player_id, phone in bind.execute(sa.text(
+                'SELECT id, phone FROM wpc_player WHERE phone IS NOT NULL AND phone_e164 IS NULL'))]
+    rows = [row for row in rows if row['phone_e164']]
+    if rows:
+        bind.execute(sa.text('UPDATE wpc_player SET phone_e164 = :phone_e164 WHERE id = :row_id'), rows)
+
+
+def downgrade():
+    op.drop_index('ix_wpc_player_invite_queue', table_name='wpc_player')
+    op.drop_index('ix_wpc_player_phone_e164', table_name='wpc_player')
+    op.drop_column('wpc_player', 'phone_e164')
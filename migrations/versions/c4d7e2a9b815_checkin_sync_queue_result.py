@@ -0,0 +1,29 @@
+"""check-in sync queue: per-batch result and processed index
+
+Revision ID: c4d7e2a9b815
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d7e2a9b815'
+down_revision = '8b2e4d6f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'result' not in {c['name'] for c in inspector.get_columns('checkin_sync_queue')}:
+        op.add_column('checkin_sync_queue', sa.Column('result', sa.JSON(), nullable=True))
+    if 'ix_checkin_sync_queue_processed' not in {i['name'] for i in inspector.get_indexes('checkin_sync_queue')}:
+        op.create_index('ix_checkin_sync_queue_processed', 'checkin_sync_queue', ['processed'])
+
+
+def downgrade():
+    op.drop_index('ix_checkin_sync_queue_processed', table_name='checkin_sync_queue')
+    op.drop_column('checkin_sync_queue', 'result')
@@ -0,0 +1,56 @@
+"""normalized phone columns on player, pcl_registration and pool_player
+
+Revision ID: d8f2a6c4e193
+Revises: a3e7c1f5b920
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f2a6c4e193'
+down_revision = 'a3e7c1f5b920'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('player', 'pcl_registration', 'pool_player')
+
+
+def _to_e164(phone):
+    # Same rules as utils.phone.to_e164 at the time of this migration
+    if not phone:
+        return None
+    digits = re.sub(r'\D', '', phone)
+    digits = digits[2:] if digits.startswith('00') else digits
+    return '+' + digits if len(digits) >= 9 else None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table in TABLES:
+        columns = {c['name'] for c in inspector.get_columns(table)}
+        indexes = {i['name'] for i in inspector.get_indexes(table)}
+        if 'phone_e164' not in columns:
+            op.add_column(table, sa.Column('phone_e164', sa.String(length=20), nullable=True))
+        if f'ix_{table}_phone_e164' not in indexes:
+            op.create_index(f'ix_{table}_phone_e164', table, ['phone_e164'])
+
+        rows = [{'row_id': row_id, 'phone_e164': _to_e164(phone)}
+                for row_id, phone in bind.execute(sa.text(
+                    f'SELECT id, phone FROM {table} WHERE phone IS NOT NULL AND phone_e164 IS NULL'))]
+        rows = [row for row in rows if row['phone_e164']]
+        if rows:
+            bind.execute(sa.text(f'UPDATE {table} SET phone_e164 = :phone_e164 WHERE id = :row_id'), rows)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_index(f'ix_{table}_phone_e164', table_name=table)
+        op.drop_column(table, 'phone_e164')
@@ -0,0 +1,34 @@
+"""scoring: idempotency key for queued court-manager score submits
+
+Revision ID: e5a9c3d7b261
+Revises: d8f2a6c4e193
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d7b261'
+down_revision = 'd8f2a6c4e193'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # `match` is created by db.create_all(); only extend it where it already exists
+    if not sa.inspect(op.get_bind()).has_table('match'):
+        return
+    if 'score_idempotency_key' not in _columns('match'):
+        op.add_column('match', sa.Column('score_idempotency_key', sa.String(length=64), nullable=True))
+        op.create_index('ix_match_score_idempotency_key', 'match', ['score_idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_match_score_idempotency_key', table_name='match')
+    op.drop_column('match', 'score_idempotency_key')
@@ -0,0 +1,34 @@
+"""scoring: stable schedule key for idempotent re-import
+
+Revision ID: f3b7d1a9c624
+Revises: e5a9c3d7b261
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b7d1a9c624'
+down_revision = 'e5a9c3d7b261'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # `match` is created by db.create_all(); only extend it where it already exists
+    if not sa.inspect(op.get_bind()).has_table('match'):
+        return
+    if 'schedule_key' not in _columns('match'):
+        op.add_column('match', sa.Column('schedule_key', sa.String(length=255), nullable=True))
+        op.create_index('ix_match_schedule_key', 'match', ['schedule_key'])
+
+
+def downgrade():
+    op.drop_index('ix_match_schedule_key', table_name='match')
+    op.drop_column('match', 'schedule_key')
@@ -1,7 +1,10 @@
 ﻿from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from datetime import datetime
 import secrets
 
+from utils.phone import to_e164, WPC_MIN_DIGITS
+
 db = SQLAlchemy()
 
 # ============================================================================
@@ -22,7 +25,8 @@ class Player(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
-    phone = db.Column(db.String(20), unique=True, nullable=False, index=True)  # Indexed for WhatsApp lookups
+    phone = db.Column(db.String(20), unique=True, nullable=False, index=True)
+    phone_e164 = db.Column(db.String(20), nullable=True, index=True)  # Normalized from phone on write; WhatsApp lookups
     email = db.Column(db.String(120), unique=True, nullable=True)
     skill_level = db.Column(db.String(10), nullable=True)
     city = db.Column(db.String(100), nullable=True)
@@ -48,6 +52,11 @@ class Player(db.Model):
     def __repr__(self):
         return f'<Player {self.first_name} {self.last_name}>'
     
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_e164 = to_e164(phone)
+        return phone
+    
     def generate_update_token(self):
         """Generate a unique token for profile updates"""
         self.update_token = secrets.token_urlsafe(32)
@@ -217,16 +226,18 @@ class PCLTournament(db.Model):
     def __repr__(self):
         return f'<PCLTournament {self.name}>'
     
-    def get_stats(self):
-        """Get tournament statistics"""
-        teams = self.teams.all()
-        total_players = sum(team.registrations.count() for team in teams)
-        complete_players = sum(
-            team.registrations.filter_by(status='complete').count() 
-            for team in teams
-        )
+    def get_team_stats(self):
+        """{team_id: team stats} for every team of this tournament (see PCLTeam.stats_for)"""
+        return PCLTeam.stats_for(self.teams.all())
+
+    def get_stats(self, team_stats=None):
+        """Get tournament statistics (from get_team_stats() unless passed in)"""
+        if team_stats is None:
+            team_stats = self.get_team_stats()
+        total_players = sum(stats['registrations'] for stats in team_stats.values())
+        complete_players = sum(stats['complete'] for stats in team_stats.values())
         return {
-            'total_teams': len(teams),
+            'total_teams': len(team_stats),
             'total_players': total_players,
             'complete_players': complete_players,
             'completion_rate': round(complete_players / total_players * 100, 1) if total_players > 0 else 0
@@ -303,32 +314,71 @@ class PCLTeam(db.Model):
             return True
         return False
 
+    # Counted per team by stats_for(); 'total'/'men'/'women' exclude non-playing
+    # captains, 'registrations'/'complete' count every registration.
+    STAT_COUNTS = ('registrations', 'complete', 'total', 'men', 'women', 'captains',
+                   'men_complete', 'women_complete', 'men_with_photo', 'women_with_photo')
+
     def get_stats(self):
         """Get team registration statistics"""
-        # Use direct query to avoid lazy loading issues
-        registrations = PCLRegistration.query.filter_by(team_id=self.id).all()
+        return PCLTeam.stats_for([self])[self.id]
+
+    @classmethod
+    def stats_for(cls, teams):
+        """{team.id: get_stats() dict} for many teams from one GROUP BY query."""
+        teams = list(teams)
+        if not teams:
+            return {}
+        R = PCLRegistration
+
+        def count(*conditions):
+            return db.func.coalesce(db.func.sum(db.case((db.and_(*conditions), 1), else_=0)), 0)
+
+        playing = db.or_(db.func.coalesce(R.is_captain, False) == False,
+                         db.func.coalesce(R.is_playing, False) == True)
+        male, female = R.gender == 'male', R.gender == 'female'
+        complete = R.status == 'complete'
+        photo = db.and_(R.photo_filename.isnot(None), R.photo_filename != '')
+
+        rows = db.session.query(
+            R.team_id,
+            db.func.count(R.id), count(complete), count(playing),
+            count(playing, male), count(playing, female), count(R.is_captain == True),
+            count(playing, male, complete), count(playing, female, complete),
+            count(playing, male, photo), count(playing, female, photo),
+        ).filter(R.team_id.in_({team.id for team in teams})).group_by(R.team_id).all()
+
+        counts = {row[0]: dict(zip(cls.STAT_COUNTS, row[1:])) for row in rows}
+        empty = dict.fromkeys(cls.STAT_COUNTS, 0)
+        return {team.id: team._stats(counts.get(team.id, empty)) for team in teams}
+
+    def stats_from_registrations(self, registrations):
+        """get_stats() computed from this team's already loaded registrations"""
         playing = [r for r in registrations if not (r.is_captain and not r.is_playing)]
         men = [r for r in playing if r.gender == 'male']
         women = [r for r in playing if r.gender == 'female']
-        captains = [r for r in registrations if r.is_captain]
-
-        men_complete = len([r for r in men if r.status == 'complete'])
-        women_complete = len([r for r in women if r.status == 'complete'])
 
-        return {
+        return self._stats({
+            'registrations': len(registrations),
+            'complete': len([r for r in registrations if r.status == 'complete']),
             'total': len(playing),
             'men': len(men),
             'women': len(women),
-            'captains': len(captains),
-            'men_complete': men_complete,
-            'women_complete': women_complete,
+            'captains': len([r for r in registrations if r.is_captain]),
+            'men_complete': len([r for r in men if r.status == 'complete']),
+            'women_complete': len([r for r in women if r.status == 'complete']),
             'men_with_photo': len([r for r in men if r.photo_filename]),
             'women_with_photo': len([r for r in women if r.photo_filename]),
+        })
+
+    def _stats(self, counts):
+        return {
+            **counts,
             'is_complete': (
-                len(men) >= self.min_men and
-                len(women) >= self.min_women and
-                men_complete >= self.min_men and
-                women_complete >= self.min_women
+                counts['men'] >= self.min_men and
+                counts['women'] >= self.min_women and
+                counts['men_complete'] >= self.min_men and
+                counts['women_complete'] >= self.min_women
             )
         }
 
@@ -346,6 +396,7 @@ class PCLRegistration(db.Model):
     last_name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=True)  # Made optional for quick add
     phone = db.Column(db.String(20), nullable=True)
+    phone_e164 = db.Column(db.String(20), nullable=True, index=True)  # Normalized from phone on write
     
     # Demographics
     gender = db.Column(db.String(10), nullable=False)
@@ -408,6 +459,11 @@ class PCLRegistration(db.Model):
     def __repr__(self):
         return f'<PCLRegistration {self.first_name} {self.last_name}>'
     
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_e164 = to_e164(phone)
+        return phone
+    
     # ========== NEW: Token methods ==========
     def generate_profile_token(self):
         """Generate a unique token for profile completion"""
@@ -828,9 +884,31 @@ class PCLMatch(db.Model):
             return 'away'
         return None
 
+    # match_type -> PCLMatchResult, read once and shared by the helpers below.
+    # Dropped when the match is expired/refreshed (e.g. on commit).
+    _results_snapshot = None
+
     def results_by_type(self):
-        """Map of match_type -> PCLMatchResult for this match."""
-        return {r.match_type: r for r in self.results.all()}
+        """Map of match_type -> PCLMatchResult for this match (loaded once)."""
+        if self._results_snapshot is None:
+            self._results_snapshot = {r.match_type: r for r in self.results.all()}
+        return self._results_snapshot
+
+    def invalidate_results(self):
+        """Forget the results snapshot; the next helper call reads them again."""
+        self._results_snapshot = None
+
+    @classmethod
+    def preload_results(cls, matches):
+        """Load the results of all `matches` with one query (for list views)."""
+        matches = [m for m in matches if m.id is not None]
+        if not matches:
+            return
+        for m in matches:
+            m._results_snapshot = {}
+        by_id = {m.id: m for m in matches}
+        for r in PCLMatchResult.query.filter(PCLMatchResult.match_id.in_(by_id)).all():
+            by_id[r.match_id]._results_snapshot[r.match_type] = r
 
     def get_doubles_standing(self):
         """(home_wins, away_wins) counting only decided doubles (wd/md/mx1/mx2)."""
@@ -874,6 +952,13 @@ class PCLMatch(db.Model):
         return None
 
 
+@db.event.listens_for(PCLMatch, 'expire')
+@db.event.listens_for(PCLMatch, 'refresh')
+def _drop_results_snapshot(target, *args):
+    """Results may have changed in another transaction once the match is stale."""
+    target._results_snapshot = None
+
+
 class PCLLineup(db.Model):
     """A team's lineup submission for a match (12 player slots)."""
     __tablename__ = 'pcl_lineup'
@@ -938,17 +1023,46 @@ class PCLLineup(db.Model):
         """True once the lineup has been submitted."""
         return self.submitted_at is not None
 
-    def validate(self):
+    def player_ids(self):
+        """The 12 slot ids in SLOT_FIELDS order (None for empty slots)."""
+        return [getattr(self, field) for field, _ in self.SLOT_FIELDS]
+
+    @staticmethod
+    def load_roster(ids):
+        """{id: PCLRegistration} for `ids`, one IN query."""
+        ids = {rid for rid in ids if rid}
+        if not ids:
+            return {}
+        return {r.id: r for r in PCLRegistration.query.filter(PCLRegistration.id.in_(ids)).all()}
+
+    @classmethod
+    def validate_many(cls, lineups, roster=None):
+        """Validate many lineups (e.g. a whole matchday) against one roster.
+
+        `roster` is a preloaded {id: PCLRegistration}; by default every player
+        referenced by the lineups is loaded with a single query. Returns a list
+        of (lineup, errors) in input order.
+        """
+        lineups = list(lineups)
+        if roster is None:
+            roster = cls.load_roster(rid for lineup in lineups for rid in lineup.player_ids())
+        return [(lineup, lineup.validate(roster)) for lineup in lineups]
+
+    def validate(self, roster=None):
         """Return a list of validation error strings (empty list = valid).
 
         Enforces the PCL lineup rules: correct gender per discipline, Mixed 2 must
         differ from Mixed 1, four distinct heartbreaker players, and that every
-        selected player belongs to the submitting team.
+        selected player belongs to the submitting team. The selected players are
+        looked up in `roster` ({id: PCLRegistration}), loaded with one query when
+        not given; ids missing from it count as empty slots.
         """
         errors = []
+        if roster is None:
+            roster = self.load_roster(self.player_ids())
 
         def reg(rid):
-            return PCLRegistration.query.get(rid) if rid else None
+            return roster.get(rid) if rid else None
 
         wd1, wd2 = reg(self.wd_player1_id), reg(self.wd_player2_id)
         md1, md2 = reg(self.md_player1_id), reg(self.md_player2_id)
@@ -1018,6 +1132,25 @@ class PCLMatchResult(db.Model):
         return f'<PCLMatchResult {self.match_type} {self.home_score}-{self.away_score}>'
 
 
+class PCLStanding(db.Model):
+    """Maintained standings row for one PCL team (its age category is the group).
+
+    Kept up to date in the same transaction as each match change by
+    utils/pcl_standings; rebuilt from the completed matches by its rebuild().
+    """
+    __tablename__ = 'pcl_standing'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('pcl_tournament.id'), nullable=False, index=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('pcl_team.id', ondelete='CASCADE'), nullable=False, unique=True)
+    played = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    diff = db.Column(db.Integer, nullable=False, default=0)  # discipline differential
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # ============================================================================
 # PLAYER POOL (public interest registration across all WPC/PCL tournaments)
 # ============================================================================
@@ -1031,6 +1164,7 @@ class PoolPlayer(db.Model):
     last_name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False, index=True)
     phone = db.Column(db.String(30), nullable=True)
+    phone_e164 = db.Column(db.String(20), nullable=True, index=True)  # Normalized from phone on write
 
     country_name = db.Column(db.String(100), nullable=True, index=True)
     age_category = db.Column(db.String(10), nullable=True, index=True)  # +19 / +50
@@ -1059,6 +1193,11 @@ class PoolPlayer(db.Model):
     def __repr__(self):
         return f'<PoolPlayer {self.first_name} {self.last_name}>'
 
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_e164 = to_e164(phone)
+        return phone
+
     def get_age(self):
         """Approximate age from birth_year, or None."""
         if not self.birth_year:
@@ -1227,6 +1366,7 @@ class TournamentParticipant(db.Model):
     checkin_token = db.Column(db.String(64), unique=True, nullable=True)
     imported_at = db.Column(db.DateTime, default=datetime.utcnow)
     import_source = db.Column(db.String(50), default='pickleball_global')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Delta sync cursor
 
     tournament = db.relationship('Event', backref='tournament_participants')
     checkin = db.relationship('TournamentCheckin', back_populates='participant', uselist=False)
@@ -1279,6 +1419,8 @@ class TournamentCheckin(db.Model):
     synced_to_server = db.Column(db.Boolean, default=True)
     synced_at = db.Column(db.DateTime, nullable=True)
     offline_created_at = db.Column(db.DateTime, nullable=True)
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=True)  # Client-supplied, makes sync retries a no-op
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Delta sync cursor
 
     tournament = db.relationship('Event')
     participant = db.relationship('TournamentParticipant', back_populates='checkin')
@@ -1288,6 +1430,34 @@ class TournamentCheckin(db.Model):
     )
 
 
+class CheckinTombstone(db.Model):
+    """Deleted participants/check-ins, so offline tablets can drop them on delta sync"""
+    __tablename__ = 'checkin_tombstone'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tournament_id = db.Column(db.Integer, nullable=False, index=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # participant / checkin
+    entity_id = db.Column(db.Integer, nullable=False)
+    participant_id = db.Column(db.Integer, nullable=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+@db.event.listens_for(TournamentParticipant, 'after_delete')
+def _tombstone_participant(mapper, connection, target):
+    """Record a tombstone in the same transaction as the delete (ORM deletes only)."""
+    connection.execute(CheckinTombstone.__table__.insert().values(
+        tournament_id=target.tournament_id, entity_type='participant',
+        entity_id=target.id, participant_id=target.id, deleted_at=datetime.utcnow()))
+
+
+@db.event.listens_for(TournamentCheckin, 'after_delete')
+def _tombstone_checkin(mapper, connection, target):
+    """Record a tombstone in the same transaction as the delete (ORM deletes only)."""
+    connection.execute(CheckinTombstone.__table__.insert().values(
+        tournament_id=target.tournament_id, entity_type='checkin',
+        entity_id=target.id, participant_id=target.participant_id, deleted_at=datetime.utcnow()))
+
+
 class CheckinSyncQueue(db.Model):
     """Queue for offline check-ins waiting to be synced"""
     __tablename__ = 'checkin_sync_queue'
@@ -1298,9 +1468,34 @@ class CheckinSyncQueue(db.Model):
     payload = db.Column(db.JSON, nullable=False)
     created_offline_at = db.Column(db.DateTime, nullable=False)
     received_at = db.Column(db.DateTime, default=datetime.utcnow)
-    processed = db.Column(db.Boolean, default=False)
+    processed = db.Column(db.Boolean, default=False, index=True)
     processed_at = db.Column(db.DateTime, nullable=True)
     sync_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.JSON, nullable=True)  # Per-item outcome once processed
+
+
+class CheckinCounter(db.Model):
+    """Maintained check-in counters, one row per roster total / team / country.
+
+    Kept up to date in the same transaction as each change by
+    utils/checkin_counters; rebuilt from the source tables by its reconcile().
+    """
+    __tablename__ = 'checkin_counter'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # pcl / wpc / checkin
+    tournament_id = db.Column(db.Integer, nullable=False, default=0)  # 0 for WPC (single roster)
+    group_type = db.Column(db.String(20), nullable=False, default='')  # '' (total) / team / country
+    group_key = db.Column(db.String(100), nullable=False, default='')
+    total = db.Column(db.Integer, nullable=False, default=0)
+    checked_in = db.Column(db.Integer, nullable=False, default=0)
+    welcome_packs = db.Column(db.Integer, nullable=False, default=0)
+    with_phone = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'tournament_id', 'group_type', 'group_key', name='unique_checkin_counter'),
+    )
 
 
 # ============================================================================
@@ -1316,6 +1511,7 @@ class WPCPlayer(db.Model):
     last_name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(255), nullable=True)
     phone = db.Column(db.String(50), nullable=True)
+    phone_e164 = db.Column(db.String(20), nullable=True, index=True)  # Normalized from phone on write; None = unusable
     country = db.Column(db.String(100), nullable=True)
     dupr_id = db.Column(db.String(20), nullable=True)
     dupr_rating = db.Column(db.String(50), nullable=True)
@@ -1341,6 +1537,15 @@ class WPCPlayer(db.Model):
 
     registrations = db.relationship('WPCRegistration', back_populates='player', lazy='dynamic')
 
+    __table_args__ = (
+        db.Index('ix_wpc_player_invite_queue', 'country', 'last_name', 'id'),  # Pool-invite keyset cursor
+    )
+
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_e164 = to_e164(phone, min_digits=WPC_MIN_DIGITS)
+        return phone
+
     def generate_checkin_token(self):
         self.checkin_token = secrets.token_urlsafe(32)
         return self.checkin_token
@@ -1384,6 +1589,31 @@ class WPCMatch(db.Model):
     is_doubles = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    participants = db.relationship('WPCMatchParticipant', back_populates='match',
+                                   cascade='all, delete-orphan', lazy='dynamic')
+
+
+class WPCMatchParticipant(db.Model):
+    """One name slot of a WPCMatch, resolved to a WPCPlayer where possible"""
+    __tablename__ = 'wpc_match_participant'
+
+    SLOTS = ('player1_name', 'player2_name', 'opponent1_name', 'opponent2_name')
+
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.Integer, db.ForeignKey('wpc_match.id', ondelete='CASCADE'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('wpc_player.id', ondelete='SET NULL'), nullable=True)  # None = name not matched (yet)
+    slot = db.Column(db.Integer, nullable=False)  # 0-3, index into SLOTS
+    side = db.Column(db.Integer, nullable=False)  # 1 = player1/2, 2 = opponent1/2
+    name = db.Column(db.String(200), nullable=False)
+
+    match = db.relationship('WPCMatch', back_populates='participants')
+    player = db.relationship('WPCPlayer')
+
+    __table_args__ = (
+        db.UniqueConstraint('match_id', 'slot', name='unique_wpc_match_slot'),
+        db.Index('ix_wpc_match_participant_player', 'player_id', 'match_id'),
+    )
+
 
 # ============================================================================
 # USER MODEL (Directors & Admins only)
@@ -1422,4 +1652,79 @@ class User(db.Model):
         from werkzeug.security import check_password_hash
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
\ No newline at end of file
+        return check_password_hash(self.password_hash, password)
+
+# ============================================================================
+# LIVE EVENTS (SSE fan-out)
+# ============================================================================
+
+class LiveEvent(db.Model):
+    """Short-lived event log shared by all workers; streamed to dashboards via SSE"""
+    __tablename__ = 'live_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(64), nullable=False, index=True)  # e.g. 'pcl:3', 'wpc', 'checkin:12'
+    event = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+# ============================================================================
+# CACHE VERSIONS
+# ============================================================================
+
+class CacheVersion(db.Model):
+    """Named version counter bumped by writers to invalidate cached read models"""
+    __tablename__ = 'cache_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)  # e.g. 'sponsors', 'wpc_player:12'
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ============================================================================
+# APPLE WALLET (PassKit web service)
+# ============================================================================
+
+class WalletPass(db.Model):
+    """An issued Apple Wallet pass that devices can refresh in place"""
+    __tablename__ = 'wallet_pass'
+
+    id = db.Column(db.Integer, primary_key=True)
+    pass_type_id = db.Column(db.String(255), nullable=False)
+    serial_number = db.Column(db.String(100), nullable=False)
+    auth_token = db.Column(db.String(64), nullable=False)  # authenticationToken in pass.json
+    kind = db.Column(db.String(20), nullable=False)  # checkin (TournamentCheckin) / pcl (PCLRegistration)
+    source_id = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)  # Bumped when the pass content changes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    registrations = db.relationship('WalletPassRegistration', back_populates='wallet_pass',
+                                    cascade='all, delete-orphan', lazy='dynamic')
+
+    __table_args__ = (
+        db.UniqueConstraint('pass_type_id', 'serial_number', name='unique_wallet_pass_serial'),
+        db.Index('ix_wallet_pass_source', 'kind', 'source_id'),
+    )
+
+    def web_service_fields(self, web_service_url):
+        """pass.json keys that make Wallet register with our web service"""
+        return {'webServiceURL': web_service_url, 'authenticationToken': self.auth_token}
+
+
+class WalletPassRegistration(db.Model):
+    """A device that holds a pass and wants update pushes for it"""
+    __tablename__ = 'wallet_pass_registration'
+
+    id = db.Column(db.Integer, primary_key=True)
+    device_library_id = db.Column(db.String(255), nullable=False, index=True)
+    push_token = db.Column(db.String(255), nullable=True)
+    pass_id = db.Column(db.Integer, db.ForeignKey('wallet_pass.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    wallet_pass = db.relationship('WalletPass', back_populates='registrations')
+
+    __table_args__ = (
+        db.UniqueConstraint('device_library_id', 'pass_id', name='unique_wallet_pass_device'),
+    )
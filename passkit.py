@@ -0,0 +1,279 @@
+"""
+Apple Wallet web service (PassKit) so issued passes update in place.
+
+Passes carry webServiceURL/authenticationToken; Wallet registers the device
+here, asks which of its serials changed since its last tag, and re-fetches
+those with If-Modified-Since. A WalletPass row is bumped (updated_at) in the
+same flush that changes the data printed on the pass, so answering "not
+modified" is a single indexed lookup and the .pkpass is only rebuilt (from
+the content cache) when something actually changed.
+
+Protocol: https://developer.apple.com/documentation/walletpasses/adding_a_web_service_to_update_passes
+"""
+
+import hmac
+import io
+import os
+import secrets
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify, send_file
+from sqlalchemy import event as sa_event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from models import (db, WalletPass, WalletPassRegistration, Event, TournamentCheckin, TournamentParticipant,
+                    PCLRegistration, PCLTeam, PCLTournament)
+
+passkit = Blueprint('passkit', __name__, url_prefix='/passkit')
+
+
+def web_service_url():
+    """Base URL Wallet calls (it appends /v1/...); must be HTTPS in production"""
+    return os.environ.get('PASSKIT_WEB_SERVICE_URL') or 'https://pickleballconnect.eu/passkit'
+
+
+# ============================================================================
+# ISSUING
+# ============================================================================
+
+def ensure_passes(kind, items):
+    """WalletPass rows for [(source_id, pass_type_id, serial_number)], created
+    where missing. Returns {source_id: WalletPass}; the caller commits."""
+    by_serial = {(pass_type_id, serial): source_id for source_id, pass_type_id, serial in items}
+    existing = WalletPass.query.filter(
+        WalletPass.kind == kind,
+        WalletPass.source_id.in_([source_id for source_id, _, _ in items])
+    ).all() if items else []
+
+    passes = {}
+    for wallet_pass in existing:
+        if by_serial.pop((wallet_pass.pass_type_id, wallet_pass.serial_number), None) is not None:
+            passes[wallet_pass.source_id] = wallet_pass
+
+    for (pass_type_id, serial), source_id in by_serial.items():
+        wallet_pass = WalletPass(pass_type_id=pass_type_id, serial_number=serial,
+                                 auth_token=secrets.token_hex(16), kind=kind, source_id=source_id)
+        db.session.add(wallet_pass)
+        passes[source_id] = wallet_pass
+    return passes
+
+
+def ensure_pass(kind, source_id, pass_type_id, serial_number):
+    """Single-pass ensure_passes(); commits a newly issued pass"""
+    wallet_pass = ensure_passes(kind, [(source_id, pass_type_id, serial_number)])[source_id]
+    if wallet_pass.id is None:
+        db.session.commit()
+    return wallet_pass
+
+
+def _build_pass(wallet_pass):
+    """CachedPass with the current content of `wallet_pass`, or None if its source is gone"""
+    web_service = wallet_pass.web_service_fields(web_service_url())
+
+    if wallet_pass.kind == 'checkin':
+        from wallet_pass import get_pkpass
+        checkin_record = TournamentCheckin.query.get(wallet_pass.source_id)
+        if not checkin_record:
+            return None
+        return get_pkpass(checkin_record.participant, checkin_record.tournament, checkin_record, web_service)
+
+    if wallet_pass.kind == 'pcl':
+        from utils.wallet_pass import get_pkpass
+        registration = PCLRegistration.query.get(wallet_pass.source_id)
+        if not registration:
+            return None
+        team = registration.team
+        return get_pkpass(registration, team, team.tournament, web_service)
+
+    return None
+
+
+# ============================================================================
+# DIRTY TRACKING
+# ============================================================================
+# (model, pass kind, attributes printed on the pass, source ids for changed rows)
+
+def _own_ids(ids):
+    return ids
+
+
+def _touch(connection, *conditions):
+    """Bump updated_at of the matching passes to a later whole second.
+
+    Last-Modified / If-Modified-Since only carry whole seconds, so every
+    change must move a pass into a new second; otherwise a change in the same
+    second as the device's last fetch would be answered with 304.
+    """
+    P = WalletPass.__table__
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = connection.execute(db.select(P.c.id, P.c.updated_at).where(*conditions)).all()
+    if rows:
+        connection.execute(P.update().where(P.c.id == db.bindparam('pass_id')), [
+            {'pass_id': pass_id,
+             'updated_at': max(now, updated_at.replace(microsecond=0) + timedelta(seconds=1)) if updated_at else now}
+            for pass_id, updated_at in rows
+        ])
+
+
+def _participant_checkins(ids):
+    return db.select(TournamentCheckin.id).where(TournamentCheckin.participant_id.in_(ids))
+
+
+def _team_registrations(ids):
+    return db.select(PCLRegistration.id).where(PCLRegistration.team_id.in_(ids))
+
+
+def _event_checkins(ids):
+    return db.select(TournamentCheckin.id).where(TournamentCheckin.tournament_id.in_(ids))
+
+
+def _tournament_registrations(ids):
+    return db.select(PCLRegistration.id).join(PCLTeam, PCLTeam.id == PCLRegistration.team_id).where(
+        PCLTeam.tournament_id.in_(ids))
+
+
+TRACKED = [
+    (TournamentCheckin, 'checkin', ('tshirt_size', 'checked_in_at', 'emergency_contact_name',
+                                    'emergency_contact_phone'), _own_ids),
+    (TournamentParticipant, 'checkin', ('checkin_token', 'first_name', 'last_name', 'country', 'email'),
+     _participant_checkins),
+    (PCLRegistration, 'pcl', ('first_name', 'last_name', 'profile_token', 'shirt_size', 'shirt_size_2',
+                              'shirt_size_3', 'team_id'), _own_ids),
+    (PCLTeam, 'pcl', ('country_flag', 'country_name', 'age_category'), _team_registrations),
+    (Event, 'checkin', ('name', 'location', 'start_date'), _event_checkins),
+    (PCLTournament, 'pcl', ('name',), _tournament_registrations),
+]
+
+
+@sa_event.listens_for(Session, 'after_flush')
+def _mark_passes_dirty(session, flush_context):
+    P = WalletPass.__table__
+    R = WalletPassRegistration.__table__
+    connection = None
+
+    for model, kind, attrs, source_ids in TRACKED:
+        changed = [o.id for o in session.dirty if isinstance(o, model)
+                   and any(sa_inspect(o).attrs[a].history.has_changes() for a in attrs)]
+        if changed:
+            connection = connection or session.connection()
+            _touch(connection, P.c.kind == kind, P.c.source_id.in_(source_ids(changed)))
+
+        if source_ids is _own_ids:
+            deleted = [o.id for o in session.deleted if isinstance(o, model)]
+            if deleted:
+                connection = connection or session.connection()
+                gone = db.select(P.c.id).where(P.c.kind == kind, P.c.source_id.in_(deleted))
+                connection.execute(R.delete().where(R.c.pass_id.in_(gone)))
+                connection.execute(P.delete().where(P.c.kind == kind, P.c.source_id.in_(deleted)))
+
+
+# ============================================================================
+# WEB SERVICE (v1)
+# ============================================================================
+
+def _authorized_pass(pass_type_id, serial_number):
+    """WalletPass for the request's `Authorization: ApplePass <token>`, else None"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme != 'ApplePass' or not token:
+        return None
+    wallet_pass = WalletPass.query.filter_by(pass_type_id=pass_type_id, serial_number=serial_number).first()
+    if wallet_pass is None or not hmac.compare_digest(wallet_pass.auth_token, token.strip()):
+        return None
+    return wallet_pass
+
+
+@passkit.route('/v1/devices/<device_id>/registrations/<pass_type_id>/<serial_number>', methods=['POST'])
+def register_device(device_id, pass_type_id, serial_number):
+    """Device starts following a pass: 201 new, 200 already registered"""
+    wallet_pass = _authorized_pass(pass_type_id, serial_number)
+    if wallet_pass is None:
+        return '', 401
+
+    push_token = (request.get_json(silent=True) or {}).get('pushToken')
+    registration = WalletPassRegistration.query.filter_by(
+        device_library_id=device_id, pass_id=wallet_pass.id).first()
+    status = 200
+    if registration is None:
+        registration = WalletPassRegistration(device_library_id=device_id, pass_id=wallet_pass.id)
+        db.session.add(registration)
+        status = 201
+    registration.push_token = push_token or registration.push_token
+
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return '', status
+
+
+@passkit.route('/v1/devices/<device_id>/registrations/<pass_type_id>/<serial_number>', methods=['DELETE'])
+def unregister_device(device_id, pass_type_id, serial_number):
+    """Device removed the pass"""
+    wallet_pass = _authorized_pass(pass_type_id, serial_number)
+    if wallet_pass is None:
+        return '', 401
+
+    WalletPassRegistration.query.filter_by(device_library_id=device_id, pass_id=wallet_pass.id).delete()
+    db.session.commit()
+    return '', 200
+
+
+@passkit.route('/v1/devices/<device_id>/registrations/<pass_type_id>')
+def updated_serials(device_id, pass_type_id):
+    """Serial numbers of this device's passes changed since `passesUpdatedSince`"""
+    query = db.session.query(WalletPass.serial_number, WalletPass.updated_at).join(
+        WalletPassRegistration, WalletPassRegistration.pass_id == WalletPass.id
+    ).filter(
+        WalletPassRegistration.device_library_id == device_id,
+        WalletPass.pass_type_id == pass_type_id
+    )
+
+    since = request.args.get('passesUpdatedSince')
+    if since:
+        try:
+            query = query.filter(WalletPass.updated_at > datetime.fromisoformat(since))
+        except ValueError:
+            pass  # unknown tag: report everything
+
+    rows = query.all()
+    if not rows:
+        return '', 204
+    return jsonify({
+        'lastUpdated': max(updated_at for _, updated_at in rows).isoformat(),
+        'serialNumbers': [serial for serial, _ in rows],
+    })
+
+
+@passkit.route('/v1/passes/<pass_type_id>/<serial_number>')
+def latest_pass(pass_type_id, serial_number):
+    """Current .pkpass, or 304 when unchanged since If-Modified-Since"""
+    wallet_pass = _authorized_pass(pass_type_id, serial_number)
+    if wallet_pass is None:
+        return '', 401
+
+    # every change moves updated_at to a later whole second (_touch), so a pass
+    # whose second is not after If-Modified-Since has not changed since
+    last_modified = wallet_pass.updated_at.replace(microsecond=0)
+    since = request.if_modified_since
+    if since is not None and last_modified <= since.replace(tzinfo=None):
+        return '', 304
+
+    pkpass = _build_pass(wallet_pass)
+    if pkpass is None:
+        return '', 404
+
+    return send_file(
+        io.BytesIO(pkpass.data),
+        mimetype='application/vnd.apple.pkpass',
+        last_modified=last_modified,
+        etag=pkpass.etag
+    )
+
+
+@passkit.route('/v1/log', methods=['POST'])
+def device_log():
+    """Error messages reported by Wallet"""
+    for line in (request.get_json(silent=True) or {}).get('logs', []):
+        print(f"PassKit: {line}")
+    return '', 200
@@ -1,11 +1,13 @@
 ﻿from urllib.parse import quote
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify
-from models import db, PCLTournament, PCLTeam, PCLRegistration, Player, SHIRT_SIZES, COUNTRY_FLAGS, get_whatsapp_sponsor_block, PCLMatch, PCLLineup, PCLMatchResult, PoolPlayer
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify, abort
+from models import db, PCLTournament, PCLTeam, PCLRegistration, Player, SHIRT_SIZES, COUNTRY_FLAGS, get_whatsapp_sponsor_block, PCLMatch, PCLLineup, PCLMatchResult
 from datetime import datetime, date
 from werkzeug.utils import secure_filename
 from utils.supabase_storage import upload_photo_to_supabase, get_photo_url
 from utils.whatsapp import send_whatsapp_message, send_captain_invitation_template
+from utils import checkin_counters, live_events, pcl_dashboard, pcl_standings, search_index
 import base64
+import click
 import os
 import csv
 import io
@@ -856,13 +858,17 @@ def admin_tournament_detail(tournament_id):
     """Admin view of a tournament with all teams"""
     tournament = PCLTournament.query.get_or_404(tournament_id)
     
-    teams_19 = tournament.teams.filter_by(age_category='+19').order_by(PCLTeam.country_name).all()
-    teams_50 = tournament.teams.filter_by(age_category='+50').order_by(PCLTeam.country_name).all()
+    teams = tournament.teams.order_by(PCLTeam.country_name).all()
+    teams_19 = [team for team in teams if team.age_category == '+19']
+    teams_50 = [team for team in teams if team.age_category == '+50']
+    stats_by_team = PCLTeam.stats_for(teams)
     
     return render_template('pcl/admin_tournament_detail.html', 
                          tournament=tournament,
                          teams_19=teams_19,
                          teams_50=teams_50,
+                         stats_by_team=stats_by_team,
+                         stats=tournament.get_stats(stats_by_team),
                          now=datetime.utcnow())
 
 
@@ -1589,7 +1595,12 @@ def export_shirt_list(tournament_id):
 @pcl.route('/team/<token>')
 def captain_dashboard(token):
     """Captain dashboard - accessed via secret link, shows all teams for this captain"""
-    team = PCLTeam.query.filter_by(captain_token=token).first_or_404()
+    # Roster, other captained teams, matches + lineups, standings and pool in
+    # a fixed number of queries (utils.pcl_dashboard)
+    dashboard = pcl_dashboard.load(token)
+    if dashboard is None:
+        abort(404)
+    team = dashboard['team']
     
     lang = request.args.get('lang', 'EN').upper()
     if lang not in TRANSLATIONS:
@@ -1597,29 +1608,6 @@ def captain_dashboard(token):
     
     t = get_translations(lang)
     
-    # Find captain in this team (to get phone number)
-    current_captain = team.registrations.filter_by(is_captain=True).first()
-    
-    # Find ALL teams where this person is captain (by phone number)
-    other_teams = []
-    if current_captain and current_captain.phone:
-        # Find all captain registrations with same phone
-        all_captain_regs = PCLRegistration.query.filter_by(
-            phone=current_captain.phone,
-            is_captain=True
-        ).all()
-        
-        # Get unique teams (excluding current)
-        for reg in all_captain_regs:
-            if reg.team_id != team.id:
-                other_team = PCLTeam.query.get(reg.team_id)
-                if other_team and other_team not in other_teams:
-                    other_teams.append(other_team)
-    
-    stats = team.get_stats()
-    men = team.registrations.filter_by(gender='male').all()
-    women = team.registrations.filter_by(gender='female').all()
-    
     days_left = (team.tournament.registration_deadline - datetime.now()).days
     
     registration_url = request.host_url.rstrip('/') + url_for('pcl.player_register', token=token)
@@ -1689,63 +1677,25 @@ Merci!"""
     }
     player_message_encoded = quote(player_messages.get(lang, player_messages['EN']))
 
-    # --- Phase 2: matches for this team (upcoming + past) ---
-    team_matches = PCLMatch.query.filter(
-        db.or_(PCLMatch.team_home_id == team.id, PCLMatch.team_away_id == team.id)
-    ).all()
-
-    def _match_view(m):
-        is_home = m.team_home_id == team.id
-        opponent = m.team_away if is_home else m.team_home
-        own = m.lineups.filter_by(team_id=team.id).first()
-        opp_id = m.team_away_id if is_home else m.team_home_id
-        opp = m.lineups.filter_by(team_id=opp_id).first()
-        return {
-            'match': m,
-            'opponent': opponent,
-            'is_home': is_home,
-            'own_submitted': bool(own and own.is_submitted()),
-            'opp_submitted': bool(opp and opp.is_submitted()),
-            'deadline_passed': m.is_lineup_deadline_passed(),
-        }
-
-    upcoming_matches = [_match_view(m) for m in team_matches if m.status != 'completed']
-    upcoming_matches.sort(key=lambda v: (v['match'].match_date is None,
-                                         v['match'].match_date or datetime.max))
-    past_matches = [_match_view(m) for m in team_matches if m.status == 'completed']
-    past_matches.sort(key=lambda v: (v['match'].match_date or datetime.min), reverse=True)
-
-    deadline_soon = any(
-        v['match'].lineup_deadline and not v['deadline_passed'] and not v['own_submitted']
-        and (v['match'].lineup_deadline - datetime.now()).total_seconds() < 24 * 3600
-        for v in upcoming_matches
-    )
-
-    # Live tournament standings (reuses the same helper as the admin match list)
-    standings = get_tournament_standings(team.tournament_id)
-
     # Pool players matching this team's country + age category (collapsible section)
     from routes.pool import status_label as pool_status_label, STATUS_COLORS as POOL_STATUS_COLORS
-    pool_matches = PoolPlayer.query.filter_by(
-        country_name=team.country_name, age_category=team.age_category
-    ).order_by(PoolPlayer.created_at.desc()).all()
     pool_players = [{
         'p': pp,
         'status_label': pool_status_label(pp.status, lang),
         'status_color': POOL_STATUS_COLORS.get(pp.status, 'secondary'),
-    } for pp in pool_matches]
+    } for pp in dashboard['pool']]
 
     return render_template('pcl/captain_dashboard.html',
                          team=team,
-                         other_teams=other_teams,
-                         upcoming_matches=upcoming_matches,
-                         past_matches=past_matches,
-                         deadline_soon=deadline_soon,
-                         standings=standings,
+                         other_teams=dashboard['other_teams'],
+                         upcoming_matches=dashboard['upcoming_matches'],
+                         past_matches=dashboard['past_matches'],
+                         deadline_soon=dashboard['deadline_soon'],
+                         standings=dashboard['standings'],
                          pool_players=pool_players,
-                         stats=stats,
-                         men=men,
-                         women=women,
+                         stats=dashboard['stats'],
+                         men=dashboard['men'],
+                         women=dashboard['women'],
                          days_left=days_left,
                          registration_url=registration_url,
                          quick_add_url=quick_add_url,
@@ -2000,11 +1950,10 @@ def send_all_profile_links(token):
     sent_count = 0
     error_count = 0
     
-    # Get all incomplete registrations with phone numbers
+    # Get all incomplete registrations with a usable phone number
     incomplete = team.registrations.filter(
         PCLRegistration.status != 'complete',
-        PCLRegistration.phone.isnot(None),
-        PCLRegistration.phone != ''
+        PCLRegistration.phone_e164.isnot(None)
     ).all()
     
     for registration in incomplete:
@@ -2417,41 +2366,37 @@ def _parse_match_dt(value):
 
 
 def get_tournament_standings(tournament_id):
-    """Live standings grouped by age category, computed from completed matches.
+    """Live standings grouped by age category, from the maintained standings table.
 
     1 point per win; sorted by points DESC, discipline differential DESC
     (sum of this team's score minus opponent's across completed matches),
     then country name ASC. Teams with no completed matches appear with 0 stats.
     """
-    teams = PCLTeam.query.filter_by(tournament_id=tournament_id).all()
-    completed = PCLMatch.query.filter_by(tournament_id=tournament_id, status='completed').all()
-
-    stats = {team.id: {'team': team, 'played': 0, 'wins': 0, 'losses': 0, 'points': 0, 'diff': 0}
-             for team in teams}
-
-    for m in completed:
-        hs = m.home_score or 0
-        away = m.away_score or 0
-        for tid, is_home in ((m.team_home_id, True), (m.team_away_id, False)):
-            s = stats.get(tid)
-            if s is None:
-                continue
-            s['played'] += 1
-            s['diff'] += (hs - away) if is_home else (away - hs)
-            if m.winner_id == tid:
-                s['wins'] += 1
-                s['points'] += 1
-            else:
-                s['losses'] += 1
+    return pcl_standings.standings(tournament_id)
+
+
+@pcl.cli.command('rebuild-standings')
+def rebuild_standings_command():
+    """Rebuild all PCL standings from the completed matches."""
+    tournaments = pcl_standings.rebuild_all(db.session.connection())
+    db.session.commit()
+    print(f"Rebuilt standings for {tournaments} tournament(s)")
 
-    groups = {}
-    for team in teams:
-        groups.setdefault(team.age_category, []).append(stats[team.id])
-    for cat in groups:
-        groups[cat].sort(key=lambda s: (-s['points'], -s['diff'], (s['team'].country_name or '').lower()))
 
-    # Stable category order (e.g. +19 before +50); skip nothing - empty cats never created.
-    return {cat: groups[cat] for cat in sorted(groups)}
+@pcl.cli.command('check-lineups')
+@click.argument('tournament_id', type=int)
+def check_lineups_command(tournament_id):
+    """Validate every submitted lineup of a tournament (e.g. before a matchday)."""
+    lineups = PCLLineup.query.join(PCLMatch, PCLLineup.match_id == PCLMatch.id).filter(
+        PCLMatch.tournament_id == tournament_id, PCLLineup.submitted_at.isnot(None)
+    ).order_by(PCLMatch.match_date, PCLLineup.id).all()
+
+    invalid = 0
+    for lineup, errors in PCLLineup.validate_many(lineups):
+        if errors:
+            invalid += 1
+            print(f"Match {lineup.match_id}, team {lineup.team_id}: {'; '.join(errors)}")
+    print(f"{len(lineups)} lineup(s) checked, {invalid} invalid")
 
 
 @pcl.route('/admin/tournament/<int:tournament_id>/matches')
@@ -2550,7 +2495,7 @@ def admin_match_detail(match_id):
     lineups = match.lineups.all()
     home_lineup = next((l for l in lineups if l.team_id == match.team_home_id), None)
     away_lineup = next((l for l in lineups if l.team_id == match.team_away_id), None)
-    results = match.results.all()
+    results = list(match.results_by_type().values())
 
     return render_template('pcl/admin_match_detail.html',
                          tournament=match.tournament,
@@ -2654,7 +2599,8 @@ def delete_team(team_id):
     team_name = f"{team.country_name} {team.age_category}"
     
     try:
-        PCLRegistration.query.filter_by(team_id=team_id).delete()
+        for registration in PCLRegistration.query.filter_by(team_id=team_id):
+            db.session.delete(registration)  # ORM deletes keep check-in counters in step
         db.session.delete(team)
         db.session.commit()
         flash(f'Team "{team_name}" deleted!', 'success')
@@ -2938,14 +2884,23 @@ def send_all_captain_reminders(tournament_id):
     error_count = 0
     skipped_count = 0
     
-    for team in tournament.teams.all():
-        stats = team.get_stats()
+    teams = tournament.teams.all()
+    team_stats = PCLTeam.stats_for(teams)
+    captains = {}
+    for reg in PCLRegistration.query.filter(
+        PCLRegistration.team_id.in_([team.id for team in teams]),
+        PCLRegistration.is_captain == True
+    ).order_by(PCLRegistration.id):
+        captains.setdefault(reg.team_id, reg)
+    
+    for team in teams:
+        stats = team_stats[team.id]
         
         if stats['is_complete']:
             skipped_count += 1
             continue
         
-        captain_reg = team.registrations.filter_by(is_captain=True).first()
+        captain_reg = captains.get(team.id)
         
         if not captain_reg or not captain_reg.phone:
             error_count += 1
@@ -3313,25 +3268,34 @@ def apple_wallet_pass(token):
     tournament = team.tournament
     
     try:
-        from utils.wallet_pass import create_pkpass, is_apple_wallet_available
+        from utils.wallet_pass import get_pkpass, pass_identity, is_apple_wallet_available
+        import passkit
         
         if not is_apple_wallet_available():
             flash('Apple Wallet is not configured', 'warning')
             return redirect(url_for('pcl.wallet_pass', token=token))
         
-        pkpass_data = create_pkpass(
+        # Registered with the PassKit web service so later changes update it in place
+        wallet_pass = passkit.ensure_pass('pcl', registration.id, *pass_identity(registration, tournament))
+        
+        # Cached .pkpass - only rebuilt when the pass content changes
+        pkpass = get_pkpass(
             registration=registration,
             team=team,
-            tournament=tournament
+            tournament=tournament,
+            web_service=wallet_pass.web_service_fields(passkit.web_service_url())
         )
         
-        if pkpass_data:
+        if pkpass:
             filename = f"WPC_{registration.first_name}_{registration.last_name}.pkpass"
             return send_file(
-                io.BytesIO(pkpass_data),
+                io.BytesIO(pkpass.data),
                 mimetype='application/vnd.apple.pkpass',
                 as_attachment=True,
-                download_name=filename
+                download_name=filename,
+                etag=pkpass.etag,
+                last_modified=pkpass.generated_at,
+                conditional=True
             )
         else:
             flash('Error generating Apple Wallet pass', 'danger')
@@ -3352,45 +3316,79 @@ def apple_wallet_pass(token):
 
 @pcl.route('/admin/tournament/<int:tournament_id>/checkin')
 def staff_checkin_station(tournament_id):
-    """Staff check-in station dashboard"""
+    """Staff check-in station dashboard (players are loaded per team via JSON)"""
     tournament = PCLTournament.query.get_or_404(tournament_id)
     
-    # Get all registrations for this tournament
-    registrations = PCLRegistration.query.join(PCLTeam).filter(
-        PCLTeam.tournament_id == tournament_id
-    ).order_by(PCLRegistration.last_name).all()
+    # Stats and per-team progress from the maintained counters
+    stats = _checkin_counts(db.session, tournament_id)
+    team_counts = checkin_counters.groups(db.session, 'pcl', tournament_id, 'team')
     
-    # Stats
-    total = len(registrations)
-    checked_in = len([r for r in registrations if r.checked_in])
-    pending = total - checked_in
+    teams_data = []
+    for team in PCLTeam.query.filter_by(tournament_id=tournament_id).order_by(
+        PCLTeam.country_name, PCLTeam.age_category
+    ).all():
+        counts = team_counts.get(str(team.id), {'total': 0, 'checked_in': 0})
+        teams_data.append({
+            'team': team,
+            'label': f"{team.country_flag} {team.country_name} {team.age_category}",
+            'checked_in': counts['checked_in'],
+            'total': counts['total']
+        })
     
-    # Group by team
-    teams_data = {}
-    for reg in registrations:
-        team_key = f"{reg.team.country_flag} {reg.team.country_name} {reg.team.age_category}"
-        if team_key not in teams_data:
-            teams_data[team_key] = {
-                'team': reg.team,
-                'players': [],
-                'checked_in': 0,
-                'total': 0
-            }
-        teams_data[team_key]['players'].append(reg)
-        teams_data[team_key]['total'] += 1
-        if reg.checked_in:
-            teams_data[team_key]['checked_in'] += 1
+    recent = PCLRegistration.query.options(db.joinedload(PCLRegistration.team)).join(PCLTeam).filter(
+        PCLTeam.tournament_id == tournament_id,
+        PCLRegistration.checked_in == True
+    ).order_by(PCLRegistration.checked_in_at.desc()).limit(5).all()
     
     t = get_checkin_translations('EN')
     
     return render_template('pcl/staff_checkin.html',
                          tournament=tournament,
-                         registrations=registrations,
                          teams_data=teams_data,
-                         stats={'total': total, 'checked_in': checked_in, 'pending': pending},
+                         recent=recent,
+                         stats=stats,
                          t=t)
 
 
+def _station_player_json(reg):
+    return {
+        'id': reg.id,
+        'name': f"{reg.first_name} {reg.last_name}",
+        'team': f"{reg.team.country_flag} {reg.team.country_name} {reg.team.age_category}",
+        'shirt_size': reg.shirt_size,
+        'shirt_size_2': reg.shirt_size_2,
+        'shirt_size_3': reg.shirt_size_3,
+        'checked_in': reg.checked_in,
+        'checked_in_at': reg.checked_in_at.strftime('%H:%M') if reg.checked_in_at else None,
+        'photo': reg.photo_filename
+    }
+
+
+@pcl.route('/admin/tournament/<int:tournament_id>/checkin/players')
+def staff_checkin_players(tournament_id):
+    """One page of station players, optionally for a single team (AJAX endpoint)"""
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 50, type=int), 100)
+    team_id = request.args.get('team_id', type=int)
+    
+    query = PCLRegistration.query.options(db.joinedload(PCLRegistration.team)).join(PCLTeam).filter(
+        PCLTeam.tournament_id == tournament_id
+    )
+    if team_id:
+        query = query.filter(PCLRegistration.team_id == team_id)
+    
+    pagination = query.order_by(PCLRegistration.last_name, PCLRegistration.id).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    return jsonify({
+        'players': [_station_player_json(reg) for reg in pagination.items],
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'total': pagination.total,
+        'has_next': pagination.has_next
+    })
+
+
 @pcl.route('/admin/tournament/<int:tournament_id>/checkin/search')
 def staff_search_player(tournament_id):
     """Search for player (AJAX endpoint)"""
@@ -3399,29 +3397,16 @@ def staff_search_player(tournament_id):
     if len(query) < 2:
         return jsonify({'players': []})
     
-    registrations = PCLRegistration.query.join(PCLTeam).filter(
-        PCLTeam.tournament_id == tournament_id,
-        db.or_(
-            PCLRegistration.first_name.ilike(f'%{query}%'),
-            PCLRegistration.last_name.ilike(f'%{query}%')
-        )
-    ).limit(10).all()
-
-    players = []
-    for reg in registrations:
-        players.append({
-            'id': reg.id,
-            'name': f"{reg.first_name} {reg.last_name}",
-            'team': f"{reg.team.country_flag} {reg.team.country_name} {reg.team.age_category}",
-            'shirt_size': reg.shirt_size,
-            'shirt_size_2': reg.shirt_size_2,
-            'shirt_size_3': reg.shirt_size_3,
-            'checked_in': reg.checked_in,
-            'checked_in_at': reg.checked_in_at.strftime('%H:%M') if reg.checked_in_at else None,
-            'photo': reg.photo_filename
-        })
+    # Ranked, accent-insensitive lookup in the in-memory roster index
+    index = search_index.roster_index(('pcl', tournament_id), db.select(
+        PCLRegistration.id, PCLRegistration.updated_at, PCLRegistration.first_name, PCLRegistration.last_name
+    ).join(PCLTeam, PCLTeam.id == PCLRegistration.team_id).where(PCLTeam.tournament_id == tournament_id))
+    ids = index.search(query, limit=10)
+    
+    found = {r.id: r for r in PCLRegistration.query.options(db.joinedload(PCLRegistration.team))
+             .filter(PCLRegistration.id.in_(ids))} if ids else {}
     
-    return jsonify({'players': players})
+    return jsonify({'players': [_station_player_json(found[i]) for i in ids if i in found]})
 
 
 @pcl.route('/admin/checkin/<int:registration_id>', methods=['POST'])
@@ -3515,15 +3500,42 @@ def generate_qrcodes(tournament_id):
 # API: LIVE STATS
 # ============================================================================
 
+def _checkin_counts(conn, tournament_id):
+    """Check-in counters for a tournament (maintained counter row)"""
+    counts = checkin_counters.totals(conn, 'pcl', tournament_id)
+    total, checked_in = counts['total'], counts['checked_in']
+    return {
+        'total': total,
+        'checked_in': checked_in,
+        'pending': total - checked_in,
+        'percentage': round(checked_in / total * 100, 1) if total > 0 else 0,
+    }
+
+
+def _checkin_channel(conn, registration):
+    tournament_id = conn.scalar(db.select(PCLTeam.tournament_id).where(PCLTeam.id == registration.team_id))
+    return f'pcl:{tournament_id}' if tournament_id else None
+
+
+def _describe_checkin(registration, kind):
+    return {
+        'kind': kind,
+        'name': f"{registration.first_name} {registration.last_name}",
+        'checked_in': bool(registration.checked_in),
+        'time': registration.checked_in_at.strftime('%H:%M') if registration.checked_in_at else None,
+    }
+
+
+live_events.watch(
+    PCLRegistration, ['checked_in'], _checkin_channel,
+    lambda conn, channel: _checkin_counts(conn, int(channel.split(':')[1])),
+    _describe_checkin)
+
+
 @pcl.route('/api/checkin/stats/<int:tournament_id>')
 def checkin_stats_api(tournament_id):
     """Get live check-in stats (for dashboard auto-refresh)"""
-    registrations = PCLRegistration.query.join(PCLTeam).filter(
-        PCLTeam.tournament_id == tournament_id
-    ).all()
-    
-    total = len(registrations)
-    checked_in = len([r for r in registrations if r.checked_in])
+    stats = _checkin_counts(db.session, tournament_id)
     
     # Recent check-ins
     recent = PCLRegistration.query.join(PCLTeam).filter(
@@ -3531,20 +3543,24 @@ def checkin_stats_api(tournament_id):
         PCLRegistration.checked_in == True
     ).order_by(PCLRegistration.checked_in_at.desc()).limit(5).all()
     
-    return jsonify({
-        'total': total,
-        'checked_in': checked_in,
-        'pending': total - checked_in,
-        'percentage': round(checked_in / total * 100, 1) if total > 0 else 0,
-        'recent': [
-            {
-                'name': f"{r.first_name} {r.last_name}",
-                'team': f"{r.team.country_flag} {r.team.country_name}",
-                'time': r.checked_in_at.strftime('%H:%M') if r.checked_in_at else None
-            }
-            for r in recent
-        ]
-    })
+    stats['recent'] = [
+        {
+            'name': f"{r.first_name} {r.last_name}",
+            'team': f"{r.team.country_flag} {r.team.country_name}",
+            'time': r.checked_in_at.strftime('%H:%M') if r.checked_in_at else None
+        }
+        for r in recent
+    ]
+    return jsonify(stats)
+
+
+@pcl.route('/api/checkin/stream/<int:tournament_id>')
+def checkin_stats_stream(tournament_id):
+    """Live check-in stats pushed via SSE (one event per committed change)"""
+    return live_events.stream(f'pcl:{tournament_id}',
+                              snapshot=lambda: _checkin_counts(db.session, tournament_id))
+
+
 @pcl.route('/terms')
 def terms():
     """Privacy Policy and Terms page"""
@@ -3569,12 +3585,8 @@ def _selectable_players(team, extra_ids=None):
     regs = team.registrations.all()
     selectable = [r for r in regs if not (r.is_captain and not r.is_playing)]
     have = {r.id for r in selectable}
-    for rid in (extra_ids or []):
-        if rid and rid not in have:
-            r = PCLRegistration.query.get(rid)
-            if r:
-                selectable.append(r)
-                have.add(rid)
+    extra = PCLLineup.load_roster(rid for rid in (extra_ids or []) if rid not in have)
+    selectable.extend(extra.values())
     keyfn = lambda r: ((r.first_name or '').lower(), (r.last_name or '').lower())
     selectable.sort(key=keyfn)
     males = sorted([r for r in selectable if r.gender == 'male'], key=keyfn)
@@ -3736,11 +3748,17 @@ SCORE_TYPES = ['wd', 'md', 'mx1', 'mx2', 'hb']
 
 
 def _upsert_result(match, mtype, home, away):
-    """Insert/update one PCLMatchResult row and set its winner ('home'/'away'/None)."""
-    r = PCLMatchResult.query.filter_by(match_id=match.id, match_type=mtype).first()
+    """Insert/update one PCLMatchResult row and set its winner ('home'/'away'/None).
+
+    Works on the match's results snapshot, so saving all disciplines and
+    recalculating the match reads the results once.
+    """
+    res = match.results_by_type()
+    r = res.get(mtype)
     if r is None:
         r = PCLMatchResult(match_id=match.id, match_type=mtype)
         db.session.add(r)
+        res[mtype] = r
     r.home_score = home
     r.away_score = away
     if home is not None and away is not None and home > away:
@@ -3754,7 +3772,11 @@ def _upsert_result(match, mtype, home, away):
 
 
 def _recalculate_match(match):
-    """Recompute match standing, winner and status from the stored results."""
+    """Recompute match standing, winner and status from the stored results.
+
+    The flush of these changes moves the tournament standings (pcl_standings),
+    reverting this match's previous result first.
+    """
     final_h, final_a = match.get_final_standing()
     match.home_score = final_h
     match.away_score = final_a
@@ -6,8 +6,11 @@ Court Manager Scoring System v3 - Simplified
 - Results displayed as 11-7 format for easy PG transfer
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response
 from models import db, Event
+from utils import cache_versions, live_events
+from utils.schedule_import import ScheduleSync
+from collections import Counter
 from datetime import datetime
 import secrets
 
@@ -79,6 +82,8 @@ class Match(db.Model):
     score_submitted_at = db.Column(db.DateTime, nullable=True)
     scoresheet_verified = db.Column(db.Boolean, default=False)
     submitted_by_court_id = db.Column(db.Integer, nullable=True)
+    score_idempotency_key = db.Column(db.String(64), unique=True, nullable=True, index=True)  # Client key of the last score submit
+    schedule_key = db.Column(db.String(255), nullable=True, index=True)  # Stable key from smart import; None = added by hand
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     court = db.relationship('Court', back_populates='matches')
@@ -118,6 +123,7 @@ def parse_schedule(raw_text, base_date=''):
     current_cat = ''
     current_round = ''
     counter = 0
+    label_counts = Counter()
     for line in lines:
         line = line.strip()
         if not line or line.startswith('Division') or line == 'Scores':
@@ -129,6 +135,7 @@ def parse_schedule(raw_text, base_date=''):
             team1 = team2 = 'TBD'
             court_num = None
             sched_time = None
+            label = None
             for p in parts:
                 p = p.strip()
                 if not p or p == '--': continue
@@ -143,13 +150,16 @@ def parse_schedule(raw_text, base_date=''):
                     if team1 == 'TBD': team1 = p
                     else: team2 = p
                 elif p.startswith('Match ') or 'Semi' in p or 'Final' in p or 'Third' in p:
+                    label = p
                     if 'Semi' in p or 'Final' in p or 'Third' in p: current_round = p
                 elif any(x in p for x in ['MD', 'WD', 'MX', 'MS', 'WS']) and '&' not in p and 'Flight' not in p:
                     current_cat = p
                 elif 'Flight' in p:
                     current_round = p
             counter += 1
-            matches.append({'num': str(counter), 'cat': current_cat, 'rnd': current_round,
+            label_counts[(current_cat, current_round, label)] += 1
+            matches.append({'num': str(counter), 'cat': current_cat, 'rnd': current_round, 'label': label,
+                          'pos': label_counts[(current_cat, current_round, label)],
                           'team1': team1, 'team2': team2, 'court': court_num, 'time': sched_time})
         else:
             for p in parts:
@@ -163,6 +173,55 @@ def parse_schedule(raw_text, base_date=''):
     return matches
 
 
+def schedule_key(m):
+    """Identity of a parsed match across re-imports: category, round and the
+    'Match N' label (court/time/teams for lines without one). Labels that repeat
+    within a round ('Semi Final') get their position from the second one on."""
+    if m['label']:
+        repeat = '' if m['label'].startswith('Match ') or m.get('pos', 1) == 1 else f"|{m['pos']}"
+        return f"{m['cat']}|{m['rnd']}|{m['label']}{repeat}"[:255]
+    time = m['time'].strftime('%H:%M') if m['time'] else ''
+    return f"{m['cat']}|{m['rnd']}|{m['court']}|{time}|{m['team1']}|{m['team2']}"[:255]
+
+
+# match_number is the line's position in the paste: set on insert only, so one
+# added line does not renumber (and rewrite) every later match
+SCHEDULE_FIELDS = ('category', 'round_name', 'team1_name', 'team2_name',
+                   'court_number', 'court_id', 'scheduled_time')
+
+
+def _schedule_identity(values):
+    """Adopts matches imported before schedule keys existed (schedule_key NULL)"""
+    return (values['category'], values['round_name'], values['court_number'], values['scheduled_time'],
+            values['team1_name'], values['team2_name'])
+
+
+def sync_schedule(tournament_id, parsed):
+    """Diff a parsed schedule against the tournament's imported matches and apply
+    only the changes. Matches with a result are never removed. Does not commit."""
+    court_ids = dict(db.session.execute(
+        db.select(Court.court_number, Court.id).where(Court.tournament_id == tournament_id)).all())
+    rows = [{'schedule_key': schedule_key(m), 'match_number': m['num'], 'category': m['cat'],
+             'round_name': m['rnd'], 'team1_name': m['team1'], 'team2_name': m['team2'],
+             'court_number': m['court'], 'court_id': court_ids.get(m['court']), 'scheduled_time': m['time']}
+            for m in parsed]
+    sync = ScheduleSync(Match, {'tournament_id': tournament_id}, key=lambda v: v['schedule_key'],
+                        fields=SCHEDULE_FIELDS, partition=lambda v: v['category'],
+                        protect=lambda row: row['status'] == 'completed' or row['team1_score'] is not None,
+                        adopt=_schedule_identity, key_column='schedule_key')
+    sync.run(rows)
+    if sync.changed:
+        schedule_changed(tournament_id)  # Core writes bypass the watches
+    return sync
+
+
+def schedule_changed(tournament_id):
+    """After Core writes to matches/courts: invalidate the live data and tell
+    open dashboards to refetch it (in the caller's transaction)"""
+    cache_versions.bump(db.session, f'scoring:{tournament_id}')
+    live_events.publish(db.session.connection(), f'scoring:{tournament_id}', 'refresh', {})
+
+
 def get_manager_courts(tournament_id):
     """Group courts by manager name"""
     courts = Court.query.filter_by(tournament_id=tournament_id).order_by(Court.court_number).all()
@@ -194,6 +253,7 @@ def create_courts(tournament_id):
     num_courts = int(request.form.get('num_courts', 9))
     if request.form.get('replace_existing'):
         Court.query.filter_by(tournament_id=tournament_id).delete()
+        schedule_changed(tournament_id)
     for i in range(1, num_courts + 1):
         db.session.add(Court(tournament_id=tournament_id, court_number=i, manager_token=Court.generate_token()))
     try:
@@ -251,19 +311,16 @@ def smart_import(tournament_id):
         flash('Kein Spielplan eingefuegt!', 'warning')
         return redirect(url_for('scoring.setup_tournament', tournament_id=tournament_id))
     parsed = parse_schedule(raw_text, base_date)
-    count = 0
-    for m in parsed:
-        match = Match(tournament_id=tournament_id, match_number=m['num'], category=m['cat'],
-                     round_name=m['rnd'], team1_name=m['team1'], team2_name=m['team2'],
-                     court_number=m['court'], scheduled_time=m['time'], status='scheduled')
-        if m['court']:
-            court = Court.query.filter_by(tournament_id=tournament_id, court_number=m['court']).first()
-            if court: match.court_id = court.id
-        db.session.add(match)
-        count += 1
     try:
+        stats = sync_schedule(tournament_id, parsed).stats
         db.session.commit()
-        flash(f'{count} Matches importiert!', 'success')
+        message = (f"Spielplan importiert: {stats['inserted']} neu, {stats['updated']} geaendert, "
+                   f"{stats['deleted']} entfernt, {stats['unchanged']} unveraendert")
+        if stats['kept']:
+            message += f", {stats['kept']} mit Ergebnis behalten"
+        if stats['duplicate']:
+            message += f", {stats['duplicate']} doppelte Zeile(n) ignoriert"
+        flash(message, 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Fehler: {str(e)}', 'danger')
@@ -274,6 +331,7 @@ def smart_import(tournament_id):
 def clear_matches(tournament_id):
     get_tournament_or_404(tournament_id)
     count = Match.query.filter_by(tournament_id=tournament_id).delete()
+    schedule_changed(tournament_id)
     try:
         db.session.commit()
         flash(f'{count} Matches geloescht!', 'success')
@@ -373,50 +431,286 @@ def live_dashboard(tournament_id):
 
 @scoring.route('/api/live/<int:tournament_id>')
 def api_live_data(tournament_id):
+    """Dashboard poll: served from the cache until a score/schedule change bumps
+    the tournament's version; repeat polls with that ETag get 304"""
+    version, = cache_versions.versions(db.session, (f'scoring:{tournament_id}',))
+    etag = f'scoring-{tournament_id}-{version}'
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(_served(_live_cache.get_or_build(tournament_id, version, lambda: _live_payload(tournament_id))))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+_live_cache = cache_versions.VersionedCache(max_entries=64)
+RECENT_SCORES = 20
+
+
+def _served(payload):
+    """Cached live data stamped with the time it is served (not when it was built)"""
+    return {**payload, 'timestamp': datetime.utcnow().strftime('%H:%M:%S')}
+
+
+def _live_payload(tournament_id):
+    """Latest result and next match per court, recent scores and counts"""
+    # One pass ranks every match twice: within its court+status (latest completed /
+    # earliest scheduled first) and among all completed matches (most recent first)
+    court_rank = db.func.row_number().over(
+        partition_by=(Match.court_id, Match.status),
+        order_by=(db.case((Match.status == 'completed', Match.completed_at)).desc(),
+                  Match.scheduled_time, Match.match_number))
+    recent_rank = db.func.row_number().over(partition_by=Match.status, order_by=Match.completed_at.desc())
+    ranked = db.select(Match, court_rank.label('court_rank'), recent_rank.label('recent_rank')).where(
+        Match.tournament_id == tournament_id,
+        Match.status.in_(('completed', 'scheduled'))
+    ).subquery()
+    ranked_match = db.aliased(Match, ranked)
+    rows = db.session.execute(db.select(ranked_match, ranked.c.court_rank, ranked.c.recent_rank).where(
+        db.or_(ranked.c.court_rank == 1,
+               db.and_(ranked.c.status == 'completed', ranked.c.recent_rank <= RECENT_SCORES))
+    )).all()
+
+    latest, upcoming, recent = {}, {}, []
+    for m, rank_in_court, rank_overall in rows:
+        if rank_in_court == 1 and m.court_id is not None:
+            (latest if m.status == 'completed' else upcoming)[m.court_id] = m
+        if m.status == 'completed' and rank_overall <= RECENT_SCORES:
+            recent.append((rank_overall, m))
+    recent.sort(key=lambda item: item[0])
+
     courts = Court.query.filter_by(tournament_id=tournament_id).order_by(Court.court_number).all()
-    courts_data = []
-    for court in courts:
-        lat = Match.query.filter_by(court_id=court.id, status='completed').order_by(Match.completed_at.desc()).first()
-        nxt = Match.query.filter_by(court_id=court.id, status='scheduled').order_by(Match.scheduled_time, Match.match_number).first()
-        ci = {'id': court.id, 'number': court.court_number, 'manager': court.manager_name or '-', 'latest_result': None, 'next_match': None}
-        if lat:
-            ci['latest_result'] = {'id': lat.id, 'number': lat.match_number, 'team1': lat.get_team1_display(), 'team2': lat.get_team2_display(), 'score': lat.get_score_display(), 'category': lat.category, 'completed_at': lat.completed_at.strftime('%H:%M') if lat.completed_at else None}
-        if nxt:
-            ci['next_match'] = {'id': nxt.id, 'number': nxt.match_number, 'team1': nxt.get_team1_display(), 'team2': nxt.get_team2_display(), 'category': nxt.category, 'time': nxt.scheduled_time.strftime('%H:%M') if nxt.scheduled_time else None}
-        courts_data.append(ci)
-    recent = Match.query.filter_by(tournament_id=tournament_id, status='completed').order_by(Match.completed_at.desc()).limit(20).all()
-    recent_scores = [{'number': m.match_number, 'team1': m.get_team1_display(), 'team2': m.get_team2_display(), 'score': m.get_score_display(), 'category': m.category, 'court': m.court_number} for m in recent]
-    total = Match.query.filter_by(tournament_id=tournament_id).count()
-    completed = Match.query.filter_by(tournament_id=tournament_id, status='completed').count()
-    return jsonify({'courts': courts_data, 'recent_scores': recent_scores, 'stats': {'total': total, 'completed': completed, 'remaining': total - completed}, 'timestamp': datetime.utcnow().strftime('%H:%M:%S')})
+    courts_data = [{'id': court.id, 'number': court.court_number, 'manager': court.manager_name or '-',
+                    'latest_result': _latest_result(latest.get(court.id)), 'next_match': _next_match(upcoming.get(court.id))}
+                   for court in courts]
+    recent_scores = [_recent_score(m) for _, m in recent]
+    return {'courts': courts_data, 'recent_scores': recent_scores, 'stats': _live_stats(tournament_id)}
+
+
+def _live_stats(tournament_id):
+    total, completed = db.session.execute(db.select(
+        db.func.count(Match.id),
+        db.func.coalesce(db.func.sum(db.case((Match.status == 'completed', 1), else_=0)), 0)
+    ).where(Match.tournament_id == tournament_id)).one()
+    return {'total': total, 'completed': completed, 'remaining': total - completed}
+
+
+def _latest_result(lat):
+    if not lat:
+        return None
+    return {'id': lat.id, 'number': lat.match_number, 'team1': lat.get_team1_display(), 'team2': lat.get_team2_display(), 'score': lat.get_score_display(), 'category': lat.category, 'completed_at': lat.completed_at.strftime('%H:%M') if lat.completed_at else None}
+
+
+def _next_match(nxt):
+    if not nxt:
+        return None
+    return {'id': nxt.id, 'number': nxt.match_number, 'team1': nxt.get_team1_display(), 'team2': nxt.get_team2_display(), 'category': nxt.category, 'time': nxt.scheduled_time.strftime('%H:%M') if nxt.scheduled_time else None}
+
+
+def _recent_score(m):
+    return {'number': m.match_number, 'team1': m.get_team1_display(), 'team2': m.get_team2_display(), 'score': m.get_score_display(), 'category': m.category, 'court': m.court_number}
+
+
+def _court_event(match):
+    """Compact push after a score: the court's new result and next match, plus counts"""
+    nxt = Match.query.filter_by(court_id=match.court_id, status='scheduled').order_by(
+        Match.scheduled_time, Match.match_number).first() if match.court_id else None
+    return {
+        'court': {'id': match.court_id, 'number': match.court_number,
+                  'latest_result': _latest_result(match), 'next_match': _next_match(nxt)},
+        'recent': _recent_score(match),
+        'stats': _live_stats(match.tournament_id),
+    }
+
+
+@scoring.route('/api/live/<int:tournament_id>/stream')
+def api_live_stream(tournament_id):
+    """Live dashboard via SSE: full data on connect ('live'), then one 'court'
+    event per submitted score and a 'refresh' (refetch) after schedule or court
+    changes"""
+    def snapshot():
+        version, = cache_versions.versions(db.session, (f'scoring:{tournament_id}',))
+        return _served(_live_cache.get_or_build(tournament_id, version, lambda: _live_payload(tournament_id)))
+    return live_events.stream(f'scoring:{tournament_id}', snapshot=snapshot, event='live')
+
+
+# Any match or court change (score submitted, schedule edited) invalidates the live data
+cache_versions.watch(Match, None, lambda m: [f'scoring:{m.tournament_id}'])
+cache_versions.watch(Court, ('court_number', 'manager_name'), lambda c: [f'scoring:{c.tournament_id}'])
+
+# Schedule and court edits (not scores - those push 'court') make open dashboards refetch
+live_events.watch(Match, SCHEDULE_FIELDS, lambda conn, m: f'scoring:{m.tournament_id}',
+                  lambda conn, channel: {}, event='refresh')
+live_events.watch(Court, ('court_number', 'manager_name'), lambda conn, c: f'scoring:{c.tournament_id}',
+                  lambda conn, channel: {}, event='refresh')
 
 
 # ============================================================================
 # COURT MANAGER: MOBILE SCORING (simplified - just enter final score)
 # ============================================================================
 
+COMPLETED_SHOWN = 3  # recent results per court on the manager page
+
+
+def get_manager_court_list(court):
+    """All courts run by `court`'s manager (just `court` if it has none)"""
+    if not court.manager_name:
+        return [court]
+    return Court.query.filter_by(tournament_id=court.tournament_id, manager_name=court.manager_name).order_by(Court.court_number).all()
+
+
+def get_courts_with_matches(courts):
+    """[{'court', 'pending', 'completed'}] per court - all matches in one ranked query"""
+    completed_rank = db.func.row_number().over(partition_by=(Match.court_id, Match.status),
+                                               order_by=Match.completed_at.desc())
+    ranked = db.select(Match, completed_rank.label('completed_rank')).where(
+        Match.court_id.in_([c.id for c in courts]),
+        Match.status.in_(('scheduled', 'completed'))
+    ).subquery()
+    ranked_match = db.aliased(Match, ranked)
+    rows = db.session.execute(db.select(ranked_match, ranked.c.completed_rank).where(
+        db.or_(ranked.c.status == 'scheduled', ranked.c.completed_rank <= COMPLETED_SHOWN)
+    ).order_by(ranked.c.scheduled_time, ranked.c.match_number)).all()
+
+    grouped = {c.id: {'court': c, 'pending': [], 'completed': []} for c in courts}
+    for m, rank in sorted(rows, key=lambda row: row[1] if row[0].status == 'completed' else 0):
+        grouped[m.court_id]['pending' if m.status == 'scheduled' else 'completed'].append(m)
+    return list(grouped.values())
+
+
+def _match_json(m):
+    return {'id': m.id, 'number': m.match_number, 'category': m.category, 'status': m.status,
+            'time': m.scheduled_time.strftime('%H:%M') if m.scheduled_time else None,
+            'team1': m.get_team1_display(), 'team2': m.get_team2_display(),
+            'team1_score': m.team1_score, 'team2_score': m.team2_score}
+
+
+def record_score(match, court, score1, score2, idempotency_key=None):
+    """Set the final score; the caller flushes, publishes and commits"""
+    now = datetime.utcnow()
+    match.team1_score = score1
+    match.team2_score = score2
+    match.status = 'completed'
+    match.completed_at = now
+    match.score_submitted_at = now
+    match.submitted_by_court_id = court.id
+    if idempotency_key:
+        match.score_idempotency_key = idempotency_key
+
+
+def _publish_scores(matches):
+    # Visible to every worker's stream once committed; the flush bumps scoring:<id>
+    db.session.flush()
+    connection = db.session.connection()
+    for match in matches:
+        live_events.publish(connection, f'scoring:{match.tournament_id}', 'court', _court_event(match))
+
+
+def apply_score_batch(court, items):
+    """Apply queued score submits from a court manager. Returns per-item results.
+
+    Matches are loaded with one query (by id or stored idempotency key) and must
+    be on one of the manager's courts. An item whose `idempotency_key` is already
+    stored on its match reports 'duplicate' - retrying a flush is a no-op; a key
+    stored on another match is an 'error' for that item only. Does not commit.
+    """
+    court_ids = {c.id for c in get_manager_court_list(court)}
+    results = []
+    candidates = []  # (result, match_id, score1, score2, key)
+
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({'match_id': None, 'status': 'error', 'error': 'invalid item'})
+            continue
+        result = {'match_id': item.get('match_id')}
+        key = item.get('idempotency_key')
+        if key:
+            result['idempotency_key'] = key
+        results.append(result)
+        try:
+            scores = int(item.get('score_team1')), int(item.get('score_team2'))
+            if min(scores) < 0:
+                raise ValueError
+            candidates.append((result, int(item['match_id']), *scores, str(key)[:64] if key else None))
+        except (KeyError, TypeError, ValueError):
+            result.update(status='error', error='match_id and both scores are required')
+
+    ids = {match_id for _, match_id, _, _, _ in candidates}
+    keys = {key for _, _, _, _, key in candidates if key}
+    matches = {m.id: m for m in Match.query.filter(db.or_(
+        Match.id.in_(ids), Match.score_idempotency_key.in_(keys) if keys else db.false()
+    )).all()} if ids else {}
+    stored_keys = {m.score_idempotency_key: m.id for m in matches.values() if m.score_idempotency_key}
+
+    applied = []
+    seen_keys = set()
+    for result, match_id, score1, score2, key in candidates:
+        match = matches.get(match_id)
+        if key and (stored_keys.get(key) == match_id or key in seen_keys):
+            result['status'] = 'duplicate'
+        elif key and key in stored_keys:
+            result.update(status='error', error='idempotency_key already used for another match')
+        elif match is None or match.court_id not in court_ids:
+            result.update(status='error', error='unknown match')
+        else:
+            record_score(match, court, score1, score2, key)
+            applied.append(match)
+            result['status'] = 'applied'
+        if key:
+            seen_keys.add(key)
+        if match is not None and result['status'] != 'error':
+            result['match'] = _match_json(match)
+
+    if applied:
+        _publish_scores(applied)
+    return results
+
+
 @scoring.route('/court/<token>')
 def court_manager(token):
     """Court Manager page - shows ALL courts for this manager"""
     court = Court.query.filter_by(manager_token=token).first_or_404()
     tournament = get_tournament_or_404(court.tournament_id)
-    manager_name = court.manager_name
-    
-    # Get ALL courts for this manager
-    if manager_name:
-        my_courts = Court.query.filter_by(tournament_id=court.tournament_id, manager_name=manager_name).order_by(Court.court_number).all()
-    else:
-        my_courts = [court]
-    
-    # Get matches per court
-    courts_with_matches = []
-    for c in my_courts:
-        pending = Match.query.filter_by(court_id=c.id, status='scheduled').order_by(Match.scheduled_time, Match.match_number).all()
-        completed = Match.query.filter_by(court_id=c.id, status='completed').order_by(Match.completed_at.desc()).limit(3).all()
-        courts_with_matches.append({'court': c, 'pending': pending, 'completed': completed})
-    
+    courts_with_matches = get_courts_with_matches(get_manager_court_list(court))
     return render_template('scoring/court_manager.html', court=court, tournament=tournament,
-                         courts_with_matches=courts_with_matches, token=token, manager_name=manager_name)
+                         courts_with_matches=courts_with_matches, token=token, manager_name=court.manager_name)
+
+
+@scoring.route('/court/<token>/api')
+def api_court_manager(token):
+    """All of the manager's courts with pending and recent matches"""
+    court = Court.query.filter_by(manager_token=token).first_or_404()
+    return jsonify({
+        'manager': court.manager_name,
+        'courts': [{'id': item['court'].id, 'number': item['court'].court_number,
+                    'pending': [_match_json(m) for m in item['pending']],
+                    'completed': [_match_json(m) for m in item['completed']]}
+                   for item in get_courts_with_matches(get_manager_court_list(court))],
+        'timestamp': datetime.utcnow().strftime('%H:%M:%S'),
+    })
+
+
+@scoring.route('/court/<token>/api/scores', methods=['POST'])
+def api_submit_scores(token):
+    """Flush a court manager's queued scores:
+    {"scores": [{"match_id", "score_team1", "score_team2", "idempotency_key"}]}"""
+    court = Court.query.filter_by(manager_token=token).first_or_404()
+    items = (request.get_json(silent=True) or {}).get('scores')
+    if not isinstance(items, list):
+        return jsonify({'success': False, 'error': 'scores must be a list'}), 400
+
+    try:
+        results = apply_score_batch(court, items)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    return jsonify({'success': True, 'results': results, 'counts': counts})
 
 
 @scoring.route('/court/<token>/submit-score/<int:match_id>', methods=['POST'])
@@ -427,12 +721,8 @@ def submit_score(token, match_id):
     score2 = request.form.get('score_team2')
     if score1 is not None and score2 is not None:
         try:
-            match.team1_score = int(score1)
-            match.team2_score = int(score2)
-            match.status = 'completed'
-            match.completed_at = datetime.utcnow()
-            match.score_submitted_at = datetime.utcnow()
-            match.submitted_by_court_id = court.id
+            record_score(match, court, int(score1), int(score2))
+            _publish_scores([match])
             db.session.commit()
             flash(f'{match.get_team1_display()} {score1}-{score2} {match.get_team2_display()}', 'success')
         except Exception as e:
@@ -2,6 +2,7 @@ from flask import Blueprint, request
 from models import db, Player, Event, PlayerResponse, event_players, get_whatsapp_sponsor_block
 from datetime import datetime
 from utils.whatsapp import send_whatsapp_message
+from utils.phone import to_e164
 
 webhook = Blueprint('webhook', __name__)
 
@@ -123,8 +124,9 @@ def whatsapp_webhook():
     print(f"ðŸ’¬ Message: {body}")
     print(f"{'='*60}")
     
-    # Find player by phone number
-    player = Player.query.filter_by(phone=from_number).first()
+    # Find player by phone number (Twilio sends E.164; stored numbers are as typed)
+    phone_e164 = to_e164(from_number)
+    player = Player.query.filter_by(phone_e164=phone_e164).first() if phone_e164 else None
     
     if not player:
         print(f"âŒ Player not found: {from_number}")
@@ -4,8 +4,9 @@ WPC Routes - Check-in, Dashboard, Welcome Pack
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from datetime import datetime, timezone
 from urllib.parse import quote
-import re
-from models import db, WPCPlayer, WPCRegistration, Sponsor
+from models import db, WPCPlayer, WPCRegistration, Sponsor, EventSponsor
+from utils import cache_versions, checkin_counters, live_events, search_index
+from utils.phone import to_e164, WPC_MIN_DIGITS
 
 wpc = Blueprint('wpc', __name__, url_prefix='/wpc')
 
@@ -70,51 +71,39 @@ def player_checkin(token):
 @wpc.route('/pass/<token>')
 def boarding_pass(token):
     """Show boarding pass with match schedule"""
-    from models import WPCMatch
-    from collections import defaultdict
-    
     player = WPCPlayer.query.filter_by(checkin_token=token).first_or_404()
-    registrations = player.registrations.all()
     
-    # Find player's matches
-    first_name = player.first_name.lower()
-    last_name = player.last_name.lower()
+    # Matches, registrations and sponsor are served from the cache until one of
+    # the versions they were built from is bumped
+    current = cache_versions.versions(db.session, _boarding_pass_versions(player.id))
+    payload = _boarding_pass_cache.get_or_build(player.id, current, lambda: _boarding_pass_payload(player))
     
-    all_matches = WPCMatch.query.order_by(WPCMatch.match_date, WPCMatch.match_time).all()
+    return render_template('wpc/boarding_pass.html', player=player, **payload)
+
+
+_boarding_pass_cache = cache_versions.VersionedCache()
+
+
+def _boarding_pass_versions(player_id):
+    return ('wpc_schedule', 'wpc_registrations', 'sponsors', f'wpc_player:{player_id}')
+
+
+def _boarding_pass_payload(player):
+    """Template data for a boarding pass apart from the player row itself"""
+    from routes.wpc_matches import player_matches
+    from collections import defaultdict
     
-    player_matches = []
-    for m in all_matches:
-        names = [
-            (m.player1_name or '').lower(),
-            (m.player2_name or '').lower(),
-            (m.opponent1_name or '').lower(),
-            (m.opponent2_name or '').lower()
-        ]
-        
-        for name in names:
-            if first_name in name and last_name in name:
-                is_team1 = first_name in (m.player1_name or '').lower() or first_name in (m.player2_name or '').lower()
-                
-                if is_team1:
-                    partner = m.player2_name if m.player2_name and first_name not in (m.player2_name or '').lower() else (m.player1_name if first_name not in (m.player1_name or '').lower() else None)
-                    opponents = f"{m.opponent1_name}" + (f" & {m.opponent2_name}" if m.opponent2_name else "")
-                else:
-                    partner = m.opponent2_name if m.opponent2_name and first_name not in (m.opponent2_name or '').lower() else (m.opponent1_name if first_name not in (m.opponent1_name or '').lower() else None)
-                    opponents = f"{m.player1_name}" + (f" & {m.player2_name}" if m.player2_name else "")
-                
-                player_matches.append({
-                    'date': m.match_date,
-                    'time': m.match_time,
-                    'court': m.court,
-                    'division': m.division,
-                    'partner': partner if m.is_doubles else None,
-                    'opponents': opponents,
-                    'is_doubles': m.is_doubles
-                })
-                break
+    registrations = [{
+        'division_type': reg.division_type,
+        'age_category': reg.age_category,
+        'partner_name': reg.partner_name,
+    } for reg in player.registrations]
+    
+    # Player's matches via the wpc_match_participant index
+    schedule = player_matches(player.id)
     
     matches_by_date = defaultdict(list)
-    for match in player_matches:
+    for match in schedule:
         matches_by_date[match['date']].append(match)
 
     # Rotating sponsor based on player ID
@@ -128,12 +117,18 @@ def boarding_pass(token):
             'text': s.boarding_pass_text or s.name,
         }
 
-    return render_template('wpc/boarding_pass.html',
-                         player=player,
-                         registrations=registrations,
-                         matches_by_date=dict(matches_by_date),
-                         total_matches=len(player_matches),
-                         sponsor=sponsor)
+    return {
+        'registrations': registrations,
+        'matches_by_date': dict(matches_by_date),
+        'total_matches': len(schedule),
+        'sponsor': sponsor,
+    }
+
+
+cache_versions.watch(WPCRegistration, ('player_id', 'division_type', 'division_name', 'age_category', 'partner_name'),
+                     lambda reg: [f'wpc_player:{reg.player_id}'])
+cache_versions.watch(Sponsor, None, lambda sponsor: ['sponsors'])
+cache_versions.watch(EventSponsor, None, lambda placement: ['sponsors'])
                          
 
 # ============================================================================
@@ -143,14 +138,7 @@ def boarding_pass(token):
 @wpc.route('/admin')
 def admin_dashboard():
     """WPC Admin Dashboard"""
-    total_players = WPCPlayer.query.count()
-    checked_in = WPCPlayer.query.filter_by(checked_in=True).count()
-    with_phone = WPCPlayer.query.filter(
-        WPCPlayer.phone.isnot(None), 
-        WPCPlayer.phone != '-', 
-        WPCPlayer.phone != ''
-    ).count()
-    welcome_packs = WPCPlayer.query.filter_by(welcome_pack_received=True).count()
+    counts = checkin_counters.totals(db.session, 'wpc')
     
     # Recent check-ins
     recent = WPCPlayer.query.filter_by(checked_in=True).order_by(
@@ -159,12 +147,12 @@ def admin_dashboard():
     
     return render_template('wpc/admin_dashboard.html',
                          stats={
-                             'total': total_players,
-                             'checked_in': checked_in,
-                             'pending': total_players - checked_in,
-                             'with_phone': with_phone,
-                             'without_phone': total_players - with_phone,
-                             'welcome_packs': welcome_packs
+                             'total': counts['total'],
+                             'checked_in': counts['checked_in'],
+                             'pending': counts['pending'],
+                             'with_phone': counts['with_phone'],
+                             'without_phone': counts['total'] - counts['with_phone'],
+                             'welcome_packs': counts['welcome_packs']
                          },
                          recent=recent)
 
@@ -206,27 +194,14 @@ def admin_search():
     if len(query) < 2:
         return jsonify({'players': []})
     
-    players = WPCPlayer.query.filter(
-        db.or_(
-            WPCPlayer.first_name.ilike(f'%{query}%'),
-            WPCPlayer.last_name.ilike(f'%{query}%'),
-            WPCPlayer.email.ilike(f'%{query}%')
-        )
-    ).limit(15).all()
+    # Ranked, accent-insensitive lookup in the in-memory roster index
+    index = search_index.roster_index('wpc', db.select(
+        WPCPlayer.id, WPCPlayer.updated_at, WPCPlayer.first_name, WPCPlayer.last_name, WPCPlayer.email))
+    ids = index.search(query, limit=15)
     
-    return jsonify({
-        'players': [{
-            'id': p.id,
-            'name': p.get_full_name(),
-            'country': p.country,
-            'email': p.email,
-            'phone': p.phone,
-            'checked_in': p.checked_in,
-            'checked_in_at': p.checked_in_at.strftime('%H:%M') if p.checked_in_at else None,
-            'welcome_pack': p.welcome_pack_received,
-            'token': p.checkin_token
-        } for p in players]
-    })
+    found = {p.id: p for p in WPCPlayer.query.filter(WPCPlayer.id.in_(ids))} if ids else {}
+    
+    return jsonify({'players': [_station_player_json(found[i]) for i in ids if i in found]})
 
 
 # ============================================================================
@@ -236,20 +211,57 @@ def admin_search():
 @wpc.route('/admin/checkin')
 def staff_checkin():
     """Staff check-in station"""
-    players = WPCPlayer.query.order_by(WPCPlayer.last_name).all()
+    # Countries as collapsed groups; players are loaded per group via JSON
+    countries = sorted(checkin_counters.groups(db.session, 'wpc', 0, 'country').items(),
+                       key=lambda item: (not item[0], item[0]))
     
-    total = len(players)
-    checked_in = len([p for p in players if p.checked_in])
-    welcome_packs = len([p for p in players if p.welcome_pack_received])
+    recent = WPCPlayer.query.filter_by(checked_in=True).order_by(
+        WPCPlayer.checked_in_at.desc()
+    ).limit(10).all()
     
     return render_template('wpc/staff_checkin.html',
-                         players=players,
-                         stats={
-                             'total': total,
-                             'checked_in': checked_in,
-                             'pending': total - checked_in,
-                             'welcome_packs': welcome_packs
-                         })
+                         countries=countries,
+                         recent=recent,
+                         stats=_checkin_counts(db.session))
+
+
+def _station_player_json(p):
+    return {
+        'id': p.id,
+        'name': p.get_full_name(),
+        'initials': f"{p.first_name[:1]}{p.last_name[:1]}",
+        'country': p.country,
+        'email': p.email,
+        'phone': p.phone,
+        'checked_in': p.checked_in,
+        'checked_in_at': p.checked_in_at.strftime('%H:%M') if p.checked_in_at else None,
+        'welcome_pack': p.welcome_pack_received,
+        'token': p.checkin_token
+    }
+
+
+@wpc.route('/admin/checkin/players')
+def staff_checkin_players():
+    """One page of station players, optionally for a single country (AJAX endpoint)"""
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 50, type=int), 100)
+    
+    query = WPCPlayer.query
+    if 'country' in request.args:
+        country = request.args.get('country')
+        query = query.filter(WPCPlayer.country == country if country else
+                             db.or_(WPCPlayer.country.is_(None), WPCPlayer.country == ''))
+    
+    pagination = query.order_by(WPCPlayer.last_name, WPCPlayer.id).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    return jsonify({
+        'players': [_station_player_json(p) for p in pagination.items],
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'total': pagination.total,
+        'has_next': pagination.has_next
+    })
 
 
 @wpc.route('/admin/checkin/<int:player_id>', methods=['POST'])
@@ -310,29 +322,58 @@ def give_welcome_pack(player_id):
 # API: STATS
 # ============================================================================
 
+def _checkin_counts(conn):
+    """Check-in counters (maintained counter row)"""
+    counts = checkin_counters.totals(conn, 'wpc')
+    total, checked_in = counts['total'], counts['checked_in']
+    return {
+        'total': total,
+        'checked_in': checked_in,
+        'pending': total - checked_in,
+        'welcome_packs': counts['welcome_packs'],
+        'percentage': round(checked_in / total * 100, 1) if total > 0 else 0,
+    }
+
+
+def _describe_checkin(player, kind):
+    return {
+        'kind': kind,
+        'name': player.get_full_name(),
+        'country': player.country,
+        'checked_in': bool(player.checked_in),
+        'welcome_pack': bool(player.welcome_pack_received),
+        'time': player.checked_in_at.strftime('%H:%M') if player.checked_in_at else None,
+    }
+
+
+live_events.watch(
+    WPCPlayer, ['checked_in', 'welcome_pack_received'],
+    lambda conn, player: 'wpc',
+    lambda conn, channel: _checkin_counts(conn),
+    _describe_checkin)
+
+
 @wpc.route('/api/stats')
 def api_stats():
     """Live stats for dashboard"""
-    total = WPCPlayer.query.count()
-    checked_in = WPCPlayer.query.filter_by(checked_in=True).count()
-    welcome_packs = WPCPlayer.query.filter_by(welcome_pack_received=True).count()
+    stats = _checkin_counts(db.session)
     
     recent = WPCPlayer.query.filter_by(checked_in=True).order_by(
         WPCPlayer.checked_in_at.desc()
     ).limit(5).all()
     
-    return jsonify({
-        'total': total,
-        'checked_in': checked_in,
-        'pending': total - checked_in,
-        'welcome_packs': welcome_packs,
-        'percentage': round(checked_in / total * 100, 1) if total > 0 else 0,
-        'recent': [{
-            'name': p.get_full_name(),
-            'country': p.country,
-            'time': p.checked_in_at.strftime('%H:%M') if p.checked_in_at else None
-        } for p in recent]
-    })
+    stats['recent'] = [{
+        'name': p.get_full_name(),
+        'country': p.country,
+        'time': p.checked_in_at.strftime('%H:%M') if p.checked_in_at else None
+    } for p in recent]
+    return jsonify(stats)
+
+
+@wpc.route('/api/stream')
+def api_stats_stream():
+    """Live stats pushed via SSE (one event per committed change)"""
+    return live_events.stream('wpc', snapshot=lambda: _checkin_counts(db.session))
 
 
 # ============================================================================
@@ -419,26 +460,18 @@ def normalize_phone(phone):
 
     Strips spaces, hyphens, parentheses; keeps digits (wa.me adds + itself).
     """
-    if not phone:
-        return None
-    digits = re.sub(r'\D', '', phone)
-    digits = digits.lstrip('0') if digits.startswith('00') else digits  # 0044 -> 44
-    if len(digits) < 8:
-        return None
-    return digits
+    e164 = to_e164(phone, min_digits=WPC_MIN_DIGITS)
+    return e164[1:] if e164 else None
 
 
 def _invitable_query(country=None, only_checkedin=False, include_no_optin=False):
     """Players eligible for a pool invite.
 
-    Default: whatsapp_optin = true AND marketing_optin = true AND a valid phone.
-    With include_no_optin, BOTH opt-in requirements are relaxed (phone only) -
-    a compliance risk surfaced in the UI.
+    Default: whatsapp_optin = true AND marketing_optin = true AND a valid phone
+    (phone_e164, normalized on write). With include_no_optin, BOTH opt-in
+    requirements are relaxed (phone only) - a compliance risk surfaced in the UI.
     """
-    q = WPCPlayer.query.filter(
-        WPCPlayer.phone.isnot(None),
-        WPCPlayer.phone != '',
-    )
+    q = WPCPlayer.query.filter(WPCPlayer.phone_e164.isnot(None))
     if not include_no_optin:
         q = q.filter(
             WPCPlayer.whatsapp_optin.is_(True),
@@ -489,48 +522,72 @@ def _player_payload(player):
     }
 
 
-def _next_in_wave(country, only_checkedin, include_no_optin, exclude_ids=None):
-    """Find the next un-invited player with a valid phone; auto-fail invalid phones.
+def _queue_key(country):
+    """Keyset order of a wave: (country, last_name, id)"""
+    if country:
+        return (WPCPlayer.last_name, WPCPlayer.id)  # country fixed by the filter
+    return (db.func.coalesce(WPCPlayer.country, ''), WPCPlayer.last_name, WPCPlayer.id)
+
+
+def _next_in_wave(country, only_checkedin, include_no_optin, after=None):
+    """Next un-invited player with a valid phone, after the `after` player.
 
-    exclude_ids are skipped without modifying the DB ("skip for now" - they stay in
-    the queue and reappear when the wave is restarted).
+    Keyset cursor on (country, last_name, id): players skipped "for now" lie
+    behind the cursor and stay untouched in the queue, reappearing when the
+    wave is restarted. One indexed query per click.
     """
-    exclude_ids = exclude_ids or set()
+    key = _queue_key(country)
     q = _invitable_query(country, only_checkedin, include_no_optin) \
-        .filter(WPCPlayer.pool_invite_sent_at.is_(None)) \
-        .order_by(WPCPlayer.country, WPCPlayer.last_name)
-    next_player = None
-    dirty = False
-    for p in q.all():
-        if p.id in exclude_ids:
-            continue  # skipped for now - leave untouched in the queue
-        if normalize_phone(p.phone):
-            next_player = p
-            break
-        # Unparseable phone -> mark failed so the queue advances past it
-        p.pool_invite_sent_at = datetime.now(timezone.utc)
-        p.pool_invite_status = 'failed'
-        dirty = True
-    if dirty:
+        .filter(WPCPlayer.pool_invite_sent_at.is_(None))
+    if after is not None:
+        cursor = (after.last_name, after.id) if country else (after.country or '', after.last_name, after.id)
+        q = q.filter(db.tuple_(*key) > db.tuple_(*cursor))
+    return q.order_by(*key).first()
+
+
+def _fail_unusable_phones(country, only_checkedin):
+    """Mark players whose phone can't be used as failed, in one UPDATE."""
+    q = WPCPlayer.query.filter(
+        WPCPlayer.pool_invite_sent_at.is_(None),
+        WPCPlayer.phone.isnot(None),
+        WPCPlayer.phone != '',
+        WPCPlayer.phone_e164.is_(None),
+    )
+    if only_checkedin:
+        q = q.filter(WPCPlayer.checked_in.is_(True))
+    if country:
+        q = q.filter(WPCPlayer.country == country)
+    if q.update({'pool_invite_sent_at': datetime.now(timezone.utc), 'pool_invite_status': 'failed'},
+                synchronize_session=False):
         db.session.commit()
-    return next_player
+
+
+def _invite_counts(only_checkedin, include_no_optin, country=None):
+    """{country: {total, done, sent, skipped}} for valid-phone invitable players - one GROUP BY"""
+    P = WPCPlayer
+    rows = _invitable_query(country, only_checkedin, include_no_optin).with_entities(
+        P.country,
+        db.func.count(P.id),
+        db.func.count(P.pool_invite_sent_at),
+        db.func.sum(db.case((P.pool_invite_status == 'sent', 1), else_=0)),
+    ).group_by(P.country).all()
+
+    counts = {}
+    for row_country, total, done, sent in rows:
+        d = counts.setdefault(row_country or 'Unknown', {'total': 0, 'done': 0, 'sent': 0, 'skipped': 0})
+        d['total'] += total
+        d['done'] += done
+        d['sent'] += sent or 0
+        d['skipped'] += done - (sent or 0)
+    return counts
 
 
 def _wave_progress(country, only_checkedin, include_no_optin):
     """(done, total, sent, skipped) for valid-phone invitable players in this country."""
-    players = _invitable_query(country, only_checkedin, include_no_optin).all()
-    total = done = sent = skipped = 0
-    for p in players:
-        if not normalize_phone(p.phone):
-            continue
-        total += 1
-        if p.pool_invite_sent_at is not None:
-            done += 1
-            if p.pool_invite_status == 'sent':
-                sent += 1
-            else:
-                skipped += 1
-    return done, total, sent, skipped
+    d = {'total': 0, 'done': 0, 'sent': 0, 'skipped': 0}
+    for counts in _invite_counts(only_checkedin, include_no_optin, country).values():
+        d = {k: d[k] + counts[k] for k in d}
+    return d['done'], d['total'], d['sent'], d['skipped']
 
 
 @wpc.route('/admin/pool-invite')
@@ -541,19 +598,9 @@ def pool_invite_overview():
     only_checkedin = request.args.get('only_checkedin') == '1'
     include_no_optin = request.args.get('include_no_optin') == '1'
 
-    players = _invitable_query(only_checkedin=only_checkedin,
-                               include_no_optin=include_no_optin).all()
-    countries = {}
-    for p in players:
-        if not normalize_phone(p.phone):
-            continue
-        d = countries.setdefault(p.country or 'Unknown', {'total': 0, 'sent': 0})
-        d['total'] += 1
-        if p.pool_invite_sent_at is not None:
-            d['sent'] += 1
-
-    rows = [{'country': c, 'total': d['total'], 'sent': d['sent'],
-             'remaining': d['total'] - d['sent']} for c, d in countries.items()]
+    countries = _invite_counts(only_checkedin, include_no_optin)
+    rows = [{'country': c, 'total': d['total'], 'sent': d['done'],
+             'remaining': d['total'] - d['done']} for c, d in countries.items()]
     rows.sort(key=lambda r: r['country'])
     totals = {
         'total': sum(r['total'] for r in rows),
@@ -574,6 +621,7 @@ def pool_invite_wave():
     only_checkedin = request.args.get('only_checkedin') == '1'
     include_no_optin = request.args.get('include_no_optin') == '1'
 
+    _fail_unusable_phones(country, only_checkedin)
     next_player = _next_in_wave(country, only_checkedin, include_no_optin)
     done, total, sent, skipped = _wave_progress(country, only_checkedin, include_no_optin)
     payload = _player_payload(next_player) if next_player else None
@@ -605,7 +653,7 @@ def _mark_and_next(default_status):
             db.session.rollback()
             return jsonify({'ok': False, 'error': str(e)}), 500
 
-    next_player = _next_in_wave(country, only_checkedin, include_no_optin)
+    next_player = _next_in_wave(country, only_checkedin, include_no_optin, after=player)
     done, total, sent, skipped = _wave_progress(country, only_checkedin, include_no_optin)
     if next_player is None:
         return jsonify({'ok': True, 'complete': True, 'sent': sent, 'skipped': skipped})
@@ -625,21 +673,18 @@ def pool_invite_mark_failed():
 
 @wpc.route('/admin/pool-invite/next')
 def pool_invite_next():
-    """Return the next player, excluding the given ids - WITHOUT marking anyone.
+    """Return the player after `after` (a player id) - WITHOUT marking anyone.
 
-    Used by "Skip for now": excluded ids are kept only in the browser, so the
-    skipped players stay uninvited and reappear when the wave is restarted.
+    Used by "Skip for now": the skipped player stays uninvited behind the
+    cursor and reappears when the wave is restarted.
     """
     country = request.args.get('country') or ''
     only_checkedin = request.args.get('only_checkedin') == '1'
     include_no_optin = request.args.get('include_no_optin') == '1'
-    exclude_ids = set()
-    for part in (request.args.get('exclude') or '').split(','):
-        part = part.strip()
-        if part.isdigit():
-            exclude_ids.add(int(part))
+    after_id = request.args.get('after', type=int)
+    after = WPCPlayer.query.get(after_id) if after_id else None
 
-    next_player = _next_in_wave(country, only_checkedin, include_no_optin, exclude_ids=exclude_ids)
+    next_player = _next_in_wave(country, only_checkedin, include_no_optin, after=after)
     done, total, sent, skipped = _wave_progress(country, only_checkedin, include_no_optin)
     if next_player is None:
         return jsonify({'ok': True, 'complete': True, 'sent': sent, 'skipped': skipped})
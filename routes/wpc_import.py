@@ -3,10 +3,15 @@ WPC Player Import Script
 Imports players from Pickleball Global CSV export
 """
 import csv
+import io
 import secrets
 from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from models import db, WPCPlayer, WPCRegistration
+from utils import cache_versions, checkin_counters
+from utils.bulk_import import BulkUpsert, CHUNK_SIZE, chunked
+from utils.phone import to_e164, WPC_MIN_DIGITS
+from routes.wpc_matches import resolve_unmatched_participants
 
 wpc_import = Blueprint('wpc_import', __name__)
 
@@ -55,115 +60,117 @@ def clean_phone(phone):
     return phone.strip()
 
 
+def iter_csv_rows(f):
+    """(player_data, registration_data) per row of a Pickleball Global CSV, streamed"""
+    for row in csv.DictReader(f):
+        pgid = row.get('PGID', '').strip()
+        if not pgid:
+            continue
+        
+        first_name, last_name = parse_name(row.get('PLAYER NAME', ''))
+        phone = clean_phone(row.get('PHONE', ''))
+        player_data = {
+            'pgid': pgid,
+            'first_name': first_name,
+            'last_name': last_name,
+            'email': row.get('EMAIL ID', '').strip() or None,
+            'phone': phone,
+            'phone_e164': to_e164(phone, min_digits=WPC_MIN_DIGITS),  # set here: Core writes skip the model validator
+            'country': row.get('COUNTRY', '').strip() or None,
+            'dupr_id': row.get('DUPR', '').strip() or None,
+            'dupr_rating': row.get('RATING', '').strip() or None,
+            'gender': row.get('GENDER', '').strip() or None,
+            'date_of_birth': parse_date(row.get('DOB', '')),
+            'address': row.get('ADDRESS', '').strip() or None,
+        }
+        
+        division_name = row.get('DIVISION NAME', '')
+        registration_data = {
+            'pgid': pgid,
+            'division_type': row.get('DIVISION TYPE', '').strip(),
+            'division_name': division_name,
+            'age_category': parse_age_category(division_name),
+            'skill_level': parse_skill_level(row.get('RATING', '')),
+            'partner_name': row.get('PARTNER', '').strip() or None,
+        }
+        yield player_data, registration_data
+
+
 def import_from_csv(csv_path):
     """Import players from Pickleball Global CSV"""
     players_data = {}
     registrations_data = []
     
     with open(csv_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        
-        for row in reader:
-            pgid = row.get('PGID', '').strip()
-            if not pgid:
-                continue
-            
-            # Parse player data (only once per PGID)
-            if pgid not in players_data:
-                first_name, last_name = parse_name(row.get('PLAYER NAME', ''))
-                
-                players_data[pgid] = {
-                    'pgid': pgid,
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    'email': row.get('EMAIL ID', '').strip() or None,
-                    'phone': clean_phone(row.get('PHONE', '')),
-                    'country': row.get('COUNTRY', '').strip() or None,
-                    'dupr_id': row.get('DUPR', '').strip() or None,
-                    'dupr_rating': row.get('RATING', '').strip() or None,
-                    'gender': row.get('GENDER', '').strip() or None,
-                    'date_of_birth': parse_date(row.get('DOB', '')),
-                    'address': row.get('ADDRESS', '').strip() or None,
-                }
-            
-            # Parse registration data
-            division_name = row.get('DIVISION NAME', '')
-            registrations_data.append({
-                'pgid': pgid,
-                'division_type': row.get('DIVISION TYPE', '').strip(),
-                'division_name': division_name,
-                'age_category': parse_age_category(division_name),
-                'skill_level': parse_skill_level(row.get('RATING', '')),
-                'partner_name': row.get('PARTNER', '').strip() or None,
-            })
+        for player_data, registration_data in iter_csv_rows(f):
+            # Player data only once per PGID
+            players_data.setdefault(player_data['pgid'], player_data)
+            registrations_data.append(registration_data)
     
     return players_data, registrations_data
 
 
-def import_to_database(players_data, registrations_data):
-    """Import parsed data into database"""
-    stats = {
-        'players_created': 0,
-        'players_updated': 0,
-        'registrations_created': 0,
-        'errors': []
-    }
+PLAYER_UPDATE_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'phone_e164', 'country', 'dupr_id',
+                        'dupr_rating', 'gender', 'date_of_birth', 'address')
+
+
+def _new_player(values):
+    values['checkin_token'] = secrets.token_urlsafe(32)
+
+
+def import_rows(rows, dry_run=False):
+    """Upsert (player_data, registration_data) pairs chunk by chunk.
     
-    player_id_map = {}  # pgid -> player.id
+    Per chunk: one query resolves existing PGIDs, one the existing
+    (player, division type, division name) registrations; writes are
+    executemany INSERT/UPDATE. With dry_run nothing is written and `diff`
+    lists the planned changes.
+    """
+    players = BulkUpsert(WPCPlayer, key=('pgid',), update_fields=PLAYER_UPDATE_FIELDS,
+                         prepare=_new_player, dry_run=dry_run)
+    registrations = BulkUpsert(WPCRegistration, key=('player_id', 'division_type', 'division_name'),
+                               dry_run=dry_run)
     
-    # Import players
-    for pgid, data in players_data.items():
-        try:
-            player = WPCPlayer.query.filter_by(pgid=pgid).first()
-            
-            if player:
-                # Update existing player
-                for key, value in data.items():
-                    if key != 'pgid' and value is not None:
-                        setattr(player, key, value)
-                stats['players_updated'] += 1
-            else:
-                # Create new player
-                player = WPCPlayer(**data)
-                player.generate_checkin_token()
-                db.session.add(player)
-                stats['players_created'] += 1
-            
-            db.session.flush()  # Get player.id
-            player_id_map[pgid] = player.id
-            
-        except Exception as e:
-            stats['errors'].append(f"Player {pgid}: {str(e)}")
+    for chunk in chunked(rows, CHUNK_SIZE):
+        # first row per PGID wins, as before
+        players.run(player_data for player_data, _ in chunk)
+        registrations.run(
+            {**{k: v for k, v in reg_data.items() if k != 'pgid'}, 'player_id': players.ids[(reg_data['pgid'],)]}
+            for _, reg_data in chunk
+        )
     
-    # Import registrations
-    for reg_data in registrations_data:
-        try:
-            pgid = reg_data.pop('pgid')
-            player_id = player_id_map.get(pgid)
-            
-            if not player_id:
-                continue
-            
-            # Check if registration already exists
-            existing = WPCRegistration.query.filter_by(
-                player_id=player_id,
-                division_type=reg_data['division_type'],
-                division_name=reg_data['division_name']
-            ).first()
-            
-            if not existing:
-                reg = WPCRegistration(player_id=player_id, **reg_data)
-                db.session.add(reg)
-                stats['registrations_created'] += 1
-                
-        except Exception as e:
-            stats['errors'].append(f"Registration: {str(e)}")
+    # Core writes bypass the flush hooks
+    if not dry_run and (players.stats['created'] or players.stats['updated']):
+        checkin_counters.reconcile(db.session.connection(), 'wpc')
+        resolve_unmatched_participants(db.session.connection())  # schedule names of new/renamed players
+    if not dry_run and registrations.stats['created']:
+        cache_versions.bump(db.session, 'wpc_registrations')
     
+    return {
+        'players_created': players.stats['created'],
+        'players_updated': players.stats['updated'],
+        'players_unchanged': players.stats['skipped'],
+        'registrations_created': registrations.stats['created'],
+        'registrations_skipped': registrations.stats['skipped'],
+        'dry_run': dry_run,
+        'diff': players.diff + registrations.diff,
+        'errors': []
+    }
+
+
+def import_to_database(players_data, registrations_data, dry_run=False):
+    """Import parsed data into database"""
+    rows = ((players_data[reg_data['pgid']], reg_data)
+            for reg_data in registrations_data if reg_data['pgid'] in players_data)
     try:
-        db.session.commit()
+        stats = import_rows(rows, dry_run=dry_run)
+        if not dry_run:
+            db.session.commit()
     except Exception as e:
         db.session.rollback()
-        stats['errors'].append(f"Commit error: {str(e)}")
+        stats = {'players_created': 0, 'players_updated': 0, 'players_unchanged': 0,
+                 'registrations_created': 0, 'registrations_skipped': 0, 'dry_run': dry_run,
+                 'diff': [], 'errors': [f"Commit error: {str(e)}"]}
     
     return stats
 
@@ -190,23 +197,23 @@ def import_page():
             return redirect(request.url)
         
         try:
-            # Save temporarily
-            import tempfile
-            import os
-            
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, encoding='utf-8') as tmp:
-                content = file.read().decode('utf-8-sig')
-                tmp.write(content)
-                tmp_path = tmp.name
+            dry_run = bool(request.form.get('dry_run'))
             
-            # Parse and import
-            players_data, registrations_data = import_from_csv(tmp_path)
-            stats = import_to_database(players_data, registrations_data)
+            # Stream the upload straight into the importer
+            try:
+                stats = import_rows(iter_csv_rows(io.TextIOWrapper(file.stream, encoding='utf-8-sig')), dry_run=dry_run)
+                if not dry_run:
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
             
-            # Cleanup
-            os.unlink(tmp_path)
-            
-            flash(f"Import complete! Players: {stats['players_created']} new, {stats['players_updated']} updated. Registrations: {stats['registrations_created']}", 'success')
+            if dry_run:
+                flash(f"Preview (nothing saved): Players: {stats['players_created']} new, {stats['players_updated']} changed, {stats['players_unchanged']} unchanged. Registrations: {stats['registrations_created']} new, {stats['registrations_skipped']} existing", 'info')
+                for action, key, changes in [d for d in stats['diff'] if d[0] == 'updated'][:10]:
+                    flash(f"PGID {key[0]}: " + ', '.join(f"{field} -> {value}" for field, value in changes.items()), 'info')
+            else:
+                flash(f"Import complete! Players: {stats['players_created']} new, {stats['players_updated']} updated. Registrations: {stats['registrations_created']}", 'success')
             
             if stats['errors']:
                 flash(f"Errors: {len(stats['errors'])}", 'warning')
@@ -3,7 +3,13 @@ WPC Match Import and Display
 """
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from datetime import datetime, date
+from sqlalchemy import event as sa_event, inspect as sa_inspect
+from sqlalchemy.orm import Session
 from models import db, WPCPlayer
+from utils import cache_versions
+from utils.schedule_import import ScheduleSync
+from utils.search_index import fold
+import click
 import re
 
 wpc_matches = Blueprint('wpc_matches', __name__, url_prefix='/wpc')
@@ -33,7 +39,7 @@ class WPCMatch(db.Model):
 """
 
 # Import WPCMatch from models after adding it
-from models import WPCMatch
+from models import WPCMatch, WPCMatchParticipant
 
 
 def parse_schedule_text(text, match_date):
@@ -132,25 +138,175 @@ def parse_schedule_text(text, match_date):
     return matches
 
 
+MATCH_FIELDS = ('match_time', 'court', 'player1_name', 'player2_name', 'opponent1_name', 'opponent2_name',
+                'score', 'is_doubles')
+
+
+def _match_key(values):
+    """Stable identity within a day: division, flight and the 'Match N' label"""
+    return (values['division'], values['flight'], values['match_number'])
+
+
+def _delete_participants(match_ids):
+    WPCMatchParticipant.query.filter(WPCMatchParticipant.match_id.in_(match_ids)).delete(synchronize_session=False)
+
+
 def import_matches_to_db(matches):
-    """Import parsed matches to database"""
-    count = 0
-    for m in matches:
-        # Check if match already exists
-        existing = WPCMatch.query.filter_by(
-            match_date=m['match_date'],
-            match_time=m['match_time'],
-            court=m['court'],
-            player1_name=m['player1_name']
-        ).first()
+    """Sync one day's parsed matches into the database: only new, changed and
+    removed matches (within the pasted divisions) are written. Returns the
+    ScheduleSync with the stats."""
+    match_date = matches[0]['match_date'] if matches else None
+    sync = ScheduleSync(WPCMatch, {'match_date': match_date}, key=_match_key, fields=MATCH_FIELDS,
+                        partition=lambda values: values['division'])
+    if not matches:
+        return sync
+    
+    sync.run(matches, on_delete=_delete_participants)
+    if sync.changed:
+        changed_ids = sync.inserted_ids + sync.updated_ids
+        changed = WPCMatch.query.filter(WPCMatch.id.in_(changed_ids)).all() if changed_ids else []
+        index_match_participants(changed)  # also bumps 'wpc_schedule'
+    db.session.commit()
+    return sync
+
+
+# ============================================================================
+# MATCH PARTICIPANT INDEX
+# ============================================================================
+# wpc_match_participant holds one row per name slot, resolved to WPCPlayer.id,
+# so a player's schedule is one indexed join instead of a name scan. Names
+# without a player are retried whenever players are added or renamed.
+
+class PlayerNameResolver:
+    """Schedule name -> WPCPlayer.id, loaded with one query.
+    
+    Exact accent-folded "first last" first; otherwise a player whose first and
+    last name both appear in the schedule name (the old substring rule). Names
+    that fit more than one player stay unresolved.
+    """
+    
+    def __init__(self, conn=None):
+        self.exact = {}
+        self.by_token = {}
+        for player_id, first_name, last_name in (conn or db.session).execute(
+                db.select(WPCPlayer.id, WPCPlayer.first_name, WPCPlayer.last_name)):
+            first, last = fold(first_name).strip(), fold(last_name).strip()
+            key = f"{first} {last}"
+            self.exact[key] = None if key in self.exact else player_id
+            for token in last.split()[:1]:
+                self.by_token.setdefault(token, []).append((player_id, first, last))
+    
+    def resolve(self, name):
+        folded = ' '.join(fold(name).split())
+        if folded in self.exact:
+            return self.exact[folded]
         
-        if not existing:
-            match = WPCMatch(**m)
-            db.session.add(match)
-            count += 1
+        candidates = {player_id
+                      for token in set(folded.split())
+                      for player_id, first, last in self.by_token.get(token, ())
+                      if first and first in folded and last in folded}
+        return candidates.pop() if len(candidates) == 1 else None
+
+
+def _participant_rows(match, resolver):
+    for slot, column in enumerate(WPCMatchParticipant.SLOTS):
+        name = getattr(match, column)
+        if name:
+            yield {'match_id': match.id, 'slot': slot, 'side': 1 if slot < 2 else 2,
+                   'name': name, 'player_id': resolver.resolve(name)}
+
+
+def index_match_participants(matches=None):
+    """(Re)build participant rows for `matches` (all matches when None) and
+    retry names that were unresolved before. Does not commit."""
+    P = WPCMatchParticipant.__table__
+    resolver = PlayerNameResolver()
+    
+    if matches is None:
+        db.session.execute(P.delete())
+        matches = WPCMatch.query.all()
+    elif matches:
+        db.session.execute(P.delete().where(P.c.match_id.in_([m.id for m in matches])))
     
+    rows = [row for match in matches for row in _participant_rows(match, resolver)]
+    if rows:
+        db.session.execute(P.insert(), rows)
+    
+    _resolve_unmatched(db.session, resolver)  # players imported after an earlier schedule
+    cache_versions.bump(db.session, 'wpc_schedule')  # cached boarding passes
+    return len(rows)
+
+
+def _resolve_unmatched(conn, resolver=None):
+    """Match participant rows without a player again. Returns the number resolved."""
+    P = WPCMatchParticipant.__table__
+    unmatched = conn.execute(db.select(P.c.id, P.c.name).where(P.c.player_id.is_(None))).all()
+    if not unmatched:
+        return 0
+    
+    resolver = resolver or PlayerNameResolver(conn)
+    resolved = []
+    for row_id, name in unmatched:
+        player_id = resolver.resolve(name)
+        if player_id:
+            resolved.append({'row_id': row_id, 'player_id': player_id})
+    if resolved:
+        conn.execute(P.update().where(P.c.id == db.bindparam('row_id'))
+                     .values(player_id=db.bindparam('player_id')), resolved)
+    return len(resolved)
+
+
+def resolve_unmatched_participants(conn):
+    """Retry schedule names no player was found for, after players were added or
+    renamed. Bumps 'wpc_schedule' when any resolved. Does not commit."""
+    resolved = _resolve_unmatched(conn)
+    if resolved:
+        cache_versions.bump(conn, 'wpc_schedule')
+    return resolved
+
+
+@sa_event.listens_for(Session, 'after_flush')
+def _resolve_after_player_change(session, flush_context):
+    """ORM player creates and renames; Core imports call resolve_unmatched_participants()."""
+    if any(isinstance(obj, WPCPlayer) for obj in session.new) or any(
+            isinstance(obj, WPCPlayer) and (sa_inspect(obj).attrs.first_name.history.has_changes()
+                                            or sa_inspect(obj).attrs.last_name.history.has_changes())
+            for obj in session.dirty):
+        resolve_unmatched_participants(session.connection())
+
+
+def player_matches(player_id):
+    """A player's matches in schedule order, with partner/opponents - one indexed join"""
+    rows = db.session.query(WPCMatch, WPCMatchParticipant.slot).join(
+        WPCMatchParticipant, WPCMatchParticipant.match_id == WPCMatch.id
+    ).filter(
+        WPCMatchParticipant.player_id == player_id
+    ).order_by(WPCMatch.match_date, WPCMatch.match_time).all()
+    
+    result = []
+    for match, slot in rows:
+        names = [getattr(match, column) for column in WPCMatchParticipant.SLOTS]
+        own, other = (names[:2], names[2:]) if slot < 2 else (names[2:], names[:2])
+        partner = own[1 - slot % 2] if match.is_doubles else None
+        result.append({
+            'date': match.match_date,
+            'time': match.match_time,
+            'court': match.court,
+            'division': match.division,
+            'is_doubles': match.is_doubles,
+            'partner': partner,
+            'opponents': ' & '.join(n for n in other if n),
+        })
+    return result
+
+
+@wpc_matches.cli.command('index-participants')
+def index_participants_command():
+    """Rebuild wpc_match_participant for all matches."""
+    count = index_match_participants()
     db.session.commit()
-    return count
+    unresolved = WPCMatchParticipant.query.filter(WPCMatchParticipant.player_id.is_(None)).count()
+    print(f"Indexed {count} match slot(s), {unresolved} name(s) not matched to a player")
 
 
 # ============================================================================
@@ -191,8 +347,8 @@ def import_matches():
         try:
             match_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             matches = parse_schedule_text(schedule_text, match_date)
-            count = import_matches_to_db(matches)
-            flash(f'Successfully imported {count} matches for {date_str}!', 'success')
+            sync = import_matches_to_db(matches)
+            flash(f'Imported schedule for {date_str}: {sync.summary()}', 'success')
         except Exception as e:
             flash(f'Import error: {str(e)}', 'danger')
         
@@ -211,7 +367,10 @@ def clear_matches():
     date_str = request.form.get('date')
     if date_str:
         match_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        day = db.select(WPCMatch.id).where(WPCMatch.match_date == match_date)
+        WPCMatchParticipant.query.filter(WPCMatchParticipant.match_id.in_(day)).delete(synchronize_session=False)
         WPCMatch.query.filter_by(match_date=match_date).delete()
+        cache_versions.bump(db.session, 'wpc_schedule')
         db.session.commit()
         flash(f'Cleared matches for {date_str}', 'success')
     return redirect(url_for('wpc_matches.import_matches'))
@@ -226,76 +385,15 @@ def player_schedule_api(player_id):
     """Get player's match schedule"""
     player = WPCPlayer.query.get_or_404(player_id)
     
-    # Find matches where player is involved
-    name = f"{player.first_name} {player.last_name}"
-    
-    matches = WPCMatch.query.filter(
-        db.or_(
-            WPCMatch.player1_name.ilike(f'%{player.first_name}%'),
-            WPCMatch.player2_name.ilike(f'%{player.first_name}%'),
-            WPCMatch.opponent1_name.ilike(f'%{player.first_name}%'),
-            WPCMatch.opponent2_name.ilike(f'%{player.first_name}%')
-        )
-    ).order_by(WPCMatch.match_date, WPCMatch.match_time).all()
-    
-    # Filter to exact matches
-    player_matches = []
-    for m in matches:
-        names = [m.player1_name, m.player2_name, m.opponent1_name, m.opponent2_name]
-        for n in names:
-            if n and player.first_name.lower() in n.lower() and player.last_name.lower() in n.lower():
-                player_matches.append(m)
-                break
-    
     return jsonify({
         'player': player.get_full_name(),
         'matches': [{
-            'date': m.match_date.strftime('%Y-%m-%d'),
-            'time': m.match_time.strftime('%H:%M'),
-            'court': m.court,
-            'division': m.division,
-            'is_doubles': m.is_doubles,
-            'partner': get_partner(m, player),
-            'opponents': get_opponents(m, player)
-        } for m in player_matches]
+            'date': m['date'].strftime('%Y-%m-%d'),
+            'time': m['time'].strftime('%H:%M'),
+            'court': m['court'],
+            'division': m['division'],
+            'is_doubles': m['is_doubles'],
+            'partner': m['partner'],
+            'opponents': m['opponents']
+        } for m in player_matches(player.id)]
     })
-
-
-def get_partner(match, player):
-    """Get player's partner in a match"""
-    if not match.is_doubles:
-        return None
-    
-    names = [match.player1_name, match.player2_name]
-    for n in names:
-        if n and player.first_name.lower() in n.lower():
-            # Return the other name
-            other = match.player2_name if n == match.player1_name else match.player1_name
-            return other
-    
-    names = [match.opponent1_name, match.opponent2_name]
-    for n in names:
-        if n and player.first_name.lower() in n.lower():
-            other = match.opponent2_name if n == match.opponent1_name else match.opponent1_name
-            return other
-    
-    return None
-
-
-def get_opponents(match, player):
-    """Get opponents in a match"""
-    names = [match.player1_name, match.player2_name]
-    is_team1 = False
-    for n in names:
-        if n and player.first_name.lower() in n.lower():
-            is_team1 = True
-            break
-    
-    if is_team1:
-        if match.is_doubles:
-            return f"{match.opponent1_name} & {match.opponent2_name}"
-        return match.opponent1_name
-    else:
-        if match.is_doubles:
-            return f"{match.player1_name} & {match.player2_name}"
-        return match.player1_name
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The application on a throwaway SQLite database."""
+    os.environ['SECRET_KEY'] = 'test'
+    os.environ['DATABASE_URL'] = 'sqlite:///' + str(tmp_path_factory.mktemp('db') / 'test.db')
+    os.environ.pop('FLASK_ENV', None)
+    from app import app  # creates the tables on import
+
+    app.config['TESTING'] = True
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture(autouse=True)
+def _session(app):
+    """A failed test does not leave the session in a broken transaction."""
+    yield
+    from models import db
+    db.session.rollback()
+    db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,79 @@
+"""Maintained check-in counters match a recount after writes that move rows
+between groups (utils.checkin_counters)."""
+
+from datetime import date, datetime, timedelta
+
+from models import (db, CheckinCounter, Event, PCLRegistration, PCLTeam, PCLTournament,
+                    TournamentCheckin, TournamentParticipant)
+from utils import checkin_counters
+
+
+def _counters(scope, tournament_id):
+    rows = CheckinCounter.query.filter_by(scope=scope, tournament_id=tournament_id)
+    return {(r.group_type, r.group_key): tuple(getattr(r, f) for f in checkin_counters.FIELDS)
+            for r in rows if any(getattr(r, f) for f in checkin_counters.FIELDS)}
+
+
+def _assert_matches_recount(scope, tournament_id):
+    maintained = _counters(scope, tournament_id)
+    checkin_counters.reconcile(db.session.connection(), scope, tournament_id)
+    db.session.commit()
+    assert maintained == _counters(scope, tournament_id)
+
+
+def _participant(event, country, checked_in=True):
+    participant = TournamentParticipant(tournament_id=event.id, first_name='P', last_name=country, country=country)
+    db.session.add(participant)
+    db.session.flush()
+    if checked_in:
+        db.session.add(TournamentCheckin(tournament_id=event.id, participant_id=participant.id,
+                                         date_of_birth=date(1990, 1, 1), welcome_pack_received=True))
+    return participant
+
+
+def test_checkins_move_with_their_participant(app):
+    event = Event(name='Counters', start_date=date.today(), end_date=date.today(), location='Malaga')
+    db.session.add(event)
+    db.session.flush()
+    moving, leaving = _participant(event, 'ES'), _participant(event, 'DE')
+    _participant(event, 'DE', checked_in=False)
+    db.session.commit()
+    _assert_matches_recount('checkin', event.id)
+
+    moving.country = 'FR'
+    db.session.commit()
+    assert checkin_counters.groups(db.session, 'checkin', event.id, 'country')['FR']['checked_in'] == 1
+    _assert_matches_recount('checkin', event.id)
+
+    db.session.delete(leaving.checkin)
+    db.session.delete(leaving)
+    db.session.commit()
+    _assert_matches_recount('checkin', event.id)
+
+
+def test_registrations_move_with_their_team(app):
+    tournaments = []
+    for name in ('Counters A', 'Counters B'):
+        tournament = PCLTournament(name=name, start_date=date.today(), end_date=date.today(), location='Malaga',
+                                   registration_deadline=datetime.now() + timedelta(days=7))
+        db.session.add(tournament)
+        tournaments.append(tournament)
+    db.session.flush()
+    team = PCLTeam(tournament_id=tournaments[0].id, country_code='ESP', country_name='Spain', age_category='+19',
+                   captain_token='counters-esp')
+    db.session.add(team)
+    db.session.flush()
+    for i in range(4):
+        db.session.add(PCLRegistration(team_id=team.id, first_name=f'F{i}', last_name=f'L{i}',
+                                       gender='male', checked_in=i % 2 == 0))
+    db.session.commit()
+
+    team.country_code = 'POR'
+    db.session.commit()
+    _assert_matches_recount('pcl', tournaments[0].id)
+
+    team.tournament_id = tournaments[1].id
+    db.session.commit()
+    assert checkin_counters.totals(db.session, 'pcl', tournaments[1].id)['checked_in'] == 2
+    for tournament in tournaments:
+        _assert_matches_recount('pcl', tournament.id)
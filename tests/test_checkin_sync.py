@@ -0,0 +1,22 @@
+"""Offline check-in sync reports bad items per item instead of failing the batch."""
+
+from datetime import date
+
+from models import db, Event, TournamentParticipant
+
+
+def test_malformed_items_are_reported_per_item(client):
+    event = Event(name='Sync', start_date=date.today(), end_date=date.today(), location='Malaga')
+    db.session.add(event)
+    db.session.flush()
+    participant = TournamentParticipant(tournament_id=event.id, first_name='Ana', last_name='Lopez', country='ES')
+    db.session.add(participant)
+    db.session.commit()
+
+    response = client.post(f'/api/tournament/{event.id}/checkin/sync', json={'checkins': [
+        'abc', 42, None, {'participant_id': 'x'}, {'participant_id': participant.id, 'date_of_birth': '1990-04-02', 'idempotency_key': 'k1'},
+    ]})
+
+    assert response.status_code == 200
+    statuses = [r['status'] for r in response.get_json()['results']]
+    assert statuses == ['error', 'error', 'error', 'error', 'synced']
@@ -0,0 +1,89 @@
+"""Apple Wallet web service (v1): registration, changed serials and 304s (passkit)."""
+
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import passkit
+from models import (db, Event, PCLRegistration, PCLTeam, PCLTournament, TournamentCheckin,
+                    TournamentParticipant)
+
+PASS_TYPE = 'pass.eu.pickleballconnect.test'
+
+
+@pytest.fixture(autouse=True)
+def _unsigned_passes(monkeypatch):
+    """Signing needs the Apple certificates; the protocol does not"""
+    monkeypatch.setattr(passkit, '_build_pass', lambda wallet_pass: SimpleNamespace(
+        data=b'pkpass', etag=f'{wallet_pass.id}-{wallet_pass.updated_at.timestamp()}'))
+
+
+def _auth(wallet_pass):
+    return {'Authorization': f'ApplePass {wallet_pass.auth_token}'}
+
+
+def _checkin_pass():
+    event = Event(name='Wallet Open', start_date=date.today(), end_date=date.today(), location='Malaga')
+    db.session.add(event)
+    db.session.flush()
+    participant = TournamentParticipant(tournament_id=event.id, first_name='Ana', last_name='Lopez')
+    db.session.add(participant)
+    db.session.flush()
+    checkin = TournamentCheckin(tournament_id=event.id, participant_id=participant.id, date_of_birth=date(1990, 1, 1))
+    db.session.add(checkin)
+    db.session.flush()
+    wallet_pass = passkit.ensure_pass('checkin', checkin.id, PASS_TYPE, f'WPC-{event.id}-{checkin.id}')
+    return event, wallet_pass
+
+
+def test_device_follows_a_pass_until_the_event_changes(client):
+    event, wallet_pass = _checkin_pass()
+    registration_url = f'/passkit/v1/devices/device-1/registrations/{PASS_TYPE}/{wallet_pass.serial_number}'
+    serials_url = f'/passkit/v1/devices/device-1/registrations/{PASS_TYPE}'
+    pass_url = f'/passkit/v1/passes/{PASS_TYPE}/{wallet_pass.serial_number}'
+
+    assert client.post(registration_url, json={'pushToken': 'push'}).status_code == 401
+    assert client.post(registration_url, json={'pushToken': 'push'}, headers=_auth(wallet_pass)).status_code == 201
+    assert client.post(registration_url, json={'pushToken': 'push'}, headers=_auth(wallet_pass)).status_code == 200
+
+    serials = client.get(serials_url).get_json()
+    assert serials['serialNumbers'] == [wallet_pass.serial_number]
+    tag = serials['lastUpdated']
+    assert client.get(serials_url, query_string={'passesUpdatedSince': tag}).status_code == 204
+
+    response = client.get(pass_url, headers=_auth(wallet_pass))
+    assert response.status_code == 200
+    last_modified = response.headers['Last-Modified']
+    assert client.get(pass_url, headers={**_auth(wallet_pass), 'If-Modified-Since': last_modified}).status_code == 304
+
+    # Printed on the pass: the change reaches the device in the same second
+    event.location = 'Madrid'
+    db.session.commit()
+    serials = client.get(serials_url, query_string={'passesUpdatedSince': tag}).get_json()
+    assert serials['serialNumbers'] == [wallet_pass.serial_number]
+    assert client.get(pass_url, headers={**_auth(wallet_pass), 'If-Modified-Since': last_modified}).status_code == 200
+
+    assert client.delete(registration_url, headers=_auth(wallet_pass)).status_code == 200
+    assert client.get(serials_url).status_code == 204
+
+
+def test_tournament_rename_marks_pcl_passes(app):
+    tournament = PCLTournament(name='PCL Wallet', start_date=date.today(), end_date=date.today(), location='Malaga',
+                               registration_deadline=datetime.now() + timedelta(days=7))
+    db.session.add(tournament)
+    db.session.flush()
+    team = PCLTeam(tournament_id=tournament.id, country_code='ESP', country_name='Spain', age_category='+19',
+                   captain_token='wallet-esp')
+    db.session.add(team)
+    db.session.flush()
+    registration = PCLRegistration(team_id=team.id, first_name='Ana', last_name='Lopez', gender='female')
+    db.session.add(registration)
+    db.session.flush()
+    wallet_pass = passkit.ensure_pass('pcl', registration.id, PASS_TYPE, f'wpc-{tournament.id}-{registration.id}')
+    before = wallet_pass.updated_at
+
+    tournament.name = 'PCL Wallet 2026'
+    db.session.commit()
+    db.session.refresh(wallet_pass)
+    assert wallet_pass.updated_at > before
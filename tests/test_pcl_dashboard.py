@@ -0,0 +1,82 @@
+"""The captain dashboard runs a fixed number of queries however many teams and
+matches the tournament has (utils.pcl_dashboard)."""
+
+import secrets
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from models import (db, PCLLineup, PCLMatch, PCLMatchResult, PCLRegistration, PCLTeam,
+                    PCLTournament, PoolPlayer)
+
+
+def _tournament(nteams, nmatches):
+    """Captain token of a team playing `nmatches` matches against `nteams - 1`
+    opponents; half of the matches are completed, most have lineups."""
+    tournament = PCLTournament(name='PCL', start_date=date.today(), end_date=date.today(),
+                               location='Malaga', registration_deadline=datetime.now() + timedelta(days=7))
+    db.session.add(tournament)
+    db.session.flush()
+
+    teams = []
+    for i in range(nteams):
+        team = PCLTeam(tournament_id=tournament.id, country_code=f'C{i}', country_name=f'Country {i}',
+                       age_category='+19', captain_token=secrets.token_hex(16))
+        db.session.add(team)
+        db.session.flush()
+        for j in range(6):
+            db.session.add(PCLRegistration(team_id=team.id, first_name=f'F{i}{j}', last_name=f'L{i}{j}',
+                                           gender='male' if j % 2 else 'female', is_captain=j == 0,
+                                           phone='+49 170 1234567' if j == 0 else None))
+        teams.append(team)
+    own, opponents = teams[0], teams[1:]
+
+    for i in range(nmatches):
+        opponent = opponents[i % len(opponents)]
+        home, away = (own, opponent) if i % 2 else (opponent, own)
+        match = PCLMatch(tournament_id=tournament.id, team_home_id=home.id, team_away_id=away.id,
+                         match_date=datetime.now() + timedelta(days=i - nmatches // 2),
+                         lineup_deadline=datetime.now() + timedelta(hours=5 + i))
+        db.session.add(match)
+        db.session.flush()
+        db.session.add(PCLLineup(match_id=match.id, team_id=home.id, submitted_at=datetime.now()))
+        if i % 2:
+            db.session.add(PCLLineup(match_id=match.id, team_id=away.id, submitted_at=datetime.now()))
+        if i < nmatches // 2:
+            match.status, match.home_score, match.away_score, match.winner_id = 'completed', 3, 2, home.id
+            db.session.add(PCLMatchResult(match_id=match.id, match_type='wd', home_score=11, away_score=4))
+
+    db.session.add(PoolPlayer(first_name='Pool', last_name='Player', email=f'{own.captain_token}@example.com',
+                              country_name=own.country_name, age_category=own.age_category, gender='male'))
+    db.session.commit()
+    token = own.captain_token
+    db.session.remove()
+    return token
+
+
+def _count_queries(client, token):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get(f'/pcl/team/{token}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+        db.session.remove()
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_dashboard_query_count_is_independent_of_size(client):
+    small = _count_queries(client, _tournament(nteams=2, nmatches=2))
+    large = _count_queries(client, _tournament(nteams=12, nmatches=40))
+
+    assert small == large
+    assert large <= 10
+
+
+def test_unknown_token_is_404(client):
+    assert client.get('/pcl/team/unknown').status_code == 404
@@ -0,0 +1,26 @@
+"""Phone normalization (utils.phone) and the WPC pool-invite threshold."""
+
+import secrets
+
+from models import db, WPCPlayer
+from routes.wpc import _invitable_query, normalize_phone
+from utils.phone import to_e164
+
+
+def test_to_e164():
+    assert to_e164('+49 (170) 123-4567') == '+491701234567'
+    assert to_e164('0044 20 7946 0958') == '+442079460958'
+    assert to_e164('+45 123 456') is None  # 8 digits: rejected by Twilio
+    assert to_e164('') is None
+
+
+def test_wpc_players_with_eight_digits_stay_invitable(app):
+    player = WPCPlayer(pgid='T-PH8', first_name='Ocho', last_name='Digitos', phone='+45 123 456',
+                       whatsapp_optin=True, marketing_optin=True, checkin_token=secrets.token_urlsafe(32))
+    db.session.add(player)
+    db.session.commit()
+
+    assert normalize_phone(player.phone) == '45123456'
+    assert normalize_phone('123 4567') is None
+    assert player.phone_e164 == '+45123456'
+    assert player in _invitable_query().all()
@@ -0,0 +1,52 @@
+"""Re-pasting a scoring schedule writes only what changed (routes.scoring.sync_schedule)."""
+
+from datetime import date
+
+from models import db, Event
+from routes.scoring import Match, Tournament, parse_schedule, sync_schedule
+
+PLAYOFFS = "\n".join([
+    "MD 50+",
+    "Match 1\tCourt 1\t09:00\tA1&B1\tC1&D1\t--",
+    "Match 2\tCourt 2\t09:00\tA2&B2\tC2&D2\t--",
+    "Match 3\tCourt 3\t09:00\tA3&B3\tC3&D3\t--",
+    "Semi Final\tCourt 1\t11:00\tA1&B1\tA2&B2\t--",
+    "Semi Final\tCourt 2\t11:00\tA3&B3\tC1&D1\t--",
+])
+
+
+def _tournament():
+    event = Event(name='Scoring', start_date=date.today(), end_date=date.today(), location='Malaga')
+    db.session.add(event)
+    db.session.flush()
+    tournament = Tournament(event_id=event.id)
+    db.session.add(tournament)
+    db.session.commit()
+    return tournament.id
+
+
+def _sync(tournament_id, text):
+    stats = sync_schedule(tournament_id, parse_schedule(text, '2026-05-01')).stats
+    db.session.commit()
+    return stats
+
+
+def test_repeated_round_labels_are_all_stored(app):
+    tournament_id = _tournament()
+
+    stats = _sync(tournament_id, PLAYOFFS)
+    assert (stats['inserted'], stats['duplicate']) == (5, 0)
+    assert Match.query.filter_by(tournament_id=tournament_id, round_name='Semi Final').count() == 2
+
+    stats = _sync(tournament_id, PLAYOFFS)
+    assert (stats['unchanged'], stats['inserted'], stats['updated']) == (5, 0, 0)
+
+
+def test_added_line_does_not_rewrite_later_matches(app):
+    tournament_id = _tournament()
+    _sync(tournament_id, PLAYOFFS)
+
+    lines = PLAYOFFS.split("\n")
+    lines.insert(1, "Match 0\tCourt 4\t08:30\tE1&F1\tG1&H1\t--")
+    stats = _sync(tournament_id, "\n".join(lines))
+    assert (stats['inserted'], stats['updated'], stats['unchanged']) == (1, 0, 5)
@@ -0,0 +1,67 @@
+"""Queued court-manager score submits (routes.scoring.apply_score_batch)."""
+
+from datetime import date, datetime, timedelta
+
+from models import db, Event
+from routes.scoring import Court, Match, Tournament
+
+
+def _court_with_matches(n):
+    event = Event(name='Scores', start_date=date.today(), end_date=date.today(), location='Malaga')
+    db.session.add(event)
+    db.session.flush()
+    tournament = Tournament(event_id=event.id)
+    db.session.add(tournament)
+    db.session.flush()
+    court = Court(tournament_id=tournament.id, court_number=1, manager_token=Court.generate_token())
+    db.session.add(court)
+    db.session.flush()
+    matches = [Match(tournament_id=tournament.id, court_id=court.id, court_number=1,
+                     team1_name=f'A{i}', team2_name=f'B{i}') for i in range(n)]
+    db.session.add_all(matches)
+    db.session.commit()
+    return court.manager_token, [m.id for m in matches]
+
+
+def _submit(client, token, *scores):
+    response = client.post(f'/scoring/court/{token}/api/scores', json={'scores': list(scores)})
+    assert response.status_code == 200
+    return [r['status'] for r in response.get_json()['results']]
+
+
+def test_key_of_another_match_fails_only_that_item(client):
+    token, (first, second) = _court_with_matches(2)
+    assert _submit(client, token, {'match_id': first, 'score_team1': 11, 'score_team2': 4,
+                                   'idempotency_key': 'k1'}) == ['applied']
+
+    statuses = _submit(client, token,
+                       {'match_id': second, 'score_team1': 11, 'score_team2': 9, 'idempotency_key': 'k1'},
+                       {'match_id': first, 'score_team1': 11, 'score_team2': 6, 'idempotency_key': 'k2'},
+                       'not an item')
+    assert statuses == ['error', 'applied', 'error']
+    assert db.session.get(Match, first).team2_score == 6
+
+    # Retrying the flush is a no-op
+    assert _submit(client, token, {'match_id': first, 'score_team1': 11, 'score_team2': 6,
+                                   'idempotency_key': 'k2'}) == ['duplicate']
+
+
+def test_live_data_is_stamped_when_served(client, monkeypatch):
+    import routes.scoring as scoring
+
+    class Clock(datetime):
+        now_ = datetime(2026, 5, 1, 10, 0, 0)
+
+        @classmethod
+        def utcnow(cls):
+            cls.now_ += timedelta(seconds=5)
+            return cls.now_
+
+    token, _ = _court_with_matches(1)
+    tournament_id = Court.query.filter_by(manager_token=token).one().tournament_id
+    monkeypatch.setattr(scoring, 'datetime', Clock)
+
+    first = client.get(f'/scoring/api/live/{tournament_id}').get_json()
+    second = client.get(f'/scoring/api/live/{tournament_id}').get_json()  # same version: cached payload
+    assert first['courts'] == second['courts']
+    assert second['timestamp'] > first['timestamp']
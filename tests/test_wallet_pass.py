@@ -0,0 +1,43 @@
+"""Check-in pass bundles are signed through create_manifest/sign_manifest (wallet_pass)."""
+
+import base64
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+import wallet_pass
+
+
+@pytest.fixture
+def signing_context(monkeypatch):
+    """Signing context on a throwaway self-signed certificate"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'Pass Type ID: pass.test')])
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key()).serial_number(
+        x509.random_serial_number()).not_valid_before(datetime.utcnow()).not_valid_after(
+        datetime.utcnow() + timedelta(days=1)).sign(key, hashes.SHA256())
+
+    monkeypatch.setenv(wallet_pass.ENV_CERT, base64.b64encode(cert.public_bytes(serialization.Encoding.PEM)).decode())
+    monkeypatch.setenv(wallet_pass.ENV_KEY, base64.b64encode(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())).decode())
+    monkeypatch.delenv(wallet_pass.ENV_WWDR, raising=False)
+    wallet_pass.reset_signing_context()
+    yield wallet_pass.get_signing_context()
+    wallet_pass.reset_signing_context()
+
+
+def test_bundle_manifest_covers_every_file(signing_context):
+    files = signing_context.build_files('{"serialNumber": "WPC-1-2-3"}')
+
+    manifest = json.loads(files['manifest.json'])
+    members = {name: content for name, content in files.items() if name not in ('manifest.json', 'signature')}
+    assert manifest == {name: hashlib.sha1(content if isinstance(content, bytes) else content.encode()).hexdigest()
+                        for name, content in members.items()}
+    assert files['manifest.json'] == wallet_pass.create_manifest(members)
+    assert files['signature'][:1] == b'\x30'  # DER-encoded PKCS#7
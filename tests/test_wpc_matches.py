@@ -0,0 +1,61 @@
+"""Schedule names are matched to players imported or renamed after the schedule."""
+
+import secrets
+from datetime import date
+
+from models import db, WPCPlayer
+from routes.wpc_import import import_rows
+from routes.wpc_matches import import_matches_to_db, parse_schedule_text, player_matches
+from utils import cache_versions
+
+SCHEDULE = (
+    "MS35+ 4.5\n"
+    "Flight - A\n"
+    "Match 1\tCourt 3\t09:30\tJohn Smith\tJane Doe\t--\n"
+)
+
+
+def _player(pgid, first_name, last_name):
+    player_data = {'pgid': pgid, 'first_name': first_name, 'last_name': last_name}
+    registration_data = {'pgid': pgid, 'division_type': 'Singles', 'division_name': 'MS35+ 4.5', 'age_category': '35+'}
+    return player_data, registration_data
+
+
+def _schedule_version():
+    return cache_versions.versions(db.session, ('wpc_schedule',))
+
+
+def test_players_added_after_the_schedule_get_their_matches(client):
+    import_matches_to_db(parse_schedule_text(SCHEDULE, date(2026, 11, 2)))
+
+    # ORM create
+    before = _schedule_version()
+    john = WPCPlayer(pgid='T-JS', first_name='John', last_name='Smith', checkin_token=secrets.token_urlsafe(32))
+    db.session.add(john)
+    db.session.commit()
+    assert _schedule_version() != before
+    assert [m['opponents'] for m in player_matches(john.id)] == ['Jane Doe']
+
+    # Core import with a misspelled name: no match, boarding pass cached without it
+    import_rows([_player('T-JD', 'Jane', 'Dough')])
+    db.session.commit()
+    jane = WPCPlayer.query.filter_by(pgid='T-JD').one()
+    assert player_matches(jane.id) == []
+    assert 'vs John Smith' not in client.get(f'/wpc/pass/{jane.checkin_token}').get_data(as_text=True)
+
+    # Corrected by a re-import
+    import_rows([_player('T-JD', 'Jane', 'Doe')])
+    db.session.commit()
+    assert [m['opponents'] for m in player_matches(jane.id)] == ['John Smith']
+    assert 'vs John Smith' in client.get(f'/wpc/pass/{jane.checkin_token}').get_data(as_text=True)
+
+
+def test_unchanged_schedule_import_keeps_resolved_players(client):
+    import_matches_to_db(parse_schedule_text(SCHEDULE.replace('Smith', 'Smyth'), date(2026, 11, 3)))
+    player = WPCPlayer(pgid='T-JSy', first_name='John', last_name='Smyth', checkin_token=secrets.token_urlsafe(32))
+    db.session.add(player)
+    db.session.commit()
+
+    sync = import_matches_to_db(parse_schedule_text(SCHEDULE.replace('Smith', 'Smyth'), date(2026, 11, 3)))
+    assert not sync.changed
+    assert len(player_matches(player.id)) == 1
@@ -0,0 +1,135 @@
+"""
+Streaming set-based upsert for CSV imports.
+
+Rows are consumed in chunks; per chunk the existing rows are resolved with one
+query on the natural key (external_id, pgid, registration triple, ...), then
+new rows go out as one executemany INSERT and changed rows as one executemany
+UPDATE by primary key. A dry run does the same resolution and reports the
+creates/updates/skips without writing.
+
+These are Core-level writes: ORM flush hooks (check-in counters, live events)
+do not see them, so callers reconcile derived data after a real run.
+"""
+
+from collections import Counter
+from itertools import islice
+
+from models import db
+
+
+CHUNK_SIZE = 500
+MAX_DIFF = 200   # diff entries kept for reporting
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkUpsert:
+    """Upsert dicts into `model` keyed by the `key` columns.
+
+    scope         fixed column values for every row (filter and insert), e.g. tournament_id
+    update_fields columns overwritten on existing rows when the incoming value is
+                  not None; empty = insert only, existing rows are skipped
+    prepare       fn(values) filling generated columns of new rows (tokens)
+    """
+
+    def __init__(self, model, key, scope=None, update_fields=(), prepare=None,
+                 chunk_size=CHUNK_SIZE, dry_run=False):
+        self.model = model
+        self.key = tuple(key)
+        self.scope = dict(scope or {})
+        self.update_fields = tuple(update_fields)
+        self.prepare = prepare
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+
+        self.stats = Counter(created=0, updated=0, skipped=0)
+        self.diff = []          # (action, key, values/changes)
+        self.ids = {}           # key -> id (negative placeholder for rows a dry run would create)
+
+    def _key_of(self, values):
+        return tuple(values.get(k) for k in self.key)
+
+    def _record(self, action, key, values=None):
+        self.stats[action] += 1
+        if len(self.diff) < MAX_DIFF:
+            self.diff.append((action, key, values))
+
+    def _existing(self, keys):
+        """{key: row} for the chunk's keys - one query on the leading key column"""
+        model = self.model
+        columns = [model.id] + [getattr(model, k) for k in dict.fromkeys(self.key + self.update_fields)]
+        lead = getattr(model, self.key[0])
+        query = db.select(*columns).where(lead.in_({k[0] for k in keys}))
+        for column, value in self.scope.items():
+            query = query.where(getattr(model, column) == value)
+
+        wanted = set(keys)
+        found = {}
+        for row in db.session.execute(query):
+            key = tuple(getattr(row, k) for k in self.key)
+            if key in wanted:
+                found[key] = row
+        return found
+
+    def run(self, rows):
+        """Upsert an iterable of dicts; returns self (stats, diff, ids)"""
+        for chunk in chunked(rows, self.chunk_size):
+            self._upsert_chunk(chunk)
+        return self
+
+    def _upsert_chunk(self, chunk):
+        incoming = {}
+        for values in chunk:
+            key = self._key_of(values)
+            if key in incoming or key in self.ids:
+                continue  # repeated in the file
+            incoming[key] = values
+        if not incoming:
+            return
+
+        existing = self._existing(list(incoming))
+        creates, updates = [], []
+
+        for key, values in incoming.items():
+            row = existing.get(key)
+            if row is None:
+                new = {**values, **self.scope}
+                if self.prepare:
+                    self.prepare(new)
+                creates.append(new)
+                self._record('created', key, values)
+                continue
+
+            self.ids[key] = row.id
+            changes = {f: values[f] for f in self.update_fields
+                       if values.get(f) is not None and values[f] != getattr(row, f)}
+            if changes:
+                updates.append({'id': row.id, **changes})
+                self._record('updated', key, changes)
+            else:
+                self._record('skipped', key)
+
+        if self.dry_run:
+            # placeholders let dependent rows (registrations of new players) be planned too
+            for values in creates:
+                self.ids[self._key_of(values)] = -len(self.ids) - 1
+            return
+
+        if creates:
+            # Core insert: one batch even when optional columns are None in some rows
+            table = self.model.__table__
+            inserted = db.session.execute(
+                table.insert().returning(table.c.id, *[table.c[k] for k in self.key]), creates)
+            for row in inserted:
+                self.ids[tuple(row[1:])] = row[0]
+        if updates:
+            # executemany per distinct set of changed columns
+            updates.sort(key=lambda values: sorted(values))
+            db.session.execute(db.update(self.model), updates)
@@ -0,0 +1,115 @@
+"""
+Version counters for invalidating cached read models.
+
+A CacheVersion row is a named counter ('sponsors', 'wpc_schedule',
+'wpc_player:12', 'scoring:3', ...). Writers bump the names their change
+affects in the same transaction, readers fetch the versions they depend on in
+one query and use them as part of the cache key - so every worker process sees
+an invalidation as soon as it commits, without sharing the cache itself.
+
+Usage:
+    watch(Sponsor, None, lambda obj: ['sponsors'])          # bump on ORM changes
+    bump(db.session, 'wpc_schedule')                        # after Core/bulk writes
+    payload = cache.get_or_build(key, versions(db.session, names), build)
+"""
+
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event as sa_event, inspect as sa_inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import db, CacheVersion
+
+
+def bump(conn, *names):
+    """Increment each named version (creating it at 1)."""
+    T = CacheVersion.__table__
+    dialect = (conn.dialect if isinstance(conn, Connection) else conn.get_bind().dialect).name
+    for name in dict.fromkeys(names):
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            conn.execute(insert(T).values(name=name, version=1, updated_at=db.func.now())
+                         .on_conflict_do_update(index_elements=['name'],
+                                                set_={'version': T.c.version + 1, 'updated_at': db.func.now()}))
+        elif conn.execute(T.update().where(T.c.name == name).values(
+                version=T.c.version + 1, updated_at=db.func.now())).rowcount == 0:
+            conn.execute(T.insert().values(name=name, version=1, updated_at=db.func.now()))
+
+
+def versions(conn, names):
+    """Current versions of `names` as a tuple (0 for names never bumped)"""
+    T = CacheVersion.__table__
+    found = dict(conn.execute(db.select(T.c.name, T.c.version).where(T.c.name.in_(names))).all())
+    return tuple(found.get(name, 0) for name in names)
+
+
+# ============================================================================
+# ORM CHANGE TRACKING
+# ============================================================================
+
+_watchers = []
+
+
+def watch(model, attrs, names_fn):
+    """Bump `names_fn(obj)` whenever a `model` row is inserted, deleted or has
+    one of `attrs` changed (any column when attrs is None) in a flush."""
+    _watchers.append((model, tuple(attrs) if attrs is not None else None, names_fn))
+
+
+def _changed(session, obj, attrs):
+    if attrs is None:
+        return session.is_modified(obj)
+    state = sa_inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+@sa_event.listens_for(Session, 'after_flush')
+def _bump_watched_versions(session, flush_context):
+    names = []
+    for model, attrs, names_fn in _watchers:
+        for obj in list(session.new) + list(session.deleted):
+            if isinstance(obj, model):
+                names.extend(names_fn(obj))
+        for obj in session.dirty:
+            if isinstance(obj, model) and _changed(session, obj, attrs):
+                names.extend(names_fn(obj))
+    if names:
+        bump(session.connection(), *names)
+
+
+# ============================================================================
+# PROCESS-LOCAL CACHE
+# ============================================================================
+
+class VersionedCache:
+    """Thread-safe LRU of key -> value, valid only for the versions it was built at."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, current, build):
+        """Cached value for `key` if built at versions `current`, else build()."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == current:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = build()
+        with self._lock:
+            self._entries[key] = (current, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
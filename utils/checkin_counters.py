@@ -0,0 +1,354 @@
+"""
+Maintained check-in counters (CheckinCounter rows).
+
+Every flush that inserts/deletes a roster row or changes its check-in, welcome
+pack, phone or grouping columns applies the resulting +/- deltas to the
+counter rows in the same transaction, so dashboards read one row instead of
+counting the roster. Rows grouped by a parent's columns (a registration by
+its team's tournament and country, a check-in by its participant's country)
+move with the parent when those columns change. Core bulk writes call apply() themselves; anything else
+that bypasses the ORM is repaired by reconcile() (`flask checkin
+rebuild-counters`). Counter rows are upserted by the writers (a roster starts
+at zero) and backfilled for existing rosters by migration 7a4c2e8d9f16;
+readers never build or commit anything.
+
+Scopes: 'pcl' (PCLRegistration per PCL tournament, grouped by team and
+country), 'wpc' (WPCPlayer, tournament 0, by country) and 'checkin'
+(TournamentParticipant/TournamentCheckin per event, by country).
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import event as sa_event, inspect as sa_inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import (db, CheckinCounter, PCLRegistration, PCLTeam, WPCPlayer,
+                    TournamentParticipant, TournamentCheckin)
+
+
+FIELDS = ('total', 'checked_in', 'welcome_packs', 'with_phone')
+
+
+def _has_phone(phone):
+    return phone not in (None, '', '-')
+
+
+def _keys(scope, tournament_id, **groups):
+    keys = [(scope, tournament_id, '', '')]
+    keys += [(scope, tournament_id, group_type, str(key or '')) for group_type, key in groups.items()]
+    return keys
+
+
+# ============================================================================
+# PER-MODEL CONTRIBUTIONS
+# ============================================================================
+# Each returns (counter keys, {field: value}) for one row given its column values.
+# Parent columns come from `parents`: {(model, id): (values...)}, seeded from the
+# session (old or new values) and otherwise read from the database.
+
+PARENT_COLUMNS = {
+    PCLTeam: ('tournament_id', 'country_code'),
+    TournamentParticipant: ('country',),
+}
+
+
+def _parent(conn, parents, model, parent_id):
+    if (model, parent_id) not in parents:
+        parents[(model, parent_id)] = conn.execute(
+            db.select(*[model.__table__.c[c] for c in PARENT_COLUMNS[model]]).where(model.id == parent_id)).first()
+    return parents[(model, parent_id)]
+
+
+def _pcl_contribution(conn, values, parents):
+    team_id = values['team_id']
+    team = _parent(conn, parents, PCLTeam, team_id)
+    if team is None:
+        return [], {}
+    tournament_id, country_code = team
+    return (_keys('pcl', tournament_id, team=team_id, country=country_code),
+            {'total': 1, 'checked_in': int(bool(values['checked_in']))})
+
+
+def _wpc_contribution(conn, values, cache):
+    return (_keys('wpc', 0, country=values['country']), {
+        'total': 1,
+        'checked_in': int(bool(values['checked_in'])),
+        'welcome_packs': int(bool(values['welcome_pack_received'])),
+        'with_phone': int(_has_phone(values['phone'])),
+    })
+
+
+def _participant_contribution(conn, values, cache):
+    return _keys('checkin', values['tournament_id'], country=values['country']), {'total': 1}
+
+
+def _checkin_contribution(conn, values, parents):
+    participant = _parent(conn, parents, TournamentParticipant, values['participant_id'])
+    return (_keys('checkin', values['tournament_id'], country=participant[0] if participant else None),
+            {'checked_in': 1, 'welcome_packs': int(bool(values['welcome_pack_received']))})
+
+
+TRACKED = [
+    (PCLRegistration, ('team_id', 'checked_in'), _pcl_contribution),
+    (WPCPlayer, ('country', 'checked_in', 'welcome_pack_received', 'phone'), _wpc_contribution),
+    (TournamentParticipant, ('tournament_id', 'country'), _participant_contribution),
+    (TournamentCheckin, ('tournament_id', 'participant_id', 'welcome_pack_received'), _checkin_contribution),
+]
+
+# (parent model, child model, foreign key): children move when PARENT_COLUMNS change
+MOVES = [
+    (PCLTeam, PCLRegistration, 'team_id'),
+    (TournamentParticipant, TournamentCheckin, 'participant_id'),
+]
+
+
+# Old values are needed to move a row between counters, so load them on change
+# even when the attribute was expired by a previous commit.
+for _model, _attrs, _ in TRACKED:
+    for _attr in _attrs:
+        sa_event.listen(getattr(_model, _attr), 'set', lambda *args: None, active_history=True)
+for _model, _attrs in PARENT_COLUMNS.items():
+    for _attr in _attrs:
+        sa_event.listen(getattr(_model, _attr), 'set', lambda *args: None, active_history=True)
+
+
+def _values(obj, attrs, previous=False):
+    state = sa_inspect(obj)
+    values = {}
+    for attr in attrs:
+        history = state.attrs[attr].history
+        if previous and history.deleted:
+            values[attr] = history.deleted[0]
+        else:
+            values[attr] = getattr(obj, attr)
+    return values
+
+
+def _add(deltas, contribution, sign):
+    keys, counts = contribution
+    for key in keys:
+        for field, value in counts.items():
+            deltas[key][field] += sign * value
+
+
+def _has_changes(obj, attrs):
+    state = sa_inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+def _session_parents(session):
+    """({(model, id): new values}, {(model, id): old values}) of the parents in
+    the session - a parent deleted or changed in this flush is not (or no
+    longer) readable from the database"""
+    new, old = {}, {}
+    for model, attrs in PARENT_COLUMNS.items():
+        for obj in session.new:
+            if isinstance(obj, model):
+                new[(model, obj.id)] = tuple(_values(obj, attrs).values())
+        for obj in session.deleted:
+            if isinstance(obj, model):
+                new[(model, obj.id)] = None
+                old[(model, obj.id)] = tuple(_values(obj, attrs, previous=True).values())
+        for obj in session.dirty:
+            if isinstance(obj, model) and _has_changes(obj, attrs):
+                new[(model, obj.id)] = tuple(_values(obj, attrs).values())
+                old[(model, obj.id)] = tuple(_values(obj, attrs, previous=True).values())
+    return new, old
+
+
+@sa_event.listens_for(Session, 'after_flush', insert=True)  # before live_events reads the counters
+def _track_counters(session, flush_context):
+    deltas = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    connection = None
+    new_parents, old_parents = _session_parents(session)
+    moved = [key for key in old_parents if new_parents[key] is not None]  # changed, not deleted
+    handled = defaultdict(set)  # model -> ids already counted in this flush
+
+    for model, attrs, contribution in TRACKED:
+        new = [o for o in session.new if isinstance(o, model)]
+        deleted = [o for o in session.deleted if isinstance(o, model)]
+        changed = [o for o in session.dirty if isinstance(o, model) and _has_changes(o, attrs)]
+        if not (new or deleted or changed):
+            continue
+
+        connection = connection or session.connection()
+        for obj in new:
+            _add(deltas, contribution(connection, _values(obj, attrs), new_parents), +1)
+        for obj in deleted:
+            _add(deltas, contribution(connection, _values(obj, attrs, previous=True), old_parents), -1)
+        for obj in changed:
+            _add(deltas, contribution(connection, _values(obj, attrs, previous=True), old_parents), -1)
+            _add(deltas, contribution(connection, _values(obj, attrs), new_parents), +1)
+        handled[model].update(o.id for o in new + deleted + changed)
+
+    # Unchanged children of a parent whose grouping columns changed
+    for parent, model, foreign_key in MOVES:
+        parent_ids = [parent_id for m, parent_id in moved if m is parent]
+        if not parent_ids:
+            continue
+        connection = connection or session.connection()
+        attrs, contribution = next((a, c) for m, a, c in TRACKED if m is model)
+        table = model.__table__
+        rows = connection.execute(db.select(table.c.id, *[table.c[a] for a in attrs])
+                                  .where(table.c[foreign_key].in_(parent_ids))).mappings()
+        for row in rows:
+            if row['id'] not in handled[model]:
+                _add(deltas, contribution(connection, row, old_parents), -1)
+                _add(deltas, contribution(connection, row, new_parents), +1)
+
+    if connection is not None:
+        apply(connection, deltas)
+
+
+# ============================================================================
+# WRITE / READ
+# ============================================================================
+
+KEY_COLUMNS = ('scope', 'tournament_id', 'group_type', 'group_key')
+
+
+def _match(key):
+    T = CheckinCounter.__table__
+    return tuple(T.c[column] == value for column, value in zip(KEY_COLUMNS, key))
+
+
+def _dialect_insert(conn):
+    """Dialect insert() supporting ON CONFLICT, or None"""
+    dialect = (conn.dialect if isinstance(conn, Connection) else conn.get_bind().dialect).name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def _upsert(conn, key, counts, add):
+    """Create the counter row for `key` or update it (adding `counts` when
+    `add`, else overwriting) - one statement, safe against concurrent writers."""
+    T = CheckinCounter.__table__
+    values = {f: T.c[f] + v for f, v in counts.items()} if add else dict(counts)
+    values['updated_at'] = db.func.now()
+    row = {**dict(zip(KEY_COLUMNS, key)), **dict.fromkeys(FIELDS, 0), **counts}
+    insert = _dialect_insert(conn)
+    if insert is not None:
+        conn.execute(insert(T).values(row).on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS), set_=values))
+    elif conn.execute(T.update().where(*_match(key)).values(values)).rowcount == 0:
+        conn.execute(T.insert().values(row))
+
+
+def apply(conn, deltas):
+    """Add {(scope, tournament_id, group_type, group_key): {field: delta}} to the
+    counters, creating missing rows."""
+    for key, counts in deltas.items():
+        counts = {f: v for f, v in counts.items() if v}
+        if counts:
+            _upsert(conn, key, counts, add=True)
+
+
+def _source_counts(conn, scope, tournament_id):
+    """{(group_type, group_key): {field: n}} computed from the roster tables"""
+    counts = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+    def add(groups, **values):
+        for group in [('', '')] + groups:
+            for field, value in values.items():
+                counts[group][field] += value or 0
+
+    if scope == 'pcl':
+        R = PCLRegistration
+        rows = conn.execute(
+            db.select(R.team_id, PCLTeam.country_code, db.func.count(R.id),
+                      db.func.sum(db.case((R.checked_in == True, 1), else_=0)))
+            .join(PCLTeam, PCLTeam.id == R.team_id)
+            .where(PCLTeam.tournament_id == tournament_id)
+            .group_by(R.team_id, PCLTeam.country_code))
+        for team_id, country, total, checked_in in rows:
+            add([('team', str(team_id)), ('country', country or '')], total=total, checked_in=checked_in)
+
+    elif scope == 'wpc':
+        P = WPCPlayer
+        rows = conn.execute(
+            db.select(P.country, db.func.count(P.id),
+                      db.func.sum(db.case((P.checked_in == True, 1), else_=0)),
+                      db.func.sum(db.case((P.welcome_pack_received == True, 1), else_=0)),
+                      db.func.sum(db.case((db.and_(P.phone.isnot(None), P.phone != '', P.phone != '-'), 1), else_=0)))
+            .group_by(P.country))
+        for country, total, checked_in, packs, with_phone in rows:
+            add([('country', country or '')], total=total, checked_in=checked_in,
+                welcome_packs=packs, with_phone=with_phone)
+
+    elif scope == 'checkin':
+        P, C = TournamentParticipant, TournamentCheckin
+        rows = conn.execute(
+            db.select(P.country, db.func.count(P.id), db.func.count(C.id),
+                      db.func.sum(db.case((C.welcome_pack_received == True, 1), else_=0)))
+            .outerjoin(C, C.participant_id == P.id)
+            .where(P.tournament_id == tournament_id)
+            .group_by(P.country))
+        for country, total, checked_in, packs in rows:
+            add([('country', country or '')], total=total, checked_in=checked_in, welcome_packs=packs)
+
+    counts[('', '')]  # a roster always has its total row
+    return counts
+
+
+def reconcile(conn, scope, tournament_id=0):
+    """Rebuild one roster's counter rows from the source tables.
+
+    Rows are overwritten in place (and groups that disappeared removed), so
+    concurrent writers keep finding their rows.
+    """
+    T = CheckinCounter.__table__
+    counts = _source_counts(conn, scope, tournament_id)
+    for (group_type, group_key), values in counts.items():
+        _upsert(conn, (scope, tournament_id, group_type, group_key), values, add=False)
+    for group_type in {group_type for group_type, _ in counts if group_type}:
+        conn.execute(T.delete().where(
+            T.c.scope == scope, T.c.tournament_id == tournament_id, T.c.group_type == group_type,
+            T.c.group_key.notin_([key for gtype, key in counts if gtype == group_type])))
+    conn.execute(T.delete().where(
+        T.c.scope == scope, T.c.tournament_id == tournament_id,
+        T.c.group_type.notin_({group_type for group_type, _ in counts})))
+    return counts[('', '')]
+
+
+def reconcile_all(conn):
+    """Rebuild every roster's counters. Returns number of rosters."""
+    rosters = [('wpc', 0)]
+    rosters += [('pcl', tid) for tid in conn.scalars(db.select(PCLTeam.tournament_id).distinct())]
+    rosters += [('checkin', tid) for tid in conn.scalars(db.select(TournamentParticipant.tournament_id).distinct())]
+    for scope, tournament_id in rosters:
+        reconcile(conn, scope, tournament_id)
+    return len(rosters)
+
+
+def _row_dict(row):
+    values = {f: getattr(row, f) for f in FIELDS}
+    values['pending'] = values['total'] - values['checked_in']
+    return values
+
+
+def totals(conn, scope, tournament_id=0):
+    """Counter totals for a roster (one row; zeros for a roster without rows).
+
+    `conn` is db.session or a Connection; nothing is written.
+    """
+    T = CheckinCounter.__table__
+    row = conn.execute(db.select(T).where(*_match((scope, tournament_id, '', '')))).first()
+    if row is not None:
+        return _row_dict(row)
+    values = dict.fromkeys(FIELDS, 0)
+    values['pending'] = 0
+    return values
+
+
+def groups(conn, scope, tournament_id, group_type):
+    """{group_key: counts} for one grouping (team / country) of a roster."""
+    T = CheckinCounter.__table__
+    rows = conn.execute(db.select(T).where(
+        T.c.scope == scope, T.c.tournament_id == tournament_id, T.c.group_type == group_type))
+    return {row.group_key: _row_dict(row) for row in rows}
@@ -0,0 +1,227 @@
+"""
+Live event hub - pushes compact updates to dashboards over Server-Sent Events.
+
+Events are rows in the `live_event` table, written in the same transaction as
+the change that caused them, so they only become visible once it commits and
+every worker process sees them. Each process runs a single poller thread that
+reads new rows and wakes the SSE streams subscribed to that channel - N open
+dashboards cost one small indexed query per second, not N polls of the counts.
+
+Usage:
+    watch(PCLRegistration, ['checked_in'], channel_fn, snapshot_fn)  # publish on change
+    return stream('pcl:3', snapshot=lambda: {...})                    # SSE response
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import event as sa_event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from models import db, LiveEvent
+
+
+POLL_INTERVAL = 1.0       # seconds between hub polls of live_event
+STREAM_SECONDS = 55       # streams end before typical proxy timeouts; browsers reconnect
+HEARTBEAT_SECONDS = 15
+RETENTION = timedelta(hours=1)
+
+
+def publish(connection, channel, event, data):
+    """Insert an event row using `connection` (joins the caller's transaction)."""
+    connection.execute(LiveEvent.__table__.insert().values(
+        channel=channel, event=event, data=data, created_at=datetime.utcnow()))
+
+
+# ============================================================================
+# CHANGE TRACKING
+# ============================================================================
+
+_watchers = []
+
+
+def watch(model, attrs, channel_fn, snapshot_fn, describe_fn=None, event='stats'):
+    """Publish `snapshot_fn(connection, channel)` whenever a `model` row is
+    inserted, deleted or has one of `attrs` changed in a flush.
+
+    channel_fn(connection, obj) -> channel name (or None to ignore the row)
+    describe_fn(obj, kind)      -> small dict describing the change ('created' /
+                                   'updated' / 'deleted'), sent as `changes`
+    """
+    _watchers.append((model, tuple(attrs), channel_fn, snapshot_fn, describe_fn, event))
+
+
+def _changed(obj, attrs):
+    state = sa_inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+@sa_event.listens_for(Session, 'after_flush')
+def _publish_watched_changes(session, flush_context):
+    if not _watchers:
+        return
+
+    pending = {}
+    for model, attrs, channel_fn, snapshot_fn, describe_fn, event in _watchers:
+        touched = [(o, 'created') for o in session.new if isinstance(o, model)]
+        touched += [(o, 'deleted') for o in session.deleted if isinstance(o, model)]
+        touched += [(o, 'updated') for o in session.dirty
+                    if isinstance(o, model) and _changed(o, attrs)]
+        if not touched:
+            continue
+
+        connection = session.connection()
+        for obj, kind in touched:
+            channel = channel_fn(connection, obj)
+            if not channel:
+                continue
+            entry = pending.setdefault((channel, event), {'snapshot': snapshot_fn, 'changes': []})
+            if describe_fn:
+                entry['changes'].append(describe_fn(obj, kind))
+
+    for (channel, event), entry in pending.items():
+        connection = session.connection()
+        data = entry['snapshot'](connection, channel)
+        if entry['changes']:
+            data['changes'] = entry['changes'][-5:]
+        publish(connection, channel, event, data)
+
+
+# ============================================================================
+# HUB
+# ============================================================================
+
+class LiveEventHub:
+    """Per-process fan-out of live_event rows to waiting SSE generators."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=500)  # (id, channel, event, data)
+        self._cursor = None               # set by the poller when it starts
+        self._listeners = 0
+        self._thread = None
+        self._app = None
+
+    def start(self, app):
+        with self._cond:
+            self._app = app
+            self._spawn()
+
+    def _spawn(self):
+        # caller holds self._cond
+        if self._app is None or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, args=(self._app,),
+                                        name='live-event-hub', daemon=True)
+        self._thread.start()
+
+    def _run(self, app):
+        idle_since = None
+        last_cleanup = 0
+        with app.app_context():
+            while True:
+                try:
+                    if self._cursor is None:
+                        # a fresh poller starts at the newest event, never replays old ones
+                        newest = db.session.query(db.func.max(LiveEvent.id)).scalar() or 0
+                        with self._cond:
+                            self._cursor = newest
+                    rows = db.session.execute(
+                        db.select(LiveEvent.id, LiveEvent.channel, LiveEvent.event, LiveEvent.data)
+                        .where(LiveEvent.id > self._cursor)
+                        .order_by(LiveEvent.id)
+                        .limit(500)
+                    ).all()
+                    if time.time() - last_cleanup > 600:
+                        last_cleanup = time.time()
+                        LiveEvent.query.filter(LiveEvent.created_at < datetime.utcnow() - RETENTION).delete()
+                        db.session.commit()
+                    db.session.rollback()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"LiveEventHub poll failed: {e}")
+                    rows = []
+
+                with self._cond:
+                    if rows:
+                        self._events.extend(tuple(r) for r in rows)
+                        self._cursor = rows[-1][0]
+                        self._cond.notify_all()
+                    if self._listeners:
+                        idle_since = None
+                    elif idle_since is None:
+                        idle_since = time.time()
+                    elif time.time() - idle_since > 30:
+                        # listeners register under this lock, so none can be left without a poller
+                        self._thread = None
+                        self._cursor = None
+                        self._events.clear()
+                        db.session.remove()
+                        return
+                time.sleep(self.interval)
+
+    def listen(self, channel, duration=STREAM_SECONDS, heartbeat=HEARTBEAT_SECONDS):
+        """Yield (id, event, data) for new events on `channel`; None as heartbeat."""
+        deadline = time.time() + duration
+        last_sent = time.time()
+        with self._cond:
+            self._listeners += 1
+            self._spawn()  # the poller may have gone idle since start()
+            cursor = self._cursor or 0
+        try:
+            while time.time() < deadline:
+                with self._cond:
+                    self._cond.wait(timeout=min(heartbeat, max(deadline - time.time(), 0)))
+                    fresh = [e for e in self._events if e[0] > cursor and e[1] == channel]
+                    cursor = max(cursor, self._cursor or 0)
+                for event_id, _, event, data in fresh:
+                    yield event_id, event, data
+                    last_sent = time.time()
+                if time.time() - last_sent >= heartbeat:
+                    yield None
+                    last_sent = time.time()
+        finally:
+            with self._cond:
+                self._listeners -= 1
+
+
+hub = LiveEventHub()
+
+
+def _format(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream(channel, snapshot=None, event='stats'):
+    """SSE response for `channel`.
+
+    New connections first get `snapshot()` (if given). A reconnect carrying
+    Last-Event-ID instead gets the newest stored event for the channel when it
+    is newer - every event holds full counts, so that is all it missed.
+    """
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        first = snapshot() if snapshot else None
+        initial = [_format(0, event, first)] if first is not None else []
+    else:
+        latest = LiveEvent.query.filter(LiveEvent.channel == channel, LiveEvent.id > last_id) \
+            .order_by(LiveEvent.id.desc()).first()
+        initial = [_format(latest.id, latest.event, latest.data)] if latest else []
+    hub.start(current_app._get_current_object())
+    db.session.remove()  # don't hold a connection for the life of the stream
+
+    def generate():
+        yield "retry: 2000\n\n"
+        yield from initial
+        for item in hub.listen(channel):
+            yield ': keepalive\n\n' if item is None else _format(*item)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
@@ -0,0 +1,56 @@
+"""
+Content-addressed cache for finished .pkpass bundles.
+
+A pass is keyed by a hash of its pass.json without the volatile serial number,
+plus the signing context fingerprint (certificate + images). Re-downloading an
+unchanged pass returns the same bytes and ETag without re-zipping/re-signing;
+any change to the data feeding pass.json yields a new key.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+
+CachedPass = namedtuple('CachedPass', 'data etag generated_at')
+
+VOLATILE_FIELDS = ('serialNumber',)
+
+
+def content_key(pass_data, fingerprint=''):
+    """Stable hash of pass.json content (dict or JSON string) minus volatile fields"""
+    if isinstance(pass_data, (str, bytes)):
+        pass_data = json.loads(pass_data)
+    stable = {k: v for k, v in pass_data.items() if k not in VOLATILE_FIELDS}
+    payload = json.dumps(stable, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f'{fingerprint}:{payload}'.encode('utf-8')).hexdigest()
+
+
+class PassCache:
+    """Small thread-safe LRU of key -> CachedPass, per worker process."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Cached pass for `key`, calling build() -> bytes on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = CachedPass(build(), key[:32], datetime.utcnow().replace(microsecond=0))
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,111 @@
+"""
+Read model for the PCL captain dashboard.
+
+Assembles everything the dashboard shows from a fixed set of queries, however
+many matches or teams there are:
+
+    team + tournament, roster, other captained teams (when the captain has a
+    phone), matches with both lineups (one outer-joined query), results of the
+    completed matches, standings (which also brings every opponent team into
+    the session), pool players
+
+Team stats come from the roster that is loaded anyway.
+"""
+
+from datetime import datetime
+
+from models import db, PCLMatch, PCLLineup, PCLRegistration, PCLTeam, PoolPlayer
+from utils import pcl_standings
+
+
+LINEUP_SOON_SECONDS = 24 * 3600
+
+
+def _other_teams(team, captain):
+    """Teams captained by the same (normalized) phone, excluding this one"""
+    if not (captain and captain.phone_e164):
+        return []
+    return PCLTeam.query.join(
+        PCLRegistration, PCLRegistration.team_id == PCLTeam.id
+    ).filter(
+        PCLRegistration.phone_e164 == captain.phone_e164,
+        PCLRegistration.is_captain == True,
+        PCLTeam.id != team.id
+    ).distinct().order_by(PCLTeam.id).all()
+
+
+def _matches_with_lineups(team):
+    """[(match, own lineup, opponent lineup)] for the team's matches - one query"""
+    own = db.aliased(PCLLineup)
+    opp = db.aliased(PCLLineup)
+    opp_team_id = db.case((PCLMatch.team_home_id == team.id, PCLMatch.team_away_id),
+                          else_=PCLMatch.team_home_id)
+    rows = db.session.query(PCLMatch, own, opp).outerjoin(
+        own, db.and_(own.match_id == PCLMatch.id, own.team_id == team.id)
+    ).outerjoin(
+        opp, db.and_(opp.match_id == PCLMatch.id, opp.team_id == opp_team_id)
+    ).filter(
+        db.or_(PCLMatch.team_home_id == team.id, PCLMatch.team_away_id == team.id)
+    ).order_by(PCLMatch.id, own.id, opp.id).all()
+
+    seen = {}
+    for match, own_lineup, opp_lineup in rows:
+        seen.setdefault(match.id, (match, own_lineup, opp_lineup))  # first lineup per team wins
+    return list(seen.values())
+
+
+def _match_view(team, match, own, opp):
+    is_home = match.team_home_id == team.id
+    return {
+        'match': match,
+        'opponent': match.team_away if is_home else match.team_home,
+        'is_home': is_home,
+        'own_submitted': bool(own and own.is_submitted()),
+        'opp_submitted': bool(opp and opp.is_submitted()),
+        'deadline_passed': match.is_lineup_deadline_passed(),
+    }
+
+
+def load(token):
+    """Dashboard data for the team with captain `token`, or None if unknown."""
+    team = PCLTeam.query.options(db.joinedload(PCLTeam.tournament)).filter_by(captain_token=token).first()
+    if team is None:
+        return None
+
+    registrations = PCLRegistration.query.filter_by(team_id=team.id).order_by(PCLRegistration.id).all()
+    captain = next((r for r in registrations if r.is_captain), None)
+
+    # Standings load every team of the tournament, so opponents below are
+    # resolved from the session without further queries.
+    standings = pcl_standings.standings(team.tournament_id)
+
+    matches = _matches_with_lineups(team)
+    PCLMatch.preload_results([m for m, _, _ in matches if m.status == 'completed'])
+    upcoming = [_match_view(team, *row) for row in matches if row[0].status != 'completed']
+    upcoming.sort(key=lambda v: (v['match'].match_date is None, v['match'].match_date or datetime.max))
+    past = [_match_view(team, *row) for row in matches if row[0].status == 'completed']
+    past.sort(key=lambda v: (v['match'].match_date or datetime.min), reverse=True)
+
+    now = datetime.now()
+    deadline_soon = any(
+        v['match'].lineup_deadline and not v['deadline_passed'] and not v['own_submitted']
+        and (v['match'].lineup_deadline - now).total_seconds() < LINEUP_SOON_SECONDS
+        for v in upcoming
+    )
+
+    pool = PoolPlayer.query.filter_by(
+        country_name=team.country_name, age_category=team.age_category
+    ).order_by(PoolPlayer.created_at.desc()).all()
+
+    return {
+        'team': team,
+        'other_teams': _other_teams(team, captain),
+        'stats': team.stats_from_registrations(registrations),
+        'men': [r for r in registrations if r.gender == 'male'],
+        'women': [r for r in registrations if r.gender == 'female'],
+        'upcoming_matches': upcoming,
+        'past_matches': past,
+        'deadline_soon': deadline_soon,
+        'standings': standings,
+        'pool': pool,
+    }
@@ -0,0 +1,165 @@
+"""
+Maintained PCL standings (PCLStanding rows, one per team).
+
+Every flush that inserts, deletes or changes a PCLMatch's status, scores,
+winner or teams removes the match's old contribution and adds its new one in
+the same transaction - so a corrected or reverted result moves the table back
+as well. Readers get the table with one ordered query instead of replaying
+every completed match. Standing rows are upserted by the writers (a team
+starts at zero) and backfilled for existing matches by migration
+1b6e4f8a2d37; readers never build or commit anything. `flask pcl
+rebuild-standings` repairs rows after writes that bypass the ORM.
+
+Scoring: 1 point per win; sorted by points DESC, discipline differential DESC,
+then country name ASC.
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import event as sa_event, inspect as sa_inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import db, PCLMatch, PCLStanding, PCLTeam
+
+
+FIELDS = ('played', 'wins', 'losses', 'points', 'diff')
+TRACKED_ATTRS = ('tournament_id', 'team_home_id', 'team_away_id', 'status', 'home_score', 'away_score', 'winner_id')
+
+
+def _contribution(values):
+    """[(tournament_id, team_id, {field: value})] for one match's column values"""
+    if values['status'] != 'completed':
+        return []
+    home, away = values['home_score'] or 0, values['away_score'] or 0
+    result = []
+    for team_id, diff in ((values['team_home_id'], home - away), (values['team_away_id'], away - home)):
+        won = int(values['winner_id'] == team_id)
+        result.append((values['tournament_id'], team_id,
+                       {'played': 1, 'wins': won, 'losses': 1 - won, 'points': won, 'diff': diff}))
+    return result
+
+
+# Old values are needed to revert a result, so load them on change even when
+# the attribute was expired by a previous commit.
+for _attr in TRACKED_ATTRS:
+    sa_event.listen(getattr(PCLMatch, _attr), 'set', lambda *args: None, active_history=True)
+
+
+def _values(obj, previous=False):
+    state = sa_inspect(obj)
+    values = {}
+    for attr in TRACKED_ATTRS:
+        history = state.attrs[attr].history
+        values[attr] = history.deleted[0] if previous and history.deleted else getattr(obj, attr)
+    return values
+
+
+def _add(deltas, values, sign):
+    for tournament_id, team_id, counts in _contribution(values):
+        for field, value in counts.items():
+            deltas[(tournament_id, team_id)][field] += sign * value
+
+
+@sa_event.listens_for(Session, 'after_flush')
+def _track_standings(session, flush_context):
+    deltas = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    for obj in session.new:
+        if isinstance(obj, PCLMatch):
+            _add(deltas, _values(obj), +1)
+    for obj in session.deleted:
+        if isinstance(obj, PCLMatch):
+            _add(deltas, _values(obj, previous=True), -1)
+    for obj in session.dirty:
+        if isinstance(obj, PCLMatch) and any(
+                sa_inspect(obj).attrs[a].history.has_changes() for a in TRACKED_ATTRS):
+            _add(deltas, _values(obj, previous=True), -1)
+            _add(deltas, _values(obj), +1)
+    if deltas:
+        apply(session.connection(), deltas)
+
+
+# ============================================================================
+# WRITE / READ
+# ============================================================================
+
+def _upsert(conn, tournament_id, team_id, counts, add):
+    """Create the team's standing row or update it (adding `counts` when `add`,
+    else overwriting) - one statement, safe against concurrent writers."""
+    T = PCLStanding.__table__
+    values = {f: T.c[f] + v for f, v in counts.items()} if add else dict(counts)
+    values['updated_at'] = db.func.now()
+    row = {'tournament_id': tournament_id, 'team_id': team_id, **dict.fromkeys(FIELDS, 0), **counts}
+    dialect = (conn.dialect if isinstance(conn, Connection) else conn.get_bind().dialect).name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        conn.execute(insert(T).values(row).on_conflict_do_update(index_elements=['team_id'], set_=values))
+    elif conn.execute(T.update().where(T.c.team_id == team_id).values(values)).rowcount == 0:
+        conn.execute(T.insert().values(row))
+
+
+def apply(conn, deltas):
+    """Add {(tournament_id, team_id): {field: delta}} to the standings rows,
+    creating missing rows."""
+    for (tournament_id, team_id), counts in deltas.items():
+        counts = {f: v for f, v in counts.items() if v}
+        if counts:
+            _upsert(conn, tournament_id, team_id, counts, add=True)
+
+
+def rebuild(conn, tournament_id):
+    """Recompute one tournament's standings rows from its completed matches.
+
+    Rows are overwritten in place (and rows of teams that left the tournament
+    removed), so concurrent writers keep finding their rows.
+    """
+    T = PCLStanding.__table__
+    M = PCLMatch.__table__
+    stats = {team_id: dict.fromkeys(FIELDS, 0) for team_id in conn.scalars(
+        db.select(PCLTeam.id).where(PCLTeam.tournament_id == tournament_id))}
+    for row in conn.execute(db.select(*[M.c[a] for a in TRACKED_ATTRS]).where(
+            M.c.tournament_id == tournament_id, M.c.status == 'completed')).mappings():
+        for _, team_id, counts in _contribution(row):
+            if team_id in stats:
+                for field, value in counts.items():
+                    stats[team_id][field] += value
+
+    for team_id, values in stats.items():
+        _upsert(conn, tournament_id, team_id, values, add=False)
+    conn.execute(T.delete().where(T.c.tournament_id == tournament_id, T.c.team_id.notin_(list(stats))))
+    return len(stats)
+
+
+def rebuild_all(conn):
+    """Rebuild the standings of every tournament with teams. Returns number of tournaments."""
+    tournament_ids = list(conn.scalars(db.select(PCLTeam.tournament_id).distinct()))
+    for tournament_id in tournament_ids:
+        rebuild(conn, tournament_id)
+    return len(tournament_ids)
+
+
+def _ordered_rows(tournament_id):
+    S = PCLStanding
+    return db.session.query(PCLTeam, S).outerjoin(
+        S, S.team_id == PCLTeam.id
+    ).filter(
+        PCLTeam.tournament_id == tournament_id
+    ).order_by(
+        PCLTeam.age_category,
+        db.func.coalesce(S.points, 0).desc(),
+        db.func.coalesce(S.diff, 0).desc(),
+        db.func.lower(db.func.coalesce(PCLTeam.country_name, ''))
+    ).all()
+
+
+def standings(tournament_id):
+    """{age_category: [{'team', 'played', 'wins', 'losses', 'points', 'diff'}]} in
+    table order - one query. A team without a row has not played yet."""
+    groups = {}
+    for team, standing in _ordered_rows(tournament_id):
+        values = {f: getattr(standing, f) if standing else 0 for f in FIELDS}
+        groups.setdefault(team.age_category, []).append({'team': team, **values})
+    return groups
@@ -0,0 +1,29 @@
+"""
+Phone number normalization.
+
+Numbers are kept as typed in `phone`; the canonical form ('+491701234567')
+is stored next to it at write time so lookups are an index probe and wa.me
+links need no per-request parsing.
+"""
+
+import re
+
+
+MIN_DIGITS = 9       # country code + number, as Twilio requires
+WPC_MIN_DIGITS = 8   # WPC players: wa.me pool invites have always accepted 8
+
+
+def to_e164(phone, min_digits=MIN_DIGITS):
+    """Canonical '+<digits>' form, or None if unparseable.
+
+    Strips spaces, hyphens, parentheses; an international 00 prefix becomes +.
+    Needs at least `min_digits` digits.
+    """
+    if not phone:
+        return None
+    digits = re.sub(r'\D', '', phone)
+    if digits.startswith('00'):
+        digits = digits[2:]  # 0044 -> 44
+    if len(digits) < min_digits:
+        return None
+    return '+' + digits
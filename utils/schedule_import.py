@@ -0,0 +1,152 @@
+"""
+Idempotent schedule re-import.
+
+Organizers paste the pickleball.global schedule again whenever it changes.
+Each parsed match gets a stable key (its division/round plus the "Match N"
+label); the stored matches in scope are loaded with one query and diffed by
+that key, and only the difference is written - one executemany INSERT, one
+executemany UPDATE by primary key, one DELETE. Re-pasting an unchanged
+schedule writes nothing.
+
+Matches are only deleted within the partitions (divisions / categories) that
+appear in the paste, so importing one division does not wipe the others.
+Stored matches without a key (imported before keys existed) are adopted by an
+exact match on their schedule columns and get their key on that sync.
+
+These are Core-level writes: ORM flush hooks (cache_versions.watch) do not see
+them, so callers bump / re-index after a run.
+"""
+
+from collections import Counter
+
+from models import db
+
+
+MAX_DIFF = 200   # diff entries kept for reporting
+
+
+class ScheduleSync:
+    """Sync parsed match dicts into `model`.
+
+    scope      fixed column values of the imported schedule (filter and insert),
+               e.g. {'tournament_id': 3} or {'match_date': date(2026, 5, 1)}
+    key        fn(values) -> stable key of a match; stored rows keyed None
+               (entered by hand) are never touched
+    fields     columns compared and overwritten on matched rows
+    partition  fn(values) -> partition of a match; stored matches missing from
+               the paste are deleted only in partitions the paste contains
+    protect    fn(values) -> True for stored rows that must not be deleted
+               (e.g. they already carry a result); reported as 'kept'
+    adopt      fn(values) -> fallback identity claiming a stored row whose key is
+               None; it is updated like a matched row and its key column
+               (`key_column`) is set, so later syncs match it by key
+    """
+
+    def __init__(self, model, scope, key, fields, partition=None, protect=None,
+                 adopt=None, key_column=None):
+        self.model = model
+        self.scope = dict(scope)
+        self.key = key
+        self.fields = tuple(fields)
+        self.partition = partition or (lambda values: None)
+        self.protect = protect
+        self.adopt = adopt
+        self.key_column = key_column
+        self.unkeyed = {}       # adopt identity -> stored row without a key
+
+        self.stats = Counter(inserted=0, updated=0, deleted=0, unchanged=0, kept=0, duplicate=0)
+        self.diff = []          # (action, key, values/changes)
+        self.inserted_ids = []
+        self.updated_ids = []
+        self.deleted_ids = []
+
+    def _record(self, action, key, values=None):
+        self.stats[action] += 1
+        if len(self.diff) < MAX_DIFF:
+            self.diff.append((action, key, values))
+
+    @property
+    def changed(self):
+        return bool(self.inserted_ids or self.updated_ids or self.deleted_ids)
+
+    def _existing(self):
+        """{key: row mapping} of the stored matches in scope - one query"""
+        table = self.model.__table__
+        query = db.select(table)
+        for column, value in self.scope.items():
+            query = query.where(table.c[column] == value)
+        existing = {}
+        for row in db.session.execute(query).mappings():
+            key = self.key(row)
+            if key is not None:
+                existing.setdefault(key, row)
+            elif self.adopt:
+                self.unkeyed.setdefault(self.adopt(row), row)
+        return existing
+
+    def run(self, rows, on_delete=None):
+        """Apply the diff for `rows`; `on_delete(ids)` runs before stored rows
+        are deleted (dependent rows). Returns self. Does not commit."""
+        existing = self._existing()
+        incoming = {}
+        for values in rows:
+            key = self.key(values)
+            if key in incoming:
+                self._record('duplicate', key)
+                continue
+            incoming[key] = values
+
+        inserts, updates = [], []
+        for key, values in incoming.items():
+            row = existing.get(key)
+            adopted = False
+            if row is None and self.adopt:
+                row = self.unkeyed.pop(self.adopt(values), None)
+                adopted = row is not None
+            if row is None:
+                inserts.append({**values, **self.scope})
+                self._record('inserted', key, values)
+                continue
+            changes = {f: values.get(f) for f in self.fields if values.get(f) != row[f]}
+            if adopted:
+                changes[self.key_column] = values[self.key_column]
+            if changes:
+                updates.append({'id': row['id'], **changes})
+                self.updated_ids.append(row['id'])
+                self._record('updated', key, changes)
+            else:
+                self._record('unchanged', key)
+
+        partitions = {self.partition(values) for values in incoming.values()}
+        for key, row in existing.items():
+            if key in incoming or self.partition(row) not in partitions:
+                continue
+            if self.protect and self.protect(row):
+                self._record('kept', key)
+                continue
+            self.deleted_ids.append(row['id'])
+            self._record('deleted', key)
+
+        table = self.model.__table__
+        if self.deleted_ids:
+            if on_delete:
+                on_delete(self.deleted_ids)
+            db.session.execute(table.delete().where(table.c.id.in_(self.deleted_ids)))
+        if inserts:
+            # Core insert: one batch even when optional columns are None in some rows
+            self.inserted_ids = list(db.session.scalars(table.insert().returning(table.c.id), inserts))
+        if updates:
+            # executemany per distinct set of changed columns
+            updates.sort(key=lambda values: sorted(values))
+            db.session.execute(db.update(self.model), updates)
+        return self
+
+    def summary(self):
+        """'3 new, 2 updated, 1 removed, 40 unchanged' (+ kept / duplicates when present)"""
+        parts = [f"{self.stats['inserted']} new", f"{self.stats['updated']} updated",
+                 f"{self.stats['deleted']} removed", f"{self.stats['unchanged']} unchanged"]
+        if self.stats['kept']:
+            parts.append(f"{self.stats['kept']} kept (have results)")
+        if self.stats['duplicate']:
+            parts.append(f"{self.stats['duplicate']} duplicate line(s) ignored")
+        return ', '.join(parts)
@@ -0,0 +1,166 @@
+"""
+In-memory typeahead index for check-in stations.
+
+Names are accent-folded and lowercased ("Muñoz" -> "munoz") and matched by
+token prefix, with a trigram fallback for substrings and typos. Each worker
+process keeps one index per roster and refreshes it incrementally: at most
+every REFRESH_SECONDS it compares COUNT/MAX(updated_at) of the roster with
+what it has and re-reads only rows changed since (a full rebuild only when
+rows disappeared). Searches return ids; callers load the few hits by primary
+key so displayed state (checked in, etc.) is always current.
+"""
+
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+
+from models import db
+
+
+REFRESH_SECONDS = 2.0
+OVERLAP = timedelta(seconds=5)   # re-read rows this close to the cursor (commit skew)
+MIN_SIMILARITY = 0.5             # share of query trigrams a token must contain
+
+
+def fold(text):
+    """Lowercase, strip accents and punctuation: 'Müller-Núñez' -> 'muller nunez'"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return ''.join(ch if ch.isalnum() else ' ' for ch in text)
+
+
+def _trigrams(token):
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Token / prefix / trigram index over short documents (names, emails)."""
+
+    def __init__(self):
+        self._docs = {}                       # id -> (tokens, sort key)
+        self._postings = defaultdict(set)     # token -> ids
+        self._tokens = []                     # sorted tokens, for prefix ranges
+        self._grams = defaultdict(set)        # trigram -> tokens
+
+    def __len__(self):
+        return len(self._docs)
+
+    def upsert(self, doc_id, *fields):
+        self.remove(doc_id)
+        tokens = set()
+        for field in fields:
+            tokens.update(fold(field).split())
+        self._docs[doc_id] = (tokens, ' '.join(fold(f) for f in fields if f))
+        for token in tokens:
+            if not self._postings[token]:
+                insort(self._tokens, token)
+                for gram in _trigrams(token):
+                    self._grams[gram].add(token)
+            self._postings[token].add(doc_id)
+
+    def remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for token in doc[0]:
+            ids = self._postings[token]
+            ids.discard(doc_id)
+            if not ids:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+                for gram in _trigrams(token):
+                    self._grams[gram].discard(token)
+
+    def _match_token(self, term):
+        """doc id -> score for one query term (exact 3, prefix 2, trigram < 1)"""
+        scores = {}
+        i = bisect_left(self._tokens, term)
+        while i < len(self._tokens) and self._tokens[i].startswith(term):
+            token = self._tokens[i]
+            score = 3.0 if token == term else 2.0
+            for doc_id in self._postings[token]:
+                scores[doc_id] = max(scores.get(doc_id, 0), score)
+            i += 1
+
+        if len(term) >= 3:
+            grams = _trigrams(term) - {f' {term[:2]}'}  # leading gram already covered by prefix
+            hits = defaultdict(int)
+            for gram in grams:
+                for token in self._grams.get(gram, ()):
+                    hits[token] += 1
+            for token, shared in hits.items():
+                similarity = shared / len(grams)
+                if similarity >= MIN_SIMILARITY:
+                    for doc_id in self._postings[token]:
+                        scores[doc_id] = max(scores.get(doc_id, 0), similarity)
+        return scores
+
+    def search(self, query, limit=10):
+        """Ranked doc ids; every term must match unless that leaves no hits."""
+        terms = fold(query).split()
+        if not terms:
+            return []
+        per_term = [self._match_token(term) for term in terms]
+
+        ids = set.intersection(*(set(s) for s in per_term)) or set().union(*per_term)
+        ranked = sorted(ids, key=lambda d: (-sum(s.get(d, 0) for s in per_term), self._docs[d][1]))
+        return ranked[:limit]
+
+
+class RosterIndex:
+    """A SearchIndex kept in step with the rows of a `columns` select
+    (id, updated_at, *text columns)."""
+
+    def __init__(self, columns):
+        self.index = SearchIndex()
+        self._rows = columns.subquery()
+        self._lock = threading.Lock()
+        self._state = None       # (count, max updated_at) last loaded
+        self._checked = 0
+
+    def _load(self, since=None):
+        query = db.select(self._rows)
+        if since is not None:
+            query = query.where(self._rows.c.updated_at >= since - OVERLAP)
+        for doc_id, _, *fields in db.session.execute(query):
+            self.index.upsert(doc_id, *fields)
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and time.monotonic() - self._checked < REFRESH_SECONDS:
+                return
+            state = tuple(db.session.execute(db.select(
+                db.func.count(), db.func.max(self._rows.c.updated_at)).select_from(self._rows)).one())
+            if state != self._state:
+                if self._state is None or state[0] < len(self.index) or self._state[1] is None:
+                    self.index = SearchIndex()
+                    self._load()
+                else:
+                    self._load(since=self._state[1])
+                    if len(self.index) != state[0]:   # rows moved out of the roster
+                        self.index = SearchIndex()
+                        self._load()
+                self._state = state
+            self._checked = time.monotonic()
+
+    def search(self, query, limit=10):
+        self.refresh()
+        return self.index.search(query, limit)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def roster_index(key, columns):
+    """Process-wide RosterIndex for `key`, created from `columns` on first use."""
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = RosterIndex(columns)
+        return _indexes[key]
@@ -7,7 +7,9 @@ import json
 import hashlib
 import zipfile
 import io
-from datetime import datetime
+import threading
+
+from utils.pass_cache import PassCache, content_key
 
 def is_apple_wallet_available():
     """Check if Apple Wallet certificates are configured"""
@@ -21,8 +23,23 @@ def is_apple_wallet_available():
     return all(os.environ.get(var) for var in required_vars)
 
 
+def pass_identity(registration, tournament):
+    """(passTypeIdentifier, serialNumber) - stable, so a re-issued pass updates in place"""
+    return os.environ.get('APPLE_PASS_TYPE_ID'), f"wpc-{tournament.id}-{registration.id}"
+
+
 def create_pkpass(registration, team, tournament):
     """Create an Apple Wallet .pkpass file"""
+    cached = get_pkpass(registration, team, tournament)
+    return cached.data if cached else None
+
+
+def get_pkpass(registration, team, tournament, web_service=None):
+    """Cached .pkpass as CachedPass (data, etag, generated_at), or None on error.
+    
+    Re-zipped and re-signed only when the pass content changes. `web_service`
+    adds webServiceURL/authenticationToken so Wallet can fetch updates.
+    """
     try:
         from cryptography import x509
         from cryptography.hazmat.primitives import hashes, serialization
@@ -37,20 +54,11 @@ def create_pkpass(registration, team, tournament):
         return None
     
     try:
-        import base64
-        
-        pass_type_id = os.environ.get('APPLE_PASS_TYPE_ID')
-        team_id = os.environ.get('APPLE_TEAM_ID')
-        
-        cert_pem = base64.b64decode(os.environ.get('APPLE_PASS_CERT', ''))
-        key_pem = base64.b64decode(os.environ.get('APPLE_PASS_KEY', ''))
-        wwdr_pem = base64.b64decode(os.environ.get('APPLE_WWDR_CERT', ''))
-        
-        certificate = x509.load_pem_x509_certificate(cert_pem, default_backend())
-        private_key = serialization.load_pem_private_key(key_pem, password=None, backend=default_backend())
-        wwdr_certificate = x509.load_pem_x509_certificate(wwdr_pem, default_backend())
+        context = get_signing_context()
+        pass_type_id = context.pass_type_id
+        team_id = context.team_id
         
-        serial_number = f"wpc-{tournament.id}-{registration.id}-{int(datetime.utcnow().timestamp())}"
+        _, serial_number = pass_identity(registration, tournament)
         
         pass_json = {
             "formatVersion": 1,
@@ -107,47 +115,110 @@ def create_pkpass(registration, team, tournament):
                 }]
             }
         }
+        if web_service:
+            pass_json.update(web_service)
         
-        pass_files = {}
-        pass_json_bytes = json.dumps(pass_json, indent=2).encode('utf-8')
-        pass_files['pass.json'] = pass_json_bytes
+        def build():
+            pass_files = context.build_files(json.dumps(pass_json, indent=2).encode('utf-8'))
+            
+            pkpass_buffer = io.BytesIO()
+            with zipfile.ZipFile(pkpass_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for filename, content in pass_files.items():
+                    zf.writestr(filename, content)
+            return pkpass_buffer.getvalue()
         
-        green_pixel = create_green_png()
-        pass_files['icon.png'] = green_pixel
-        pass_files['icon@2x.png'] = green_pixel
-        pass_files['logo.png'] = green_pixel
-        pass_files['logo@2x.png'] = green_pixel
+        return pass_cache.get_or_build(content_key(pass_json, context.fingerprint), build)
         
-        manifest = {}
-        for filename, content in pass_files.items():
-            manifest[filename] = hashlib.sha1(content).hexdigest()
+    except Exception as e:
+        print(f"Error creating pkpass: {str(e)}")
+        return None
+
+
+class PassSigningContext:
+    """Per-process signing material: certificates parsed once from the env vars,
+    the static images and their SHA1 manifest entries."""
+    
+    def __init__(self):
+        import base64
+        from cryptography import x509
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.backends import default_backend
         
-        manifest_bytes = json.dumps(manifest, indent=2).encode('utf-8')
-        pass_files['manifest.json'] = manifest_bytes
+        self.pass_type_id = os.environ.get('APPLE_PASS_TYPE_ID')
+        self.team_id = os.environ.get('APPLE_TEAM_ID')
+        
+        cert_pem = base64.b64decode(os.environ.get('APPLE_PASS_CERT', ''))
+        key_pem = base64.b64decode(os.environ.get('APPLE_PASS_KEY', ''))
+        wwdr_pem = base64.b64decode(os.environ.get('APPLE_WWDR_CERT', ''))
+        
+        self.certificate = x509.load_pem_x509_certificate(cert_pem, default_backend())
+        self.private_key = serialization.load_pem_private_key(key_pem, password=None, backend=default_backend())
+        self.wwdr_certificate = x509.load_pem_x509_certificate(wwdr_pem, default_backend())
+        
+        green_pixel = create_green_png()
+        self.assets = {
+            'icon.png': green_pixel,
+            'icon@2x.png': green_pixel,
+            'logo.png': green_pixel,
+            'logo@2x.png': green_pixel,
+        }
+        self.asset_hashes = {name: hashlib.sha1(data).hexdigest() for name, data in self.assets.items()}
         
-        signature = pkcs7.PKCS7SignatureBuilder().set_data(
+        # Identifies everything besides pass.json that goes into a bundle
+        self.fingerprint = hashlib.sha256(cert_pem + wwdr_pem).hexdigest()
+    
+    def sign(self, manifest_bytes):
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.serialization import pkcs7
+        
+        return pkcs7.PKCS7SignatureBuilder().set_data(
             manifest_bytes
         ).add_signer(
-            certificate, private_key, hashes.SHA256()
+            self.certificate, self.private_key, hashes.SHA256()
         ).add_certificate(
-            wwdr_certificate
+            self.wwdr_certificate
         ).sign(
             serialization.Encoding.DER, 
             [pkcs7.PKCS7Options.DetachedSignature]
         )
-        pass_files['signature'] = signature
-        
-        pkpass_buffer = io.BytesIO()
-        with zipfile.ZipFile(pkpass_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for filename, content in pass_files.items():
-                zf.writestr(filename, content)
+    
+    def build_files(self, pass_json_bytes):
+        """All .pkpass members for this pass.json, including manifest and signature"""
+        pass_files = {'pass.json': pass_json_bytes}
+        pass_files.update(self.assets)
         
-        pkpass_buffer.seek(0)
-        return pkpass_buffer.getvalue()
+        manifest = {'pass.json': hashlib.sha1(pass_json_bytes).hexdigest()}
+        manifest.update(self.asset_hashes)
         
-    except Exception as e:
-        print(f"Error creating pkpass: {str(e)}")
-        return None
+        manifest_bytes = json.dumps(manifest, indent=2).encode('utf-8')
+        pass_files['manifest.json'] = manifest_bytes
+        pass_files['signature'] = self.sign(manifest_bytes)
+        return pass_files
+
+
+_signing_context = None
+_signing_context_lock = threading.Lock()
+
+
+def get_signing_context():
+    """Signing context for this worker, built on first use"""
+    global _signing_context
+    if _signing_context is None:
+        with _signing_context_lock:
+            if _signing_context is None:
+                _signing_context = PassSigningContext()
+    return _signing_context
+
+
+def reset_signing_context():
+    """Drop the cached context (after rotating certificates)"""
+    global _signing_context
+    with _signing_context_lock:
+        _signing_context = None
+    pass_cache.clear()
+
+
+pass_cache = PassCache()
 
 
 def create_green_png():
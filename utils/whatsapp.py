@@ -18,6 +18,7 @@ import os
 import json
 from twilio.rest import Client
 from flask import url_for
+from utils.phone import to_e164
 
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
@@ -48,27 +49,13 @@ def format_phone_number(phone):
     if not phone:
         return None
     
-    # Remove any existing whatsapp: prefix
-    phone = str(phone).replace('whatsapp:', '')
-    
-    # Remove spaces, dashes, parentheses
-    phone = ''.join(c for c in phone if c.isdigit() or c == '+')
-    
-    # Ensure it starts with +
-    if not phone.startswith('+'):
-        # If it starts with 00, replace with +
-        if phone.startswith('00'):
-            phone = '+' + phone[2:]
-        else:
-            # Assume it needs a + prefix
-            phone = '+' + phone
-    
-    # Validate minimum length (country code + number)
-    if len(phone) < 10:
+    # Any existing whatsapp: prefix, spaces, dashes and parentheses are dropped
+    e164 = to_e164(str(phone))
+    if not e164:
         print(f"⚠️ Phone number too short: {phone}")
         return None
     
-    return f'whatsapp:{phone}'
+    return f'whatsapp:{e164}'
 
 
 def get_twilio_client():
@@ -8,12 +8,14 @@ import hashlib
 import zipfile
 import os
 import base64
+import threading
 from io import BytesIO
 from datetime import datetime
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.serialization import pkcs7
 from cryptography.x509 import load_pem_x509_certificate
 from cryptography.hazmat.backends import default_backend
+from utils.pass_cache import PassCache, content_key
 
 # Configuration
 TEAM_ID = "22LC4K2G55"
@@ -43,7 +45,12 @@ def rgb_from_hex(hex_color):
     return f"rgb({r}, {g}, {b})"
 
 
-def create_pass_json(participant, tournament, checkin, serial_number):
+def pass_identity(participant, tournament, checkin):
+    """(passTypeIdentifier, serialNumber) - stable, so a re-issued pass updates in place"""
+    return PASS_TYPE_ID, f"WPC-{tournament.id}-{participant.id}-{checkin.id}"
+
+
+def create_pass_json(participant, tournament, checkin, serial_number, web_service=None):
     """Create the pass.json content"""
 
     pass_data = {
@@ -149,12 +156,20 @@ def create_pass_json(participant, tournament, checkin, serial_number):
         "voided": False
     }
 
+    # webServiceURL / authenticationToken for in-place updates
+    if web_service:
+        pass_data.update(web_service)
+
     return json.dumps(pass_data, indent=2)
 
 
-def create_manifest(files_dict):
-    """Create manifest.json with SHA1 hashes of all files"""
-    manifest = {}
+def create_manifest(files_dict, known_hashes=None):
+    """Create manifest.json with SHA1 hashes of all files
+
+    `known_hashes` ({filename: sha1}) covers files hashed once up front, e.g. the
+    signing context's static images; only `files_dict` is hashed here.
+    """
+    manifest = dict(known_hashes or {})
     for filename, content in files_dict.items():
         if isinstance(content, str):
             content = content.encode('utf-8')
@@ -199,43 +214,11 @@ def load_certificate_data():
     return cert_data, key_data, wwdr_data
 
 
-def sign_manifest(manifest_data, cert_path=None, key_path=None, wwdr_path=None):
-    """Sign the manifest using PKCS#7 detached signature"""
+def sign_manifest(manifest_data, cert_path=None, key_path=None, wwdr_path=None, context=None):
+    """Sign the manifest using PKCS#7 detached signature (with this worker's
+    signing context unless `context` is given)"""
     try:
-        # Load certificate data (from env vars or files)
-        cert_data, key_data, wwdr_data = load_certificate_data()
-
-        # Parse certificates
-        cert = load_pem_x509_certificate(cert_data, default_backend())
-        key = serialization.load_pem_private_key(key_data, password=None, backend=default_backend())
-
-        # Load WWDR certificate if available
-        additional_certs = []
-        if wwdr_data:
-            wwdr_cert = load_pem_x509_certificate(wwdr_data, default_backend())
-            additional_certs.append(wwdr_cert)
-
-        # Create PKCS#7 signature
-        if isinstance(manifest_data, str):
-            manifest_data = manifest_data.encode('utf-8')
-
-        # Build PKCS7 signature
-        from cryptography.hazmat.primitives.serialization import pkcs7 as pkcs7_mod
-
-        builder = pkcs7_mod.PKCS7SignatureBuilder().set_data(manifest_data)
-        # Use SHA-256 (Apple accepts this for modern passes)
-        builder = builder.add_signer(cert, key, hashes.SHA256())
-
-        for additional_cert in additional_certs:
-            builder = builder.add_certificate(additional_cert)
-
-        signature = builder.sign(
-            serialization.Encoding.DER,
-            options=[pkcs7_mod.PKCS7Options.DetachedSignature]
-        )
-
-        return signature
-
+        return (context or get_signing_context()).sign(manifest_data)
     except Exception as e:
         print(f"Error signing manifest: {e}")
         raise
@@ -327,47 +310,120 @@ def create_simple_icon():
     return create_png(87, 87, (46, 158, 75))
 
 
+class PassSigningContext:
+    """Per-process signing material: parsed certificates and key, the static
+    images at their pass sizes and their SHA1 manifest entries. Building a pass
+    then only hashes its own pass.json and signs the manifest."""
+
+    def __init__(self):
+        cert_data, key_data, wwdr_data = load_certificate_data()
+        self.cert = load_pem_x509_certificate(cert_data, default_backend())
+        self.key = serialization.load_pem_private_key(key_data, password=None, backend=default_backend())
+        self.additional_certs = [load_pem_x509_certificate(wwdr_data, default_backend())] if wwdr_data else []
+
+        self.assets = self._build_assets()
+        self.asset_hashes = {name: hashlib.sha1(data).hexdigest() for name, data in self.assets.items()}
+
+        # Identifies everything besides pass.json that goes into a bundle
+        self.fingerprint = hashlib.sha256(
+            self.cert.fingerprint(hashes.SHA256()) + json.dumps(self.asset_hashes, sort_keys=True).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def _build_assets():
+        logo_data = get_logo_data()
+        if logo_data:
+            return {
+                # Icon: 29x29 (1x), 58x58 (2x), 87x87 (3x)
+                "icon.png": resize_image_for_pass(logo_data, 29, 29),
+                "icon@2x.png": resize_image_for_pass(logo_data, 58, 58),
+                # Logo: max 160x50 (1x), 320x100 (2x) - used in pass header
+                "logo.png": resize_image_for_pass(logo_data, 160, 50),
+                "logo@2x.png": resize_image_for_pass(logo_data, 320, 100),
+            }
+        icon_data = create_simple_icon()
+        return {"icon.png": icon_data, "icon@2x.png": icon_data}
+
+    def sign(self, manifest_data):
+        if isinstance(manifest_data, str):
+            manifest_data = manifest_data.encode('utf-8')
+
+        # Use SHA-256 (Apple accepts this for modern passes)
+        builder = pkcs7.PKCS7SignatureBuilder().set_data(manifest_data).add_signer(
+            self.cert, self.key, hashes.SHA256())
+        for additional_cert in self.additional_certs:
+            builder = builder.add_certificate(additional_cert)
+
+        return builder.sign(serialization.Encoding.DER, options=[pkcs7.PKCS7Options.DetachedSignature])
+
+    def build_files(self, pass_json):
+        """All .pkpass members for this pass.json, including manifest and signature"""
+        if isinstance(pass_json, str):
+            pass_json = pass_json.encode('utf-8')
+
+        files = {"pass.json": pass_json}
+        files.update(self.assets)
+
+        manifest_json = create_manifest({"pass.json": pass_json}, known_hashes=self.asset_hashes)
+        files["manifest.json"] = manifest_json
+        files["signature"] = sign_manifest(manifest_json, context=self)
+        return files
+
+
+_signing_context = None
+_signing_context_lock = threading.Lock()
+
+
+def get_signing_context():
+    """Signing context for this worker, built on first use"""
+    global _signing_context
+    if _signing_context is None:
+        with _signing_context_lock:
+            if _signing_context is None:
+                _signing_context = PassSigningContext()
+    return _signing_context
+
+
+def reset_signing_context():
+    """Drop the cached context (after rotating certificates or the logo)"""
+    global _signing_context
+    with _signing_context_lock:
+        _signing_context = None
+    pass_cache.clear()
+
+
+pass_cache = PassCache()
+
+
 def generate_pkpass(participant, tournament, checkin, base_url="https://pickleballconnect.eu"):
     """
     Generate a .pkpass file for Apple Wallet
 
     Returns: BytesIO object containing the .pkpass file
     """
+    return BytesIO(get_pkpass(participant, tournament, checkin).data)
 
-    # Serial number (unique per pass)
-    serial_number = f"WPC-{tournament.id}-{participant.id}-{checkin.id}"
 
-    # Create pass.json
-    pass_json = create_pass_json(participant, tournament, checkin, serial_number)
+def get_pkpass(participant, tournament, checkin, web_service=None):
+    """
+    Cached .pkpass for this participant/check-in.
 
-    # Prepare files dictionary
-    files = {
-        "pass.json": pass_json
-    }
+    Returns: CachedPass (data, etag, generated_at); rebuilt only when the
+    pass.json content (or the signing context) changes.
+    """
 
-    # Add logo/icon files with proper sizes for Apple Wallet
-    logo_data = get_logo_data()
-    if logo_data:
-        # Icon: 29x29 (1x), 58x58 (2x), 87x87 (3x)
-        files["icon.png"] = resize_image_for_pass(logo_data, 29, 29)
-        files["icon@2x.png"] = resize_image_for_pass(logo_data, 58, 58)
-        # Logo: max 160x50 (1x), 320x100 (2x) - used in pass header
-        files["logo.png"] = resize_image_for_pass(logo_data, 160, 50)
-        files["logo@2x.png"] = resize_image_for_pass(logo_data, 320, 100)
-    else:
-        # Create simple icon
-        icon_data = create_simple_icon()
-        files["icon.png"] = icon_data
-        files["icon@2x.png"] = icon_data
+    # Serial number (unique per pass)
+    _, serial_number = pass_identity(participant, tournament, checkin)
 
-    # Create manifest
-    manifest_json = create_manifest(files)
-    files["manifest.json"] = manifest_json
+    # Create pass.json
+    pass_json = create_pass_json(participant, tournament, checkin, serial_number, web_service)
 
-    # Sign manifest (loads certificates from env vars or files automatically)
-    signature = sign_manifest(manifest_json)
-    files["signature"] = signature
+    context = get_signing_context()
+    key = content_key(pass_json, context.fingerprint)
+    return pass_cache.get_or_build(key, lambda: _zip_pkpass(context.build_files(pass_json)))
 
+
+def _zip_pkpass(files):
     # Create ZIP file (.pkpass)
     pkpass_buffer = BytesIO()
     with zipfile.ZipFile(pkpass_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
@@ -376,8 +432,65 @@ def generate_pkpass(participant, tournament, checkin, base_url="https://pickleba
                 content = content.encode('utf-8')
             zf.writestr(filename, content)
 
-    pkpass_buffer.seek(0)
-    return pkpass_buffer
+    return pkpass_buffer.getvalue()
+
+
+# ============================================================================
+# BULK GENERATION
+# ============================================================================
+
+PARTICIPANT_FIELDS = ('id', 'checkin_token', 'first_name', 'last_name', 'country', 'email')
+TOURNAMENT_FIELDS = ('id', 'name', 'location', 'start_date')
+CHECKIN_FIELDS = ('id', 'tshirt_size', 'checked_in_at', 'emergency_contact_name', 'emergency_contact_phone')
+
+
+def pass_job(participant, tournament, checkin, web_service=None):
+    """Picklable snapshot of the fields create_pass_json reads"""
+    snapshot = lambda obj, fields: {f: getattr(obj, f) for f in fields}
+    return (snapshot(participant, PARTICIPANT_FIELDS),
+            snapshot(tournament, TOURNAMENT_FIELDS),
+            snapshot(checkin, CHECKIN_FIELDS),
+            web_service)
+
+
+def _init_pass_worker():
+    try:
+        get_signing_context()
+    except Exception:
+        pass  # reported per pass by _build_pass_job
+
+
+def _build_pass_job(job):
+    """Worker: build one .pkpass from a pass_job() snapshot -> (filename, data, error)"""
+    from types import SimpleNamespace
+    participant, tournament, checkin = (SimpleNamespace(**part) for part in job[:3])
+    filename = f"WPC_{participant.id}_{participant.first_name}_{participant.last_name}.pkpass".replace('/', '_')
+    try:
+        _, serial_number = pass_identity(participant, tournament, checkin)
+        pass_json = create_pass_json(participant, tournament, checkin, serial_number, job[3])
+        return filename, _zip_pkpass(get_signing_context().build_files(pass_json)), None
+    except Exception as e:
+        return filename, None, str(e)
+
+
+def generate_passes_bulk(jobs, workers=None):
+    """
+    Build passes for many pass_job() snapshots across CPU cores.
+
+    Each worker process builds its signing context once. Yields
+    (filename, data, error) in input order (a chunk is yielded once all its
+    passes are built), so the written archive is deterministic.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for job in jobs:
+            yield _build_pass_job(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_pass_worker) as pool:
+        yield from pool.map(_build_pass_job, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
 
 
 def is_apple_wallet_available():